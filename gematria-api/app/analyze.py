@@ -0,0 +1,81 @@
+"""Incremental tokenizer for POST /analyze.
+
+Splits a passage into (verse number, raw Hebrew token) pairs without ever holding
+more than one read chunk of it, using the same HEBREW_WORD_RE tokens as the
+Sefaria importer. A verse ends at a line break or a sof pasuq (U+05C3).
+
+No Flask/SQLAlchemy imports.
+"""
+
+from __future__ import annotations
+
+import codecs
+import re
+from typing import IO, Iterable, Iterator
+
+from .sources import HEBREW_WORD_RE
+
+SOF_PASUQ = "\u05C3"
+_TOKEN_OR_BREAK_RE = re.compile(HEBREW_WORD_RE.pattern + r"|\n")
+
+# A "token" longer than this with no boundary in sight is cut rather than buffered.
+_MAX_PENDING_CHARS = 1 << 20
+
+
+def iter_text_chunks(stream: IO[bytes], chunk_size: int = 65536) -> Iterator[str]:
+    """Decode a UTF-8 byte stream chunk by chunk (multi-byte characters may straddle reads)."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        raw = stream.read(chunk_size)
+        if not raw:
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            return
+        text = decoder.decode(raw)
+        if text:
+            yield text
+
+
+def _is_hebrew(ch: str) -> bool:
+    return "\u0590" <= ch <= "\u05FF"
+
+
+def iter_passage_tokens(chunks: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """Yield (verse, token) with 1-based verse numbers; verses without tokens are skipped."""
+    verse = 1
+    verse_has_tokens = False
+    pending = ""
+
+    def scan(text: str) -> Iterator[tuple[int, str]]:
+        nonlocal verse, verse_has_tokens
+        for m in _TOKEN_OR_BREAK_RE.finditer(text):
+            token = m.group(0)
+            if token == "\n":
+                if verse_has_tokens:
+                    verse += 1
+                    verse_has_tokens = False
+                continue
+            parts = token.split(SOF_PASUQ)
+            for i, part in enumerate(parts):
+                if part:
+                    verse_has_tokens = True
+                    yield verse, part
+                if i < len(parts) - 1 and verse_has_tokens:
+                    verse += 1
+                    verse_has_tokens = False
+
+    for chunk in chunks:
+        pending += chunk
+        # Only scan up to the last non-Hebrew character, so no token is split across chunks.
+        cut = len(pending)
+        while cut > 0 and _is_hebrew(pending[cut - 1]):
+            cut -= 1
+        if cut == 0 and len(pending) < _MAX_PENDING_CHARS:
+            continue
+        if cut == 0:
+            cut = len(pending)
+        yield from scan(pending[:cut])
+        pending = pending[cut:]
+    if pending:
+        yield from scan(pending)
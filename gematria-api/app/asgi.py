@@ -0,0 +1,225 @@
+"""Asynchronous read-only serving mode: GET /gematria, /matches and /health on asyncio.
+
+    uvicorn asgi:app --workers 4
+
+A plain ASGI app with one asyncpg pool per worker, so a worker keeps serving
+while its queries wait on Postgres instead of holding a thread each. The
+contracts are the Flask endpoints': query args go through the same marshmallow
+schemas (422 with flask-smorest's error body), /matches pages with the same
+keyset cursors, and bodies are encoded by app.serialization.
+
+Everything else (writes, /search, /compose, ...) stays on the WSGI app: run both
+and route these paths to this one. The response cache, match index,
+compute-on-miss and /metrics are WSGI-only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+import asyncpg
+from marshmallow import EXCLUDE, ValidationError
+
+from .config import Config
+from .gematria import GEMATRIA_METHODS, compute_gematria, lookup_key, method_column
+from .pagination import CursorError, encode_cursor, parse_cursor
+from .schemas import GematriaQueryArgsSchema, MatchesQueryArgsSchema
+from .serialization import dumps
+
+log = logging.getLogger(__name__)
+
+# Same statements as the Flask handlers (routes._BY_KEY_WHERE, _GEMATRIA_LOOKUP and _MATCHES_PAGE),
+# one per method column.
+_LOOKUP_SQL = {
+    method: f"""
+    SELECT phrase, {method_column(method)} FROM public.gematria_entries
+    WHERE phrase_key = $1 OR phrase = $2
+    ORDER BY phrase = $2 DESC, id
+    LIMIT 1
+    """
+    for method in GEMATRIA_METHODS
+}
+# Separate statements with and without `after`, so both prepared plans are one index range scan.
+_MATCHES_SQL = {
+    (method, paged): f"""
+    SELECT id, phrase FROM public.gematria_entries
+    WHERE {method_column(method)} = $1 {'AND phrase COLLATE "C" > $3' if paged else ""}
+    ORDER BY phrase COLLATE "C"
+    LIMIT $2
+    """
+    for method in GEMATRIA_METHODS
+    for paged in (False, True)
+}
+_TABLE_EXISTS_SQL = "SELECT to_regclass('public.gematria_entries') IS NOT NULL"
+
+_CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+_SCHEMA_ERRORS = (asyncpg.UndefinedTableError, asyncpg.UndefinedColumnError)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, errors: dict | None = None) -> None:
+        super().__init__(status)
+        self.status = status
+        self.errors = errors
+
+
+def _asyncpg_dsn(url: str) -> str:
+    # SQLAlchemy URLs may name a driver (postgresql+psycopg2://); asyncpg wants plain libpq ones.
+    scheme, sep, rest = url.partition("://")
+    return f"{scheme.split('+', 1)[0]}{sep}{rest}"
+
+
+def _query_args(scope) -> dict[str, str]:
+    """First value of each query parameter, like webargs does for non-list fields."""
+    args: dict[str, str] = {}
+    for key, value in parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True):
+        args.setdefault(key, value)
+    return args
+
+
+def _load(schema, scope) -> dict:
+    try:
+        return schema.load(_query_args(scope), unknown=EXCLUDE)
+    except ValidationError as e:
+        raise HTTPError(422, {"query": e.messages}) from None
+
+
+class AsyncReadApp:
+    def __init__(self, config=Config) -> None:
+        self.database_url = _asyncpg_dsn(config.SQLALCHEMY_DATABASE_URI)
+        self.min_size = int(getattr(config, "ASYNC_POOL_MIN_SIZE", 1))
+        self.max_size = int(getattr(config, "ASYNC_POOL_MAX_SIZE", 10))
+        self.timeout = float(getattr(config, "ASYNC_DB_TIMEOUT_SECONDS", 10.0))
+
+        self._pool: asyncpg.Pool | None = None
+        self._pool_lock: asyncio.Lock | None = None
+        self._gematria_args = GematriaQueryArgsSchema()
+        self._matches_args = MatchesQueryArgsSchema()
+        self._routes = {"/gematria": self.gematria, "/matches": self.matches, "/health": self.health}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        handler = self._routes.get(scope["path"])
+        headers: dict[str, str] = {}
+        try:
+            if handler is None:
+                raise HTTPError(404)
+            if scope["method"] not in ("GET", "HEAD"):
+                raise HTTPError(405)
+            status, body, headers = await handler(scope)
+        except HTTPError as e:
+            status = e.status
+            body = {"code": e.status, "status": HTTPStatus(e.status).phrase}
+            if e.errors:
+                body["errors"] = e.errors
+        except Exception:
+            log.exception("unhandled error on %s", scope["path"])
+            status, body = 500, {"code": 500, "status": "Internal Server Error"}
+
+        payload = dumps(body)
+        raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+        raw_headers += [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else payload})
+
+    # -- pool -----------------------------------------------------------------
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.pool()
+                except (*_CONNECTION_ERRORS, asyncpg.PostgresError) as e:
+                    # Like the Flask app: start anyway and answer 503 until Postgres is reachable.
+                    log.warning("async pool not created at startup: %s", e)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._pool is not None:
+                    await self._pool.close()
+                    self._pool = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def pool(self) -> asyncpg.Pool:
+        """The worker's pool, created on first use (and again if creating it failed)."""
+        if self._pool is not None:
+            return self._pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    self.database_url,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    command_timeout=self.timeout,
+                    timeout=self.timeout,
+                )
+        return self._pool
+
+    async def _fetch(self, sql: str, *args) -> list:
+        try:
+            pool = await self.pool()
+            return await pool.fetch(sql, *args)
+        except (*_CONNECTION_ERRORS, *_SCHEMA_ERRORS):
+            raise HTTPError(503) from None
+
+    # -- endpoints --------------------------------------------------------------
+
+    async def gematria(self, scope):
+        args = _load(self._gematria_args, scope)
+        phrase = args["phrase"].strip()
+        method = args["method"]
+        rows = await self._fetch(_LOOKUP_SQL[method], lookup_key(phrase), phrase)
+        if not rows:
+            raise HTTPError(404)
+        stored, value = rows[0]
+        if value is None:
+            # Row predates migrations/005_method_values.sql and hasn't been backfilled.
+            value = compute_gematria(stored, method)
+        return 200, {"phrase": stored, "value": value, "method": method, "found": True}, {}
+
+    async def matches(self, scope):
+        args = _load(self._matches_args, scope)
+        value = args["value"]
+        top = args["top"]
+        method = args["method"]
+        if args["cursor"]:
+            try:
+                after = parse_cursor(args["cursor"], value, method)
+            except CursorError:
+                raise HTTPError(400) from None
+        else:
+            after = args["after"]
+
+        # One extra row tells us whether there is a next page.
+        if after is None:
+            rows = await self._fetch(_MATCHES_SQL[method, False], value, top + 1)
+        else:
+            rows = await self._fetch(_MATCHES_SQL[method, True], value, top + 1, after)
+        headers = {}
+        if len(rows) > top:
+            rows = rows[:top]
+            headers["X-Next-Cursor"] = encode_cursor(value, rows[-1][1], method)
+        entries = [{"id": entry_id, "phrase": phrase, "value": value, "source": None} for entry_id, phrase in rows]
+        return 200, entries, headers
+
+    async def health(self, scope):
+        try:
+            rows = await self._fetch(_TABLE_EXISTS_SQL)
+        except HTTPError:
+            return 503, {"ok": False, "db_ok": False, "table_exists": False}, {}
+        return 200, {"ok": True, "db_ok": True, "table_exists": bool(rows[0][0])}, {}
+
+
+def create_asgi_app(config=Config) -> AsyncReadApp:
+    return AsyncReadApp(config)
@@ -0,0 +1,73 @@
+"""Batched backfill of derived columns (scripts/backfill_*.py)."""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, Sequence
+
+from .config import Config
+from .data_version import BUMP_DATA_VERSION_SQL, DATA_VERSION_EXISTS_SQL
+
+# (id, phrase) rows of one batch -> VALUES tuples for the UPDATE, id first.
+RowsFor = Callable[[Sequence[tuple[int, str]]], list[tuple]]
+
+
+def backfill_parser(description: str, all_help: str) -> argparse.ArgumentParser:
+    """The command line every backfill script takes."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--database-url",
+        default=Config.SQLALCHEMY_DATABASE_URI,
+        help="Postgres URL (defaults to DATABASE_URL, same as the API)",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per UPDATE/commit")
+    parser.add_argument("--all", action="store_true", help=all_help)
+    return parser
+
+
+def run_backfill(args: argparse.Namespace, select_sql: str, update_sql: str, rows_for: RowsFor) -> int:
+    """
+    Walk public.gematria_entries by id in batches of `args.batch_size`.
+
+    `select_sql` takes (last id, recompute all, limit) and returns (id, phrase) rows in id
+    order; `update_sql` is an UPDATE ... FROM (VALUES %s) fed with `rows_for(rows)`.
+    A run that updated anything bumps public.gematria_data_version once at the end, so
+    caches and per-worker indexes holding the old column values are dropped.
+    """
+    import psycopg2
+    from psycopg2.extras import execute_values
+
+    conn = psycopg2.connect(args.database_url)
+    started = time.perf_counter()
+    last_id = 0
+    scanned = 0
+    updated = 0
+    try:
+        with conn.cursor() as cursor:
+            while True:
+                # Walk by id so each batch is a short transaction and a restart just continues.
+                cursor.execute(select_sql, (last_id, args.all, args.batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                execute_values(cursor, update_sql, rows_for(rows), page_size=len(rows))
+                updated += cursor.rowcount
+                conn.commit()
+
+                scanned += len(rows)
+                last_id = rows[-1][0]
+                elapsed = time.perf_counter() - started
+                print(f"[id<={last_id}] scanned={scanned}, updated={updated}, {scanned / elapsed:.0f} rows/s", flush=True)
+
+            if updated:
+                cursor.execute(DATA_VERSION_EXISTS_SQL)
+                (has_version,) = cursor.fetchone() or (False,)
+                if has_version:
+                    cursor.execute(BUMP_DATA_VERSION_SQL)
+                    conn.commit()
+    finally:
+        conn.close()
+
+    print(f"Done. Scanned={scanned}, Updated={updated}")
+    return 0
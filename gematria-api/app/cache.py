@@ -0,0 +1,572 @@
+"""Response cache for the single-entry read endpoints (/gematria, /matches, /entries/by-phrase GET).
+
+Cached bodies are tagged with the public.gematria_data_version they were read
+at, and a tagged body only counts as a hit while that is still the current
+version. Nothing is ever deleted on write; bumping the counter is the
+invalidation.
+
+Each worker learns the current version in two ways:
+
+- It polls the DB counter at most every CACHE_CHECK_SECONDS. This catches
+  writes from scripts and other hosts.
+- Shared backends also store a version that API writers publish right after
+  commit. Workers on the same backend see those writes on their next request.
+
+Backends (CACHE_BACKEND):
+
+  lru    per-worker OrderedDict; no sharing, nothing to set up
+  file   fixed-size mmap'ed slot table that every worker on the host shares
+  redis  any server speaking the Redis protocol (RESP); no client library needed
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import unquote, urlsplit
+
+from .data_version import read_data_version
+from .metrics import Sample
+from .serialization import dumps, loads
+
+if sys.platform == "win32":  # no fcntl: the file backend is unavailable
+    fcntl = None
+else:
+    import fcntl
+
+log = logging.getLogger(__name__)
+
+CACHE_BACKENDS = ("lru", "file", "redis")
+
+
+class CacheError(Exception):
+    pass
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+class CacheBackend:
+    """
+    Stores (data version, payload) per key. `fetch` also returns the shared
+    version (or None for per-worker backends) so shared backends can answer
+    both in one round trip.
+    """
+
+    name = ""
+
+    def fetch(self, digest: bytes) -> tuple[int | None, tuple[int, bytes] | None]:
+        raise NotImplementedError
+
+    def store(self, digest: bytes, version: int, payload: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def publish_version(self, version: int) -> None:
+        """Record that `version` is committed (no-op for per-worker backends)."""
+
+    def stats(self) -> dict:
+        return {}
+
+
+class LRUBackend(CacheBackend):
+    name = "lru"
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, tuple[int, float, bytes]] = OrderedDict()
+
+    def fetch(self, digest):
+        with self._lock:
+            item = self._entries.get(digest)
+            if item is None:
+                return None, None
+            version, expires_at, payload = item
+            if expires_at < time.monotonic():
+                del self._entries[digest]
+                return None, None
+            self._entries.move_to_end(digest)
+        return None, (version, payload)
+
+    def store(self, digest, version, payload, ttl):
+        with self._lock:
+            self._entries[digest] = (version, time.monotonic() + ttl, payload)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        return {"entries": entries, "max_entries": self.max_entries, "evictions": self.evictions}
+
+
+# File layout: a 64-byte header, then `slots` fixed-size slots grouped into sets
+# of _WAYS. A key can only live in the set its digest hashes to; within a set
+# the least recently used slot is replaced.
+_FILE_MAGIC = b"GEMCACH\x00"
+_FILE_LAYOUT = 1
+_FILE_HEADER = struct.Struct("<8sqIII")  # magic, shared data version, layout, slots, slot_bytes
+_FILE_HEADER_BYTES = 64
+_VERSION_OFFSET = 8
+# digest, data version, expires_at (epoch s), last used (epoch ns), payload length, crc32
+_SLOT = struct.Struct("<16sqdQII")
+_USED_OFFSET = 32
+_WAYS = 4
+_EMPTY = bytes(16)
+
+
+def _slot_crc(digest: bytes, version: int, payload: bytes) -> int:
+    return zlib.crc32(payload, zlib.crc32(digest + version.to_bytes(8, "little", signed=True)))
+
+
+class FileBackend(CacheBackend):
+    """
+    Cache shared by every worker on a host through one mmap'ed file.
+
+    Writers lock the set they write to with fcntl.lockf, plus a thread lock
+    because POSIX record locks don't exclude threads of the same process.
+    Readers don't lock. Each slot carries a CRC of its contents, so a read that
+    races a write sees a mismatch and counts as a miss. Payloads larger than a
+    slot are not cached.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str, slots: int, slot_bytes: int) -> None:
+        if fcntl is None:
+            raise CacheError("CACHE_BACKEND=file needs fcntl (not available on this platform)")
+        if slot_bytes <= _SLOT.size:
+            raise CacheError(f"CACHE_FILE_SLOT_BYTES must be larger than {_SLOT.size}")
+        self.path = path
+        self.sets = max(1, slots // _WAYS)
+        self.slot_bytes = slot_bytes
+        self.max_payload = slot_bytes - _SLOT.size
+        self.evictions = 0
+        self.too_large = 0
+        self._lock = threading.Lock()
+
+        slots = self.sets * _WAYS
+        size = _FILE_HEADER_BYTES + slots * slot_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _FILE_HEADER_BYTES, 0)
+        try:
+            magic, _version, layout, file_slots, file_slot_bytes = _FILE_HEADER.unpack(
+                os.pread(self._fd, _FILE_HEADER.size, 0).ljust(_FILE_HEADER.size, b"\0")
+            )
+            if (
+                os.fstat(self._fd).st_size != size
+                or (magic, layout, file_slots, file_slot_bytes) != (_FILE_MAGIC, _FILE_LAYOUT, slots, slot_bytes)
+            ):
+                # New file or different geometry: start empty. Every worker is
+                # expected to run with the same settings, so nobody else maps it yet.
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _FILE_HEADER.pack(_FILE_MAGIC, 0, _FILE_LAYOUT, slots, slot_bytes), 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _FILE_HEADER_BYTES, 0)
+        self._mm = mmap.mmap(self._fd, size)
+
+    def _set_offset(self, digest: bytes) -> int:
+        index = int.from_bytes(digest[:8], "little") % self.sets
+        return _FILE_HEADER_BYTES + index * _WAYS * self.slot_bytes
+
+    def _shared_version(self) -> int:
+        return struct.unpack_from("<q", self._mm, _VERSION_OFFSET)[0]
+
+    def fetch(self, digest):
+        mm = self._mm
+        shared = self._shared_version()
+        base = self._set_offset(digest)
+        for way in range(_WAYS):
+            offset = base + way * self.slot_bytes
+            slot_digest, version, expires_at, _used, length, crc = _SLOT.unpack_from(mm, offset)
+            if slot_digest != digest:
+                continue
+            if expires_at < time.time() or length > self.max_payload:
+                return shared, None
+            start = offset + _SLOT.size
+            payload = mm[start : start + length]
+            if _slot_crc(slot_digest, version, payload) != crc:
+                return shared, None  # overwritten while we were reading it
+            # Unlocked LRU touch: a lost update only makes eviction slightly less exact.
+            struct.pack_into("<Q", mm, offset + _USED_OFFSET, time.time_ns())
+            return shared, (version, payload)
+        return shared, None
+
+    def store(self, digest, version, payload, ttl):
+        if len(payload) > self.max_payload:
+            self.too_large += 1
+            return
+        mm = self._mm
+        base = self._set_offset(digest)
+        set_bytes = _WAYS * self.slot_bytes
+        now = time.time()
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, set_bytes, base)
+            try:
+                victim, victim_rank = base, (4, 0)
+                for way in range(_WAYS):
+                    offset = base + way * self.slot_bytes
+                    slot_digest, _version, expires_at, used, _length, _crc = _SLOT.unpack_from(mm, offset)
+                    # Same key, then empty, then expired, then least recently used.
+                    if slot_digest == digest:
+                        kind = 0
+                    elif slot_digest == _EMPTY:
+                        kind = 1
+                    elif expires_at < now:
+                        kind = 2
+                    else:
+                        kind = 3
+                    rank = (kind, used if kind == 3 else 0)
+                    if rank < victim_rank:
+                        victim, victim_rank = offset, rank
+                if victim_rank[0] == 3:
+                    self.evictions += 1
+                # Clear the digest first so readers skip the slot while the payload changes.
+                mm[victim : victim + 16] = _EMPTY
+                start = victim + _SLOT.size
+                mm[start : start + len(payload)] = payload
+                _SLOT.pack_into(
+                    mm, victim, digest, version, now + ttl, time.time_ns(), len(payload),
+                    _slot_crc(digest, version, payload),
+                )
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, set_bytes, base)
+
+    def publish_version(self, version):
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, _FILE_HEADER_BYTES, 0)
+            try:
+                if version > self._shared_version():
+                    struct.pack_into("<q", self._mm, _VERSION_OFFSET, version)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, _FILE_HEADER_BYTES, 0)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "slots": self.sets * _WAYS,
+            "slot_bytes": self.slot_bytes,
+            "evictions": self.evictions,
+            "too_large": self.too_large,
+        }
+
+
+# A slow or unreachable server must not slow requests down much: short socket
+# timeouts, and after a failure the backend is skipped for _REDIS_RETRY_SECONDS.
+_REDIS_TIMEOUT = 0.25
+_REDIS_RETRY_SECONDS = 1.0
+_REDIS_ENTRY = struct.Struct("<q")
+
+
+class _RedisConnection:
+    def __init__(self, host: str, port: int, password: str | None, db: int) -> None:
+        self.sock = socket.create_connection((host, port), timeout=_REDIS_TIMEOUT)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.call(b"AUTH", password.encode())
+        if db:
+            self.call(b"SELECT", str(db).encode())
+
+    # Replies are RESP values: bytes, int, None or a list of those.
+    def call(self, *args: bytes) -> Any:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.sock.sendall(b"".join(out))
+        return self._reply()
+
+    def _reply(self) -> Any:
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise CacheError("connection closed by cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise CacheError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self.reader.read(n + 2)
+            if len(data) != n + 2:
+                raise CacheError("connection closed by cache server")
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._reply() for _ in range(n)]
+        raise CacheError(f"unexpected reply from cache server: {line[:40]!r}")
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisBackend(CacheBackend):
+    """
+    Speaks just enough RESP for MGET/SET/INFO, one connection per thread.
+    Values are the data version (8 bytes) followed by the payload, so one MGET
+    returns both the entry and the shared version.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "gematria:cache:") -> None:
+        parts = urlsplit(url)
+        if parts.scheme != "redis":
+            raise CacheError(f"CACHE_REDIS_URL must be a redis:// URL, got {url!r}")
+        self.url = f"redis://{parts.hostname or 'localhost'}:{parts.port or 6379}{parts.path}"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.prefix = prefix.encode()
+        self.version_key = self.prefix + b"version"
+        self._local = threading.local()
+        self._down_until = 0.0
+        self._last_shared = 0
+
+    def _call(self, *args: bytes) -> Any:
+        if time.monotonic() < self._down_until:
+            raise CacheError("cache server marked down")
+        conn = getattr(self._local, "conn", None)
+        try:
+            if conn is None:
+                conn = self._local.conn = _RedisConnection(self.host, self.port, self.password, self.db)
+            return conn.call(*args)
+        except (OSError, CacheError, ValueError) as e:
+            if conn is not None:
+                conn.close()
+            self._local.conn = None
+            self._down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+            raise CacheError(str(e)) from e
+
+    def fetch(self, digest: bytes) -> tuple[int | None, tuple[int, bytes] | None]:
+        shared_raw, raw = self._call(b"MGET", self.version_key, self.prefix + digest.hex().encode())
+        shared = int(shared_raw) if shared_raw is not None else None
+        if shared is not None:
+            self._last_shared = max(self._last_shared, shared)
+        if raw is None or len(raw) < _REDIS_ENTRY.size:
+            return shared, None
+        return shared, (_REDIS_ENTRY.unpack_from(raw)[0], raw[_REDIS_ENTRY.size :])
+
+    def store(self, digest, version, payload, ttl):
+        key = self.prefix + digest.hex().encode()
+        self._call(b"SET", key, _REDIS_ENTRY.pack(version) + payload, b"PX", str(max(1, int(ttl * 1000))).encode())
+
+    def publish_version(self, version):
+        # Read-then-set, not an atomic max: two racing publishers can briefly leave
+        # the older version. The next DB poll (CACHE_CHECK_SECONDS) corrects it.
+        if version <= self._last_shared:
+            return
+        current = self._call(b"GET", self.version_key)
+        if current is None or int(current) < version:
+            self._call(b"SET", self.version_key, str(version).encode())
+        self._last_shared = max(self._last_shared, version, int(current or 0))
+
+    def stats(self):
+        out: dict[str, Any] = {"url": self.url}
+        try:
+            info = self._call(b"INFO", b"stats") or b""
+        except CacheError:
+            return out
+        for line in info.decode("utf-8", "replace").splitlines():
+            name, _, value = line.partition(":")
+            if name in ("keyspace_hits", "keyspace_misses", "evicted_keys", "expired_keys"):
+                out["server_" + name] = int(value)
+        out["evictions"] = out.get("server_evicted_keys", 0)
+        return out
+
+
+class _Lookup:
+    """Result of ResponseCache.lookup: a hit's value, or a way to store the fresh one."""
+
+    __slots__ = ("hit", "value", "_cache", "_digest", "_version")
+
+    def __init__(self, cache, digest, version, hit: bool = False, value: Any = None) -> None:
+        self.hit = hit
+        self.value = value
+        self._cache = cache
+        self._digest = digest
+        self._version = version
+
+    def store(self, value) -> None:
+        """Cache `value` (plain JSON types) under the version read at lookup time."""
+        if self._version is not None:
+            self._cache._store(self._digest, self._version, value)
+
+
+class ResponseCache:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.backend: CacheBackend | None = None
+        self.ttl = 300.0
+        self.check_seconds = 2.0
+
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._counts = {"hits": 0, "misses": 0, "stale": 0, "stores": 0, "errors": 0}
+        self._router = None
+
+    def init_app(self, app, router=None) -> None:
+        """`router` (a ReplicaRouter) tells which data version a replica-served response reflects."""
+        self._router = router
+        name = (app.config.get("CACHE_BACKEND") or "").strip().lower()
+        self.ttl = float(app.config.get("CACHE_TTL_SECONDS", 300))
+        self.check_seconds = float(app.config.get("CACHE_CHECK_SECONDS", 2.0))
+        if name in ("", "none", "off"):
+            return
+        if name == "lru":
+            self.backend = LRUBackend(int(app.config.get("CACHE_MAX_ENTRIES", 10000)))
+        elif name == "file":
+            path = app.config.get("CACHE_FILE_PATH") or os.path.join(tempfile.gettempdir(), "gematria-api.cache")
+            self.backend = FileBackend(
+                path,
+                int(app.config.get("CACHE_FILE_SLOTS", 8192)),
+                int(app.config.get("CACHE_FILE_SLOT_BYTES", 4096)),
+            )
+        elif name == "redis":
+            self.backend = RedisBackend(app.config.get("CACHE_REDIS_URL") or "redis://localhost:6379/0")
+        else:
+            raise CacheError(f"Unknown CACHE_BACKEND {name!r}; expected one of {', '.join(CACHE_BACKENDS)}")
+        self.enabled = True
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _current_version(self, session) -> int | None:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_seconds:
+            return self._version
+        version = read_data_version(session)
+        if version is None:
+            # Without the counter a write could never invalidate anything.
+            log.warning("public.gematria_data_version missing; response cache disabled")
+            self.enabled = False
+            return None
+        with self._lock:
+            self._version = max(self._version or 0, version)
+            self._checked_at = now
+        self._publish(version)
+        return self._version
+
+    def lookup(self, session, *key) -> _Lookup:
+        """
+        Look up the response for `key` (the endpoint name plus its normalized arguments).
+        Always returns a _Lookup; when disabled it is a miss whose store() does nothing.
+        """
+        if not self.enabled or self.backend is None:
+            return _Lookup(self, None, None)
+        version = self._current_version(session)
+        if version is None:
+            return _Lookup(self, None, None)
+        digest = _digest(json.dumps(key, ensure_ascii=False, separators=(",", ":")))
+        try:
+            shared, entry = self.backend.fetch(digest)
+        except CacheError as e:
+            self._count("errors")
+            log.debug("cache fetch failed: %s", e)
+            return _Lookup(self, None, None)
+
+        if shared is not None and shared > version:
+            # Another worker committed a write we haven't polled yet.
+            with self._lock:
+                self._version = version = max(self._version or 0, shared)
+        if entry is not None and entry[0] == version:
+            self._count("hits")
+            return _Lookup(self, digest, None, hit=True, value=loads(entry[1]))
+        self._count("stale" if entry is not None else "misses")
+        served = self._router.request_version() if self._router is not None else None
+        if served is not None and served < version:
+            # The response will come from a replica that may not have `version` yet; tag it
+            # with the replica's own so it is never served as current.
+            version = served
+        return _Lookup(self, digest, version)
+
+    def _store(self, digest: bytes, version: int, value) -> None:
+        if self.backend is None:
+            return
+        payload = dumps(value)
+        try:
+            self.backend.store(digest, version, payload, self.ttl)
+        except CacheError as e:
+            self._count("errors")
+            log.debug("cache store failed: %s", e)
+            return
+        self._count("stores")
+
+    def note_write(self, version: int | None) -> None:
+        """Call after committing a write; `version` is what bump_data_version() returned."""
+        if not self.enabled or version is None:
+            return
+        with self._lock:
+            self._version = max(self._version or 0, version)
+        self._publish(version)
+
+    def _publish(self, version: int) -> None:
+        if self.backend is None:
+            return
+        try:
+            self.backend.publish_version(version)
+        except CacheError as e:
+            self._count("errors")
+            log.debug("cache version publish failed: %s", e)
+
+    def samples(self) -> list[Sample]:
+        """This worker's counters as /metrics samples."""
+        if self.backend is None:
+            return []
+        with self._lock:
+            counts = dict(self._counts)
+        help = "Response cache lookups and stores by outcome."
+        samples: list[Sample] = [
+            ("gematria_cache_events_total", "counter", help, {"backend": self.backend.name, "event": name}, n)
+            for name, n in counts.items()
+        ]
+        evictions = self.backend.stats().get("evictions") if self.backend.name != "redis" else None
+        if evictions is not None:
+            samples.append(
+                ("gematria_cache_evictions_total", "counter", "Entries evicted to make room.",
+                 {"backend": self.backend.name}, evictions)
+            )
+        return samples
+
+    def stats(self) -> dict:
+        """This worker's counters plus the backend's own stats (shared backends: host/server-wide)."""
+        with self._lock:
+            counts = dict(self._counts)
+            version = self._version
+        lookups = counts["hits"] + counts["misses"] + counts["stale"]
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.backend is not None else None,
+            "pid": os.getpid(),
+            "data_version": version,
+            **counts,
+            "hit_ratio": round(counts["hits"] / lookups, 4) if lookups else None,
+            "backend_stats": self.backend.stats() if self.backend is not None else {},
+        }
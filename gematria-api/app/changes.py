@@ -0,0 +1,69 @@
+"""Change log behind GET /entries/changes (migrations/006_change_log.sql).
+
+Triggers on public.gematria_entries append one row per inserted, updated or
+deleted entry to public.gematria_changes, whatever the writer: API routes,
+write-behind, COPY loaders and scripts alike. Updates that change neither the
+phrase nor the value (backfills of derived columns) aren't logged.
+
+Every writing statement first takes a transaction-level advisory lock, so
+writers are serialized from their first change until commit. `seq` is then
+handed out in commit order, and a reader never sees a change before one with
+a lower `seq` that commits later: `seq > cursor` can't skip anything.
+
+Deleting or truncating log rows records the newest removed `seq` in
+public.gematria_changes_pruned, so a cursor older than that gets 410 even
+when the whole log was pruned.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from sqlalchemy import text
+
+# The migration is the one copy of the trigger DDL; the create_all hook (models.py) runs
+# it too. Its CREATE TABLEs are IF NOT EXISTS, so they are no-ops after create_all.
+CHANGE_LOG_SQL = (Path(__file__).resolve().parents[1] / "migrations" / "006_change_log.sql").read_text(
+    encoding="utf-8"
+)
+
+CHANGES_SINCE_SQL = text(
+    """
+    SELECT seq, op, entry_id, phrase, value, changed_at FROM public.gematria_changes
+    WHERE seq > :since
+    ORDER BY seq
+    """
+)
+# A cursor below this has missed pruned changes. Only the watermark counts: gaps in seq
+# (rolled-back writes, sequence values lost on a crash) are not pruning.
+PRUNED_UP_TO_SQL = text(
+    """
+    SELECT coalesce((SELECT seq FROM public.gematria_changes_pruned WHERE id = 1), 0)
+    """
+)
+# Never below the watermark, so a full sync of a pruned-empty log doesn't get 410 next time.
+LATEST_CHANGE_SQL = text(
+    """
+    SELECT greatest(
+        (SELECT max(seq) FROM public.gematria_changes),
+        (SELECT seq FROM public.gematria_changes_pruned WHERE id = 1),
+        0
+    )
+    """
+)
+# Full sync: the current entries, read in the same snapshot as LATEST_CHANGE_SQL.
+ALL_ENTRIES_SQL = text("SELECT id, phrase, value FROM public.gematria_entries ORDER BY id")
+
+
+def iter_changes(rows: Iterable) -> Iterator[dict]:
+    """Change-log rows as GET /entries/changes lines."""
+    for seq, op, entry_id, phrase, value, changed_at in rows:
+        yield {
+            "type": op,
+            "seq": seq,
+            "id": entry_id,
+            "phrase": phrase,
+            "value": value,
+            "changed_at": changed_at.isoformat(),
+        }
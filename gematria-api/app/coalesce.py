@@ -0,0 +1,116 @@
+"""Single-flight coalescing of identical concurrent reads within a worker (COALESCE_ENABLED).
+
+When several threads ask for the same key at once (say `/matches?value=26` during
+a spike), the first one runs the query and the others wait for its result
+instead of sending the same query to Postgres. A waiter that isn't served within
+COALESCE_WAIT_SECONDS runs the query itself. Errors are shared: waiters
+re-raise the leader's exception.
+
+A write made by this worker starts a new generation (`note_write`): requests
+arriving afterwards never join a call that may have read the data before it.
+Requests only join calls reading from the same database (primary or replica).
+Only useful with concurrent requests per worker (gunicorn --threads, or
+gevent/eventlet workers); plain sync workers never overlap.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Hashable, TypeVar
+
+from .metrics import Sample
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.wait_seconds = 5.0
+
+        self._lock = threading.Lock()
+        self._calls: dict[tuple, _Call] = {}
+        self._generation = 0
+        # (kind, event) -> count; kind is the first element of the key.
+        self._counts: dict[tuple[str, str], int] = {}
+        self._router = None
+
+    def init_app(self, app, router=None) -> None:
+        """`router` (a ReplicaRouter) keeps requests routed to different databases apart."""
+        self._router = router
+        self.enabled = bool(app.config.get("COALESCE_ENABLED", False))
+        self.wait_seconds = float(app.config.get("COALESCE_WAIT_SECONDS", 5.0))
+
+    def do(self, key: tuple[Hashable, ...], fn: Callable[[], T]) -> T:
+        """
+        Return `fn()`, sharing one call among threads asking for the same `key`
+        at the same time. `key[0]` names the kind of call (for the counters).
+        """
+        if not self.enabled:
+            return fn()
+        kind = str(key[0])
+        target = self._router.request_target() if self._router is not None else None
+        with self._lock:
+            flight = (self._generation, target, *key)
+            call = self._calls.get(flight)
+            leader = call is None
+            if leader:
+                call = self._calls[flight] = _Call()
+
+        if leader:
+            try:
+                call.value = fn()
+                return call.value
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    if self._calls.get(flight) is call:
+                        del self._calls[flight]
+                    self._count(kind, "executed")
+                call.done.set()
+
+        if not call.done.wait(self.wait_seconds):
+            with self._lock:
+                self._count(kind, "timeouts")
+            return fn()
+        with self._lock:
+            self._count(kind, "errors" if call.error is not None else "coalesced")
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def note_write(self) -> None:
+        """Call after this worker commits a write; in-flight reads are no longer joined."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+
+    def _count(self, kind: str, event: str) -> None:
+        self._counts[(kind, event)] = self._counts.get((kind, event), 0) + 1
+
+    def samples(self) -> list[Sample]:
+        """Counters per kind of call as /metrics samples."""
+        if not self.enabled:
+            return []
+        with self._lock:
+            counts = dict(self._counts)
+            in_flight = len(self._calls)
+        help = "Coalesced reads: executed (leaders), coalesced (served a leader's result), timeouts, errors (shared)."
+        samples: list[Sample] = [
+            ("gematria_coalesce_events_total", "counter", help, {"kind": kind, "event": event}, n)
+            for (kind, event), n in sorted(counts.items())
+        ]
+        samples.append(("gematria_coalesce_in_flight", "gauge", "Distinct reads currently in flight.", {}, in_flight))
+        return samples
@@ -0,0 +1,221 @@
+"""Subset-sum search behind GET /compose: which k-word value combinations add up to N.
+
+Works on the value histogram (value -> number of entries) rather than on phrases,
+so the search space is the few thousand distinct values, not the table. Each
+worker caches the histogram plus "reachable sum" bitsets (bit s of reach[j] is set
+when some j values can add up to s) and reloads both when
+public.gematria_data_version changes.
+
+The search enumerates non-decreasing value tuples depth-first. At each level the
+bitsets prune any prefix whose remainder can't be made from the remaining words,
+and the last value is a dict lookup. That is the DP half of a meet-in-the-middle
+search, without materializing pair-sum tables.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+
+from sqlalchemy import text
+
+from .data_version import read_data_version
+
+# Request limits (validated in schemas.py): the bitsets are MAX_COMPOSE_VALUE + 1 bits wide,
+# one per word count up to MAX_COMPOSE_WORDS.
+MAX_COMPOSE_VALUE = 100_000
+MAX_COMPOSE_WORDS = 4
+
+# Only values that can be part of a sum we accept; also bounds the bitsets' size.
+_HISTOGRAM_SQL = text(
+    """
+    SELECT value, COUNT(*) FROM public.gematria_entries
+    WHERE value > 0 AND value <= :max_value
+    GROUP BY value
+    """
+)
+_REACH_MASK = (1 << (MAX_COMPOSE_VALUE + 1)) - 1
+
+
+@dataclass
+class Combination:
+    values: tuple[int, ...]
+    # Distinct phrase tuples this value combination stands for.
+    phrase_combinations: int
+
+
+@dataclass
+class ComposeResult:
+    combinations: list[Combination]
+    # True if the time budget ran out before every word count was searched.
+    truncated: bool
+    seconds: float
+
+
+class _Histogram:
+    __slots__ = ("counts", "values", "reach")
+
+    def __init__(self, counts: dict[int, int]) -> None:
+        self.counts = counts
+        self.values = sorted(counts)
+        # reach[j]: bitset of sums reachable with exactly j values (repeats allowed).
+        self.reach = [1]
+        for _ in range(MAX_COMPOSE_WORDS):
+            prev = self.reach[-1]
+            bits = 0
+            for v in self.values:
+                bits |= prev << v
+            self.reach.append(bits & _REACH_MASK)
+
+
+class _Deadline(Exception):
+    pass
+
+
+def search(
+    hist: _Histogram,
+    target: int,
+    min_words: int,
+    max_words: int,
+    limit: int,
+    time_budget: float,
+) -> ComposeResult:
+    """
+    Best `limit` combinations of `min_words`..`max_words` distinct entries whose
+    values sum to `target`. Ranked by fewer words first, then by how many phrase
+    tuples the combination covers (more first), then by values.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget
+    counts, values, reach = hist.counts, hist.values, hist.reach
+    ranked: list[Combination] = []
+    truncated = False
+    steps = 0
+
+    for k in range(min_words, max_words + 1):
+        if len(ranked) >= limit:
+            break  # fewer words always rank first
+        # Min-heap of the best `limit` for this k, keyed so the worst is on top.
+        heap: list[tuple[int, tuple[int, ...]]] = []
+        chosen: list[int] = []
+
+        def emit(n: int, combo: tuple[int, ...]) -> None:
+            if len(heap) >= limit and n < heap[0][0]:
+                return
+            # Negated values: among equal counts, keep the lexicographically smallest.
+            item = (n, tuple(-v for v in combo))
+            if len(heap) < limit:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        def extend(weight: int, v: int, repeats: int) -> int:
+            # weight * C(count, repeats) / C(count, repeats - 1): exact in integers.
+            return weight * (counts[v] - repeats + 1) // repeats
+
+        def walk(words_left: int, start: int, remaining: int, run: int, weight: int) -> None:
+            # `run`: how many times chosen[-1] repeats at the end of `chosen`;
+            # `weight`: phrase combinations for `chosen` so far.
+            nonlocal steps
+            last = chosen[-1] if chosen else 0
+            if words_left == 1:
+                if remaining >= last and remaining in counts:
+                    repeats = run + 1 if remaining == last else 1
+                    if counts[remaining] >= repeats:
+                        emit(extend(weight, remaining, repeats), (*chosen, remaining))
+                return
+            if words_left == 2:
+                # Pairs: a membership test per candidate, no recursion.
+                stop = bisect_right(values, remaining // 2, start)
+                steps += stop - start
+                if time.perf_counter() > deadline:
+                    raise _Deadline
+                for v in [v for v in values[start:stop] if remaining - v in counts]:
+                    w = remaining - v
+                    repeats = run + 1 if v == last else 1
+                    if counts[v] < repeats:
+                        continue
+                    n = extend(weight, v, repeats)
+                    if w == v:
+                        if counts[v] < repeats + 1:
+                            continue
+                        n = extend(n, v, repeats + 1)
+                    else:
+                        n *= counts[w]
+                    emit(n, (*chosen, v, w))
+                return
+            below = reach[words_left - 1]
+            for i in range(start, len(values)):
+                v = values[i]
+                if v * words_left > remaining:
+                    break
+                steps += 1
+                if not steps & 0xFFF and time.perf_counter() > deadline:
+                    raise _Deadline
+                if not (below >> (remaining - v)) & 1:
+                    continue
+                repeats = run + 1 if v == last else 1
+                if counts[v] < repeats:
+                    continue
+                chosen.append(v)
+                walk(words_left - 1, i, remaining - v, repeats, extend(weight, v, repeats))
+                chosen.pop()
+
+        if (reach[k] >> target) & 1:
+            try:
+                walk(k, 0, target, 0, 1)
+            except _Deadline:
+                truncated = True
+
+        best = sorted(heap, reverse=True)
+        ranked.extend(Combination(tuple(-v for v in neg), n) for n, neg in best)
+        if truncated:
+            break
+
+    return ComposeResult(ranked[:limit], truncated, time.perf_counter() - started)
+
+
+class Composer:
+    """Per-worker histogram cache plus the search entry point used by /compose."""
+
+    def __init__(self) -> None:
+        self.check_seconds = 2.0
+        self.time_budget = 0.25
+
+        self._lock = threading.Lock()
+        self._hist: _Histogram | None = None
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._db = None
+
+    def init_app(self, app, db) -> None:
+        self._db = db
+        self.check_seconds = float(app.config.get("COMPOSE_CHECK_SECONDS", 2.0))
+        self.time_budget = float(app.config.get("COMPOSE_TIME_BUDGET_MS", 250)) / 1000
+
+    def _histogram(self) -> _Histogram:
+        now = time.monotonic()
+        hist = self._hist
+        if hist is not None and now - self._checked_at < self.check_seconds:
+            return hist
+        with self._lock:
+            if self._hist is not None and now - self._checked_at < self.check_seconds:
+                return self._hist
+            # The primary, not db.session: in a read-only request that may be a lagging replica.
+            assert self._db is not None
+            with self._db.engine.connect() as conn:
+                version = read_data_version(conn)
+                # Without the version table we can't tell when to reload; rebuild every check.
+                if self._hist is None or version is None or version != self._version:
+                    rows = conn.execute(_HISTOGRAM_SQL, {"max_value": MAX_COMPOSE_VALUE})
+                    counts = {int(value): int(n) for value, n in rows}
+                    self._hist = _Histogram(counts)
+                    self._version = version
+            self._checked_at = now
+            return self._hist
+
+    def compose(self, target: int, min_words: int, max_words: int, limit: int) -> ComposeResult:
+        return search(self._histogram(), target, min_words, max_words, limit, self.time_budget)
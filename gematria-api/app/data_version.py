@@ -0,0 +1,56 @@
+"""Helpers for the public.gematria_data_version write counter.
+
+Writers call `bump_data_version()` inside their transaction; readers that keep
+per-process copies of the table compare `read_data_version()` against the
+version they loaded.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+
+# Plain SQL strings are public so loaders using a raw DBAPI cursor can run them too.
+BUMP_DATA_VERSION_SQL = """
+INSERT INTO public.gematria_data_version (id, version)
+VALUES (1, 1)
+ON CONFLICT (id) DO UPDATE SET version = public.gematria_data_version.version + 1
+RETURNING version
+"""
+DATA_VERSION_EXISTS_SQL = "SELECT to_regclass('public.gematria_data_version') IS NOT NULL"
+
+_BUMP_SQL = text(BUMP_DATA_VERSION_SQL)
+_READ_SQL = text("SELECT version FROM public.gematria_data_version WHERE id = 1")
+_EXISTS_SQL = text(DATA_VERSION_EXISTS_SQL)
+
+# Cached per process: a failed statement would abort the caller's transaction,
+# so we only touch the table once we know it exists.
+_table_exists: bool | None = None
+
+
+def _has_table(session) -> bool:
+    global _table_exists
+    if _table_exists is None:
+        _table_exists = bool(session.execute(_EXISTS_SQL).scalar())
+    return _table_exists
+
+
+def bump_data_version(session) -> int | None:
+    """
+    Increment the write counter in the current transaction and return the new value.
+
+    Returns None if the counter table doesn't exist (older databases).
+    """
+    if not _has_table(session):
+        return None
+    return int(session.execute(_BUMP_SQL).scalar_one())
+
+
+def read_data_version(session) -> int | None:
+    """
+    Return the current write counter (0 if no write has been recorded yet),
+    or None if the counter table doesn't exist.
+    """
+    if not _has_table(session):
+        return None
+    version = session.execute(_READ_SQL).scalar()
+    return int(version or 0)
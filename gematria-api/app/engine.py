@@ -0,0 +1,221 @@
+"""Database engine settings, prepared hot statements, a cached health probe and pool status.
+
+- `configure_engine(app)` turns the DB_* settings into SQLALCHEMY_ENGINE_OPTIONS
+  (pool size/overflow/timeout/recycle, pre-ping, connect and statement timeouts,
+  application_name). Call it before db.init_app().
+- `PreparedStatement` runs a fixed query through a server-side prepared statement.
+  It PREPAREs on first use per pooled connection, then EXECUTEs, so Postgres
+  parses and plans it once per connection instead of once per request. Turn it off
+  (DB_PREPARED_STATEMENTS=false) behind PgBouncer in transaction mode, where the
+  next transaction may run on another server connection.
+- `HealthProbe` checks the DB from a background thread per worker, so GET /health
+  answers from memory instead of querying on every load balancer probe.
+- `pool_status(engine)` is the worker's live pool utilisation (GET /admin/pool).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+log = logging.getLogger(__name__)
+
+_PARAM_RE = re.compile(r"(?<![:\w]):(\w+)")
+
+
+def configure_engine(app) -> None:
+    """Set SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings (PostgreSQL URLs only)."""
+    config = app.config
+    if not str(config.get("SQLALCHEMY_DATABASE_URI", "")).startswith("postgresql"):
+        return
+    connect_args = {
+        "connect_timeout": int(config.get("DB_CONNECT_TIMEOUT", 10)),
+        "application_name": config.get("DB_APPLICATION_NAME", "gematria-api"),
+    }
+    statement_timeout = int(config.get("DB_STATEMENT_TIMEOUT_MS", 0))
+    if statement_timeout > 0:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+
+    options = {
+        "pool_size": int(config.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(config.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(config.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(config.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": bool(config.get("DB_POOL_PRE_PING", True)),
+        "connect_args": connect_args,
+    }
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS entries win.
+    options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+class PreparedStatement:
+    """
+    A fixed query with named parameters (`:name`), run as PREPARE/EXECUTE.
+
+    `types` gives each parameter's Postgres type, in order of first appearance
+    in `sql`. With prepared statements disabled, the query runs as plain text.
+    """
+
+    # Set by init_app (DB_PREPARED_STATEMENTS).
+    enabled = True
+
+    def __init__(self, name: str, sql: str, types: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.params = list(dict.fromkeys(_PARAM_RE.findall(sql)))
+        if len(self.params) != len(types):
+            raise ValueError(f"{name}: {len(self.params)} parameters but {len(types)} types")
+        positional = _PARAM_RE.sub(lambda m: f"${self.params.index(m.group(1)) + 1}", sql)
+        arg_types = f" ({', '.join(types)})" if types else ""
+        self._prepare = f"PREPARE {name}{arg_types} AS {positional}"
+        args = f"({', '.join(':' + p for p in self.params)})" if self.params else ""
+        self._execute = text(f"EXECUTE {name}{args}")
+        self._plain = text(sql)
+
+    @classmethod
+    def init_app(cls, app) -> None:
+        cls.enabled = bool(app.config.get("DB_PREPARED_STATEMENTS", True))
+
+    def execute(self, session, **params):
+        """Execute in `session`'s transaction; returns the SQLAlchemy Result."""
+        if not self.enabled:
+            return session.execute(self._plain, params)
+        connection = session.connection()
+        # Connection.info lives as long as the DBAPI connection, across pool checkouts.
+        prepared = connection.info.setdefault("prepared_statements", set())
+        if self.name not in prepared:
+            connection.exec_driver_sql(self._prepare)
+            prepared.add(self.name)
+        return session.execute(self._execute, params)
+
+
+_PROBE_SQL = text("SELECT to_regclass('public.gematria_entries') IS NOT NULL")
+
+
+class HealthProbe:
+    """
+    The DB check behind GET /health. It runs at most every HEALTH_PROBE_SECONDS
+    per worker, from a background thread. A result older than three intervals
+    (say the thread is stuck on a dead connection) is treated as unknown and
+    checked inline, as is every probe with HEALTH_PROBE_SECONDS=0.
+    """
+
+    def __init__(self) -> None:
+        self.interval = 5.0
+        self._lock = threading.Lock()
+        self._result: dict | None = None
+        self._checked_at = 0.0
+        self._thread_pid: int | None = None
+        self._app = None
+        self._db = None
+
+    def init_app(self, app, db) -> None:
+        self.interval = float(app.config.get("HEALTH_PROBE_SECONDS", 5.0))
+        self._app = app
+        self._db = db
+
+    def status(self) -> dict:
+        """{"ok", "db_ok", "table_exists", "checked_seconds_ago"} for GET /health."""
+        if self.interval > 0:
+            self._ensure_thread()
+            with self._lock:
+                result, checked_at = self._result, self._checked_at
+            age = time.monotonic() - checked_at
+            if result is not None and age <= 3 * self.interval:
+                return {**result, "checked_seconds_ago": round(age, 3)}
+        return {**self.check(), "checked_seconds_ago": 0.0}
+
+    def check(self) -> dict:
+        """Run the probe now (one query on a pooled connection) and remember the result."""
+        assert self._db is not None
+        try:
+            with self._db.engine.connect() as connection:
+                exists = bool(connection.execute(_PROBE_SQL).scalar())
+            result = {"ok": True, "db_ok": True, "table_exists": exists}
+        except (OperationalError, ProgrammingError, PoolTimeoutError) as e:
+            # TimeoutError: no pooled connection within DB_POOL_TIMEOUT.
+            log.debug("health probe failed: %s", e)
+            result = {"ok": False, "db_ok": False, "table_exists": False}
+        with self._lock:
+            self._result = result
+            self._checked_at = time.monotonic()
+        return result
+
+    def _ensure_thread(self) -> None:
+        # Started lazily in each worker: threads don't survive gunicorn's fork.
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            threading.Thread(target=self._run, name="health-probe", daemon=True).start()
+
+    def _run(self) -> None:
+        assert self._app is not None
+        while True:
+            with self._app.app_context():
+                try:
+                    self.check()
+                except Exception:  # keep probing; /health checks inline until the next result
+                    log.exception("health probe failed")
+            time.sleep(self.interval)
+
+
+_SERVER_SQL = text(
+    """
+    SELECT
+      current_setting('max_connections')::int AS max_connections,
+      current_setting('superuser_reserved_connections')::int AS reserved_connections,
+      (SELECT count(*) FROM pg_stat_activity) AS connections,
+      (SELECT count(*) FROM pg_stat_activity WHERE application_name = :application_name) AS app_connections
+    """
+)
+
+
+def pool_status(app, engine) -> dict:
+    """
+    This worker's pool usage and settings, plus the server's connection limits. Use
+    them to size the deployment: every worker can open `pool_size + max_overflow`
+    connections.
+    """
+    pool = engine.pool
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    status: dict = {"pid": os.getpid(), "pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # QueuePool.overflow() is negative until the pool itself is full.
+            overflow=max(0, pool.overflow()),
+            max_overflow=options.get("max_overflow"),
+            timeout_seconds=options.get("pool_timeout"),
+            recycle_seconds=options.get("pool_recycle"),
+            pre_ping=options.get("pool_pre_ping"),
+        )
+        status["max_connections_per_worker"] = pool.size() + int(options.get("max_overflow") or 0)
+
+    application_name = (options.get("connect_args") or {}).get("application_name", "")
+    try:
+        with engine.connect() as connection:
+            server = dict(connection.execute(_SERVER_SQL, {"application_name": application_name}).mappings().one())
+    except (OperationalError, ProgrammingError) as e:
+        status["server"] = {"error": e.__class__.__name__}
+        return status
+    server["application_name"] = application_name
+    per_worker = status.get("max_connections_per_worker")
+    if per_worker:
+        # Connections left for this app if nothing else connected; other clients count against it.
+        available = server["max_connections"] - server["reserved_connections"]
+        server["max_workers_at_full_pool"] = available // per_worker
+    status["server"] = server
+    return status
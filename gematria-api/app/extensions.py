@@ -3,7 +3,27 @@ from __future__ import annotations
 from flask_smorest import Api
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
-api = Api()
-
+from .cache import ResponseCache
+from .coalesce import SingleFlight
+from .compose import Composer
+from .engine import HealthProbe
+from .match_index import MatchIndex
+from .metrics import Metrics
+from .replicas import ReplicaRouter, RoutingSession
+from .search import SearchIndex
+from .snapshot import SnapshotStore
+from .write_behind import WriteBehindQueue
 
+replicas = ReplicaRouter()
+# Read-only requests bind to a replica when DATABASE_REPLICA_URLS is set (app/replicas.py).
+db = SQLAlchemy(session_options={"class_": RoutingSession, "router": replicas})
+api = Api()
+match_index = MatchIndex()
+composer = Composer()
+search_index = SearchIndex()
+snapshot_store = SnapshotStore()
+response_cache = ResponseCache()
+metrics = Metrics()
+write_behind = WriteBehindQueue()
+coalescer = SingleFlight()
+health_probe = HealthProbe()
@@ -6,38 +6,83 @@ Kept separate from `app/__init__.py` so importing utility modules like
 
 from __future__ import annotations
 
-from flask import Flask, abort, current_app
+import hmac
+
+from flask import Flask, abort, current_app, request
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 
 from .config import Config
-from .extensions import api, db
-from .routes import blp
+from .engine import PreparedStatement, configure_engine, pool_status
+from .extensions import (
+    api,
+    coalescer,
+    composer,
+    db,
+    health_probe,
+    match_index,
+    metrics,
+    replicas,
+    response_cache,
+    search_index,
+    snapshot_store,
+    write_behind,
+)
+from .metrics import pool_samples
+from .routes import blp, note_write
+from .snapshot_routes import snapshot_blp
 
 
 def create_app() -> Flask:
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # Before db.init_app: both go through SQLALCHEMY_ENGINE_OPTIONS (pool settings, and
+    # the instrumented pool class).
+    configure_engine(app)
+    metrics.init_app(app)
     db.init_app(app)
+    PreparedStatement.init_app(app)
+    health_probe.init_app(app, db)
     api.init_app(app)
 
-    api.register_blueprint(blp)
+    # Snapshot mode serves only the read endpoints, from a file instead of Postgres.
+    snapshot_mode = bool(app.config.get("SNAPSHOT_MODE", False))
+    if snapshot_mode:
+        snapshot_store.init_app(app)
+        api.register_blueprint(snapshot_blp)
+    else:
+        api.register_blueprint(blp)
 
     @app.get("/")
     def index():
-        return {
-            "service": "Gematria API",
-            "swagger_ui": "/swagger-ui",
-            "openapi_json": "/openapi.json",
-            "endpoints": [
+        if snapshot_mode:
+            endpoints = ["/gematria", "/matches", "/metrics"]
+        else:
+            endpoints = [
                 "/gematria",
+                "/gematria/lookup/batch",
+                "/gematria/compute/batch",
                 "/matches",
+                "/matches/range",
+                "/matches/multi",
+                "/search",
+                "/compose",
+                "/analyze",
                 "/entries",
                 "/entries/{id}",
+                "/entries/changes",
                 "/entries/by-phrase",
                 "/entries/by-phrase/bulk",
-            ],
+                "/entries/by-phrase/stream",
+                "/cache/stats",
+                "/metrics",
+            ]
+        return {
+            "service": "Gematria API",
+            "swagger_ui": "/swagger-ui",
+            "openapi_json": "/openapi.json",
+            "endpoints": endpoints,
         }
 
     # Local-only helper for diagnosing "wrong DB" issues.
@@ -68,21 +113,76 @@ def create_app() -> Flask:
     def health():
         """
         Production-safe health endpoint.
-        Verifies DB connectivity and whether public.gematria_entries exists.
+        Verifies DB connectivity and whether public.gematria_entries exists
+        (or, in snapshot mode, which snapshot is being served).
         """
-        try:
-            db.session.execute(text("SELECT 1"))
-            exists = db.session.execute(
-                text("SELECT to_regclass('public.gematria_entries') IS NOT NULL AS exists")
-            ).mappings().one()["exists"]
-        except OperationalError:
-            return {"ok": False, "db_ok": False, "table_exists": False}, 503
-        return {"ok": True, "db_ok": True, "table_exists": bool(exists)}
+        if snapshot_mode:
+            snapshot = snapshot_store.get()
+            return {
+                "ok": True,
+                "snapshot": snapshot.path,
+                "entries": snapshot.count,
+                "data_version": snapshot.data_version,
+                "created_at": snapshot.created_at,
+            }
+        # Cached: load balancer probes don't each cost a DB round trip.
+        status = health_probe.status()
+        return status, 200 if status["db_ok"] else 503
+
+    def require_admin() -> None:
+        token = app.config.get("ADMIN_TOKEN", "")
+        if not token or snapshot_mode:
+            abort(404)
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            abort(401)
+
+    @app.get("/admin/pool")
+    def admin_pool():
+        """
+        Live pool utilisation of the worker that answers, its pool settings, and the
+        server's connection limits. Requires ADMIN_TOKEN.
+        """
+        require_admin()
+        return pool_status(app, db.engine)
+
+    @app.get("/admin/replicas")
+    def admin_replicas():
+        """Replica health, lag, probe latency and routed reads seen by the worker that answers. Requires ADMIN_TOKEN."""
+        require_admin()
+        if not replicas.enabled:
+            abort(404)
+        return replicas.status()
+
+    @app.get("/cache/stats")
+    def cache_stats():
+        """Response cache hit/miss counters for the worker that answers, plus backend stats."""
+        return response_cache.stats()
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        """Request, SQL and pool metrics in Prometheus text format (all workers, with METRICS_DIR)."""
+        if not metrics.enabled:
+            abort(404)
+        return metrics.response()
 
     if app.config.get("AUTO_CREATE_TABLES", False):
         with app.app_context():
             db.create_all()
 
-    return app
-
+    # After create_all so a fresh DB has the version table before the first load.
+    if not snapshot_mode:
+        match_index.init_app(app, db)
+        search_index.init_app(app, db)
+        composer.init_app(app, db)
+        response_cache.init_app(app, router=replicas)
+        coalescer.init_app(app, router=replicas)
+        replicas.init_app(app, db, metrics=metrics)
+        write_behind.init_app(app, db, on_write=note_write, metrics=metrics)
+        metrics.add_collector(lambda: pool_samples(db.engine, "primary"))
+        metrics.add_collector(response_cache.samples)
+        metrics.add_collector(write_behind.samples)
+        metrics.add_collector(coalescer.samples)
+        metrics.add_collector(replicas.samples)
 
+    return app
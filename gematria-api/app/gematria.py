@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import struct
 import unicodedata
+from typing import Iterable, Iterator
 
 # Standard (Mispar Hechrechi) gematria values.
 _GEMATRIA_VALUES: dict[str, int] = {
@@ -41,6 +43,32 @@ def _is_hebrew_letter(ch: str) -> bool:
     return 0x0590 <= code <= 0x05FF
 
 
+class _NormalizeTable(dict):
+    """
+    `str.translate` table for `normalize_phrase`: whitespace -> " ", gematria
+    letters -> themselves, everything else (marks, punctuation, Latin, ...) deleted.
+
+    The Hebrew block, ASCII and Latin-1 are filled in up front; any other code
+    point is classified on first sight and cached, so repeated input never leaves C.
+    """
+
+    def __missing__(self, code: int) -> str | None:
+        ch = chr(code)
+        if ch.isspace():
+            out: str | None = " "
+        elif _is_hebrew_letter(ch) and ch in _GEMATRIA_VALUES:
+            out = ch
+        else:
+            out = None
+        self[code] = out
+        return out
+
+
+_NORMALIZE_TABLE = _NormalizeTable()
+for _code in (*range(0x0000, 0x0100), *range(0x0590, 0x0600)):
+    _NORMALIZE_TABLE[_code]  # __missing__ fills the entry in
+
+
 def normalize_phrase(phrase: str) -> str:
     """
     Normalize a user-supplied phrase for gematria computation.
@@ -49,37 +77,165 @@ def normalize_phrase(phrase: str) -> str:
     - Unicode-normalizes (NFKC)
     - Removes Hebrew diacritics/marks (niqqud, cantillation)
     - Removes punctuation/symbols and keeps only Hebrew letters (plus spaces)
+
+    NFKC is skipped when the input is already normalized (plain Hebrew always is);
+    marks, punctuation and non-Hebrew characters are all dropped by one
+    `str.translate` pass, since none of them is whitespace or a gematria letter.
+    tests/test_gematria.py checks it against the original per-character
+    implementation.
     """
     if phrase is None:
         return ""
 
-    # Canonicalize and trim.
-    s = unicodedata.normalize("NFKC", str(phrase)).strip()
+    s = str(phrase)
+    if not unicodedata.is_normalized("NFKC", s):
+        s = unicodedata.normalize("NFKC", s)
+    return s.strip().translate(_NORMALIZE_TABLE)
 
-    # Drop combining marks (niqqud/cantillation are category "Mn"/"Mc").
-    s = "".join(ch for ch in s if not unicodedata.category(ch).startswith("M"))
 
-    # Keep only Hebrew letters and spaces.
-    out: list[str] = []
-    for ch in s:
-        if ch.isspace():
-            out.append(" ")
-            continue
-        if not _is_hebrew_letter(ch):
-            continue
-        if ch in _GEMATRIA_VALUES:
-            out.append(ch)
-    return "".join(out)
+def is_hebrew_text(phrase: str) -> bool:
+    """
+    True if `phrase` has at least one gematria letter and, after NFKC, nothing but
+    Hebrew-block characters (letters, niqqud, cantillation, maqaf, ...) and whitespace.
+    """
+    s = unicodedata.normalize("NFKC", phrase)
+    return any(ch in _GEMATRIA_VALUES for ch in s) and all(ch.isspace() or _is_hebrew_letter(ch) for ch in s)
+
+
+def lookup_key(phrase: str) -> str:
+    """
+    Key used to find a stored phrase regardless of niqqud, cantillation,
+    punctuation or spacing: `normalize_phrase` with runs of spaces collapsed.
+
+    Phrases with no Hebrew letters at all key on their trimmed text, so they
+    don't all collapse onto the empty key.
+    """
+    key = " ".join(normalize_phrase(phrase).split())
+    if key:
+        return key
+    return "" if phrase is None else str(phrase).strip()
 
 
-def compute_gematria(phrase: str) -> int:
+def compute_gematria(phrase: str, method: str = "standard") -> int:
     """
-    Compute standard gematria (Mispar Hechrechi) for a Hebrew phrase.
+    Compute gematria for a Hebrew phrase; `method` is one of GEMATRIA_METHODS.
 
     Example:
       compute_gematria("שלום") == 376
+      compute_gematria("שלום", "gadol") == 936
     """
+    try:
+        table = _METHOD_VALUES[method]
+    except KeyError:
+        raise ValueError(f"Unknown gematria method: {method!r}") from None
     normalized = normalize_phrase(phrase)
-    return sum(_GEMATRIA_VALUES.get(ch, 0) for ch in normalized)
+    return sum(map(table.__getitem__, normalized.replace(" ", "")))
+
+
+def compute_gematria_many(phrases: Iterable[str]) -> Iterator[int]:
+    """
+    Compute standard gematria for many phrases; yields one value per input, in order.
+
+    Same result as `compute_gematria` for every phrase, but skips work that can't
+    change the sum: marks and non-Hebrew characters never have a value, so only
+    NFKC (which maps presentation forms like U+FB2E to plain letters) is needed,
+    and it's skipped entirely for input that is already NFKC. The per-character
+    lookup runs in C via `map`/`filter` instead of a Python loop.
+
+    On the phrases in gematria_entries.dump this takes ~1 us per phrase versus
+    ~2 us for `compute_gematria` in a loop (CPython 3.11).
+    """
+    get = _GEMATRIA_VALUES.get
+    is_normalized = unicodedata.is_normalized
+    normalize = unicodedata.normalize
+    for phrase in phrases:
+        s = "" if phrase is None else str(phrase)
+        if not is_normalized("NFKC", s):
+            s = normalize("NFKC", s)
+        yield sum(filter(None, map(get, s)))
 
 
+# Every supported method; "standard" is Mispar Hechrechi (the `value` column).
+GEMATRIA_METHODS = ("standard", "gadol", "katan", "siduri", "atbash")
+
+_LETTERS = "אבגדהוזחטיכלמנסעפצקרשת"
+_FINAL_BASE = {"ך": "כ", "ם": "מ", "ן": "נ", "ף": "פ", "ץ": "צ"}
+
+
+def _method_table(letter_value) -> dict[str, int]:
+    """Table for all 27 letter forms; final forms take their base letter's value."""
+    table = {ch: letter_value(i, ch) for i, ch in enumerate(_LETTERS)}
+    table.update({final: table[base] for final, base in _FINAL_BASE.items()})
+    return table
+
+
+def _katan(value: int) -> int:
+    while value >= 10:
+        value //= 10
+    return value
+
+
+_METHOD_VALUES: dict[str, dict[str, int]] = {
+    "standard": _GEMATRIA_VALUES,
+    # Mispar Gadol: final forms continue the hundreds (ך=500 ... ץ=900).
+    "gadol": {**_GEMATRIA_VALUES, "ך": 500, "ם": 600, "ן": 700, "ף": 800, "ץ": 900},
+    # Mispar Katan: the value without zeros (י=1, ק=1, ת=4).
+    "katan": _method_table(lambda i, ch: _katan(_GEMATRIA_VALUES[ch])),
+    # Mispar Siduri: position in the alphabet (א=1 ... ת=22).
+    "siduri": _method_table(lambda i, ch: i + 1),
+    # Atbash: each letter takes the standard value of its mirror (א<->ת, ב<->ש, ...).
+    "atbash": _method_table(lambda i, ch: _GEMATRIA_VALUES[_LETTERS[-1 - i]]),
+}
+
+# All methods' values for a letter packed into one int (one bit field per method),
+# so a single C-level `sum(map(...))` computes every method at once.
+_FIELD_BITS = 32
+_FIELD_MASK = (1 << _FIELD_BITS) - 1
+_UNPACK = struct.Struct(f"<{len(GEMATRIA_METHODS)}I").unpack
+_PACKED_BYTES = len(GEMATRIA_METHODS) * _FIELD_BITS // 8
+_PACKED_VALUES: dict[str, int] = {
+    ch: sum(_METHOD_VALUES[m][ch] << (_FIELD_BITS * i) for i, m in enumerate(GEMATRIA_METHODS))
+    for ch in _GEMATRIA_VALUES
+}
+# Longer inputs could overflow a field (max letter value 900); they take the slow path.
+_PACKED_MAX_LEN = _FIELD_MASK // 900
+
+
+def compute_all_many(phrases: Iterable[str]) -> Iterator[tuple[int, ...]]:
+    """
+    Compute every method for many phrases in one pass per phrase; yields one
+    tuple per input, ordered like GEMATRIA_METHODS.
+
+    Same normalization shortcuts as `compute_gematria_many`.
+    """
+    get = _PACKED_VALUES.get
+    is_normalized = unicodedata.is_normalized
+    normalize = unicodedata.normalize
+    tables = [_METHOD_VALUES[m] for m in GEMATRIA_METHODS]
+    for phrase in phrases:
+        s = "" if phrase is None else str(phrase)
+        if not is_normalized("NFKC", s):
+            s = normalize("NFKC", s)
+        if len(s) <= _PACKED_MAX_LEN:
+            yield _UNPACK(sum(filter(None, map(get, s))).to_bytes(_PACKED_BYTES, "little"))
+        else:
+            yield tuple(sum(filter(None, map(t.get, s))) for t in tables)
+
+
+def compute_all(phrase: str) -> dict[str, int]:
+    """{method: value} for every method in GEMATRIA_METHODS."""
+    return dict(zip(GEMATRIA_METHODS, next(compute_all_many([phrase]))))
+
+
+def method_column(method: str) -> str:
+    """public.gematria_entries column holding `method`'s value."""
+    return "value" if method == "standard" else f"value_{method}"
+
+
+def method_columns(phrase: str) -> dict[str, int]:
+    """
+    Values for the derived method columns (every method except "standard",
+    whose `value` is supplied by the writer), keyed by column name.
+    """
+    values = next(compute_all_many([phrase]))
+    return {method_column(m): v for m, v in zip(GEMATRIA_METHODS, values) if m != "standard"}
@@ -0,0 +1,236 @@
+"""Streaming bulk ingest: parse NDJSON/CSV incrementally and load via Postgres COPY.
+
+Rows are staged into a temp table with `COPY ... FROM STDIN` and merged into
+public.gematria_entries with one set-based upsert, so memory stays bounded by the
+COPY buffer regardless of payload size.
+
+Only needs a psycopg2 cursor (no Flask), so offline loaders can reuse it.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import itertools
+import json
+import time
+from typing import IO, Iterable, Iterator
+
+from .gematria import GEMATRIA_METHODS, compute_all_many, lookup_key, method_column
+
+# Rows are (line_no, phrase, value); line_no orders duplicates so the last one wins.
+Row = tuple[int, str, int]
+# A Row plus what COPY derives from the phrase: its lookup key and every method's
+# value (GEMATRIA_METHODS order). See `prepare_rows`.
+PreparedRow = tuple[int, str, int, str, tuple[int, ...]]
+
+
+class IngestError(ValueError):
+    """A malformed input line; carries the 1-based line number."""
+
+    def __init__(self, line_no: int, message: str) -> None:
+        super().__init__(f"line {line_no}: {message}")
+        self.line_no = line_no
+
+
+def _coerce(line_no: int, phrase, value) -> tuple[str, int] | None:
+    if not isinstance(phrase, str):
+        raise IngestError(line_no, "phrase must be a string")
+    phrase = phrase.strip()
+    if not phrase:
+        return None
+    if isinstance(value, bool):
+        raise IngestError(line_no, "value must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise IngestError(line_no, "value must be an integer") from None
+    return phrase, value
+
+
+def iter_ndjson_rows(stream: IO[bytes]) -> Iterator[Row]:
+    """Parse `{"phrase": ..., "value": ...}` objects, one per line. Blank lines are skipped."""
+    for line_no, raw in enumerate(stream, start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            obj = json.loads(raw)
+        except ValueError as e:
+            raise IngestError(line_no, f"invalid JSON ({e})") from None
+        if not isinstance(obj, dict) or "phrase" not in obj or "value" not in obj:
+            raise IngestError(line_no, 'expected an object with "phrase" and "value"')
+        row = _coerce(line_no, obj["phrase"], obj["value"])
+        if row is not None:
+            yield (line_no, *row)
+
+
+def iter_csv_rows(stream: IO[bytes]) -> Iterator[Row]:
+    """Parse `phrase,value` rows; an optional `phrase,value` header line is skipped."""
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    for line_no, record in enumerate(csv.reader(text_stream), start=1):
+        if not record:
+            continue
+        if line_no == 1 and [c.strip().lower() for c in record[:2]] == ["phrase", "value"]:
+            continue
+        if len(record) < 2:
+            raise IngestError(line_no, "expected phrase,value")
+        row = _coerce(line_no, record[0], record[1].strip())
+        if row is not None:
+            yield (line_no, *row)
+
+
+def copy_escape(s: str) -> str:
+    """Escape a value for COPY text format (backslash, tab, newline and CR)."""
+    return s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+# Derived per-method columns (value_gadol, ...); `value` itself comes from the input.
+_DERIVED_INDEXES = [i for i, m in enumerate(GEMATRIA_METHODS) if m != "standard"]
+_DERIVED_COLUMNS = [method_column(GEMATRIA_METHODS[i]) for i in _DERIVED_INDEXES]
+
+
+def phrase_columns(phrases: list[str]) -> list[tuple[str, tuple[int, ...]]]:
+    """
+    (lookup key, every method's value) for each phrase: the per-row normalization
+    work of an ingest. Pure CPU, so offline loaders can run it in worker processes.
+    """
+    return [(lookup_key(phrase), values) for phrase, values in zip(phrases, compute_all_many(phrases))]
+
+
+def prepare_rows(rows: Iterable[Row], chunk_rows: int = 5000) -> Iterator[PreparedRow]:
+    """`rows` with `phrase_columns` added, computed `chunk_rows` at a time."""
+    it = iter(rows)
+    while True:
+        batch = list(itertools.islice(it, chunk_rows))
+        if not batch:
+            return
+        columns = phrase_columns([phrase for _line_no, phrase, _value in batch])
+        for (line_no, phrase, value), (key, values) in zip(batch, columns):
+            yield (line_no, phrase, value, key, values)
+
+
+class CopyRowReader(io.RawIOBase):
+    """
+    File-like view of `rows` in COPY text format, produced lazily as psycopg2
+    reads it, so only one buffer's worth of rows is ever materialized.
+
+    psycopg2 turns an exception raised from read() into QueryCanceled, so a
+    parse error is kept in `error` instead and the stream simply ends there.
+    """
+
+    def __init__(self, rows: Iterable[PreparedRow], buffer_rows: int = 5000) -> None:
+        self._rows = iter(rows)
+        self._buffer_rows = buffer_rows
+        self._pending = b""
+        self.count = 0
+        self.error: IngestError | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self) -> None:
+        if self.error is not None:
+            return
+        try:
+            batch = list(itertools.islice(self._rows, self._buffer_rows))
+        except IngestError as e:
+            self.error = e
+            return
+        lines: list[str] = []
+        for line_no, phrase, value, key, all_values in batch:
+            derived = "\t".join(str(all_values[i]) for i in _DERIVED_INDEXES)
+            lines.append(f"{line_no}\t{copy_escape(phrase)}\t{value}\t{copy_escape(key)}\t{derived}\n")
+        self.count += len(lines)
+        self._pending += "".join(lines).encode("utf-8")
+
+    def read(self, size: int | None = -1) -> bytes:
+        if not self._pending:
+            self._fill()
+        if size is None or size < 0:
+            size = len(self._pending)
+        out, self._pending = self._pending[:size], self._pending[size:]
+        return out
+
+    def readline(self, size: int | None = -1, /) -> bytes:
+        # psycopg2 only calls read() for COPY FROM, but RawIOBase requires this.
+        return self.read(size)
+
+
+_STAGE_TABLE = "gematria_ingest_stage"
+
+_CREATE_STAGE_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} (
+    line_no bigint NOT NULL,
+    phrase text NOT NULL,
+    value integer NOT NULL,
+    phrase_key text NOT NULL,
+    {", ".join(f"{c} integer NOT NULL" for c in _DERIVED_COLUMNS)}
+) ON COMMIT DROP
+"""
+
+# Everything but `phrase` is refreshed on conflict.
+_UPDATED_COLUMNS = ["value", "phrase_key", *_DERIVED_COLUMNS]
+_STAGE_COLUMNS = ", ".join(["phrase", *_UPDATED_COLUMNS])
+_COPY_SQL = f"COPY {_STAGE_TABLE} (line_no, {_STAGE_COLUMNS}) FROM STDIN"
+
+# Last occurrence of a phrase wins (same as PUT /entries/by-phrase/bulk); rows that
+# are unchanged (value and derived columns) are skipped so re-imports don't rewrite
+# the whole table.
+_MERGE_SQL = f"""
+INSERT INTO public.gematria_entries ({_STAGE_COLUMNS})
+SELECT DISTINCT ON (phrase) {_STAGE_COLUMNS}
+FROM {_STAGE_TABLE}
+ORDER BY phrase, line_no DESC
+ON CONFLICT (phrase) DO UPDATE SET {", ".join(f"{c} = EXCLUDED.{c}" for c in _UPDATED_COLUMNS)}
+WHERE ({", ".join(f"public.gematria_entries.{c}" for c in _UPDATED_COLUMNS)})
+    IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in _UPDATED_COLUMNS)})
+"""
+
+_UNIQUE_SQL = f"SELECT COUNT(DISTINCT phrase) FROM {_STAGE_TABLE}"
+
+
+def copy_upsert(cursor, rows: Iterable[Row]) -> dict:
+    """
+    Stage `rows` with COPY and merge them into public.gematria_entries.
+
+    Runs in the cursor's current transaction; the caller commits or rolls back.
+    A parse error in `rows` raises IngestError before anything is merged; the
+    rows staged so far stay in the temp table until the caller rolls back.
+
+    Returns {"requested", "unique", "upserted", "seconds", "rows_per_sec"} where
+    `upserted` counts inserted rows plus rows whose value changed.
+    """
+    return copy_upsert_prepared(cursor, prepare_rows(rows))
+
+
+def copy_upsert_prepared(cursor, rows: Iterable[PreparedRow]) -> dict:
+    """`copy_upsert` for rows whose `phrase_columns` the caller already computed."""
+    started = time.perf_counter()
+
+    cursor.execute(_CREATE_STAGE_SQL)
+    reader = CopyRowReader(rows)
+    try:
+        cursor.copy_expert(_COPY_SQL, reader, size=65536)
+    except Exception:
+        # COPY failed after the reader stopped early: the parse error is the real cause.
+        if reader.error is not None:
+            raise reader.error from None
+        raise
+    if reader.error is not None:
+        raise reader.error
+
+    cursor.execute(_UNIQUE_SQL)
+    unique = int(cursor.fetchone()[0])
+    cursor.execute(_MERGE_SQL)
+    upserted = int(cursor.rowcount or 0)
+    cursor.execute(f"TRUNCATE {_STAGE_TABLE}")
+
+    seconds = time.perf_counter() - started
+    return {
+        "requested": reader.count,
+        "unique": unique,
+        "upserted": upserted,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(reader.count / seconds, 1) if seconds > 0 else 0.0,
+    }
@@ -0,0 +1,207 @@
+"""In-process value -> phrases index used to answer GET /matches without a DB round trip.
+
+Each worker keeps its own copy of public.gematria_entries grouped by value. Writes
+handled by this worker are applied in place (write-through); writes made by other
+workers or processes are detected through public.gematria_data_version and trigger
+a full reload. Versions are checked and the table loaded on the primary, never a
+read replica: a lagging replica would move the index back past writes it has seen.
+
+Phrases inside a bucket are sorted by code point, the same order as the DB's
+`ORDER BY phrase COLLATE "C"` used by /matches.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .data_version import read_data_version
+
+log = logging.getLogger(__name__)
+
+_LOAD_SQL = text("SELECT id, phrase, value FROM public.gematria_entries")
+
+
+class _Bucket:
+    """Phrases for one value, sorted, with their ids in a parallel compact array."""
+
+    __slots__ = ("phrases", "ids")
+
+    def __init__(self) -> None:
+        self.phrases: list[str] = []
+        self.ids = array("q")
+
+    def insert(self, entry_id: int, phrase: str) -> None:
+        i = bisect_left(self.phrases, phrase)
+        self.phrases.insert(i, phrase)
+        self.ids.insert(i, entry_id)
+
+    def remove(self, entry_id: int) -> None:
+        i = self.ids.index(entry_id)
+        del self.phrases[i]
+        del self.ids[i]
+
+
+class MatchIndex:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.check_seconds = 2.0
+
+        self._lock = threading.Lock()
+        self._buckets: dict[int, _Bucket] = {}
+        self._value_by_id: dict[int, int] = {}
+        self._version: int | None = None
+        self._loaded = False
+        self._stale = False
+        self._checked_at = 0.0
+        self._db = None
+
+    def init_app(self, app, db) -> None:
+        self.enabled = bool(app.config.get("MATCH_INDEX_ENABLED", False))
+        self.check_seconds = float(app.config.get("MATCH_INDEX_CHECK_SECONDS", 2.0))
+        self._db = db
+        if not self.enabled:
+            return
+        with app.app_context():
+            try:
+                with db.engine.connect() as conn:
+                    self.load(conn)
+            except (OperationalError, ProgrammingError) as e:
+                # Serve from the DB until the first successful load.
+                log.warning("match index not loaded at startup: %s", e)
+
+    def load(self, conn) -> None:
+        """(Re)build the whole index from public.gematria_entries, read through `conn`."""
+        version = read_data_version(conn)
+        if version is None:
+            # Without the counter we can't see other workers' writes; don't serve stale data.
+            log.warning("public.gematria_data_version missing; match index disabled")
+            self.enabled = False
+            return
+
+        # Read the version before the rows: a concurrent write makes us look older
+        # than we are, which only costs an extra reload.
+        grouped: dict[int, list[tuple[str, int]]] = {}
+        value_by_id: dict[int, int] = {}
+        for entry_id, phrase, value in conn.execute(_LOAD_SQL):
+            grouped.setdefault(value, []).append((phrase, entry_id))
+            value_by_id[entry_id] = value
+
+        buckets: dict[int, _Bucket] = {}
+        for value, rows in grouped.items():
+            rows.sort()
+            bucket = _Bucket()
+            bucket.phrases = [p for p, _ in rows]
+            bucket.ids = array("q", (i for _, i in rows))
+            buckets[value] = bucket
+
+        with self._lock:
+            self._buckets = buckets
+            self._value_by_id = value_by_id
+            self._version = version
+            self._loaded = True
+            self._stale = False
+            self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if self._loaded and not self._stale and now - self._checked_at < self.check_seconds:
+            return
+        # The primary, not db.session: in a read-only request that may be a lagging replica.
+        assert self._db is not None
+        with self._db.engine.connect() as conn:
+            if self._loaded and not self._stale:
+                version = read_data_version(conn)
+                self._checked_at = now
+                if version == self._version:
+                    return
+            self.load(conn)
+
+    def lookup(self, value: int, limit: int, after: str | None = None) -> list[tuple[int, str]] | None:
+        """
+        Return up to `limit` (id, phrase) pairs for `value` with phrase > `after`,
+        or None if the index can't answer (disabled) and the caller should query the DB.
+        """
+        if not self.enabled:
+            return None
+        self._ensure_fresh()
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            bucket = self._buckets.get(value)
+            if bucket is None:
+                return []
+            start = bisect_right(bucket.phrases, after) if after is not None else 0
+            end = start + limit
+            return list(zip(bucket.ids[start:end], bucket.phrases[start:end]))
+
+    def lookup_many(self, values: Iterable[int], limit: int) -> list[tuple[int, list[tuple[int, str]]]] | None:
+        """
+        Like `lookup` for several values at once: (value, [(id, phrase), ...]) for
+        each of `values` (ascending, unique) that has entries, or None if disabled.
+        """
+        if not self.enabled:
+            return None
+        self._ensure_fresh()
+        if not self.enabled:
+            return None
+
+        out: list[tuple[int, list[tuple[int, str]]]] = []
+        with self._lock:
+            for value in values:
+                bucket = self._buckets.get(value)
+                if bucket is not None:
+                    out.append((value, list(zip(bucket.ids[:limit], bucket.phrases[:limit]))))
+        return out
+
+    def apply(
+        self,
+        version: int | None,
+        upserted: Iterable[tuple[int, str, int]] = (),
+        deleted: Iterable[int] = (),
+    ) -> None:
+        """
+        Apply a committed write made by this worker.
+
+        `version` is what `bump_data_version()` returned for the write (None if
+        nothing was written); if it isn't exactly one past the loaded version,
+        someone else wrote in between and the index is reloaded on the next lookup.
+        """
+        if not self.enabled or version is None:
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            for entry_id in deleted:
+                self._remove(entry_id)
+            for entry_id, phrase, value in upserted:
+                self._remove(entry_id)
+                self._buckets.setdefault(value, _Bucket()).insert(entry_id, phrase)
+                self._value_by_id[entry_id] = value
+
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+            else:
+                self._stale = True
+
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup (e.g. after a bulk load too large to apply row by row)."""
+        with self._lock:
+            self._stale = True
+
+    def _remove(self, entry_id: int) -> None:
+        value = self._value_by_id.pop(entry_id, None)
+        if value is None:
+            return
+        bucket = self._buckets[value]
+        bucket.remove(entry_id)
+        if not bucket.phrases:
+            del self._buckets[value]
@@ -0,0 +1,352 @@
+"""Request, DB query and connection-pool metrics, served at GET /metrics in Prometheus text format.
+
+Every worker records into plain in-process dicts (one lock, a bisect per
+observation). With several gunicorn workers, set METRICS_DIR. Each worker then
+writes its totals to METRICS_DIR/metrics-<pid>.json every METRICS_FLUSH_SECONDS
+from a background thread, and /metrics merges all files in the directory:
+
+- counters and histograms are summed, including workers that have exited
+- gauges get a `pid` label and are only reported for live workers
+
+Clear METRICS_DIR when the server (re)starts, as with prometheus_client's
+multiprocess mode.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from flask import Response, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (name, type, help, labels, value) samples produced at flush/render time.
+Sample = tuple[str, str, str, dict, float]
+
+
+def _route() -> str:
+    # The URL rule, not the path, so label cardinality stays bounded.
+    if not has_request_context():
+        return ""
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def _statement_kind(statement: str) -> str:
+    head = statement.lstrip()[:16].split(None, 1)
+    return head[0].lower() if head else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs)
+    return "{" + body + "}" if body else ""
+
+
+def _number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited (including connecting)."""
+
+    # Set by Metrics.init_app.
+    observer: Metrics | None = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if self.observer is not None:
+                self.observer.observe("gematria_db_pool_checkout_seconds", (), time.perf_counter() - started)
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.directory = ""
+        self.flush_seconds = 1.0
+
+        self._lock = threading.Lock()
+        # name -> (type, help, label names, buckets or None)
+        self._meta: dict[str, tuple[str, str, tuple[str, ...], tuple[float, ...] | None]] = {}
+        # name -> label values -> [bucket counts..., sum, count]
+        self._series: dict[str, dict[tuple, list[float]]] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+        self._app = None
+        self._flush_lock = threading.Lock()
+        self._flusher_pid: int | None = None
+        self._engine_hooks = False
+
+        self.histogram(
+            "gematria_http_request_duration_seconds",
+            "Request latency (until the response headers, for streamed bodies).",
+            ("route", "method", "status"),
+            LATENCY_BUCKETS,
+        )
+        self.histogram(
+            "gematria_db_query_duration_seconds",
+            "Latency of each SQL statement.",
+            ("route", "statement"),
+            LATENCY_BUCKETS,
+        )
+        self.histogram(
+            "gematria_db_queries_per_request", "SQL statements run per request.", ("route",), QUERY_COUNT_BUCKETS
+        )
+        self.histogram(
+            "gematria_db_time_per_request_seconds", "Total SQL time per request.", ("route",), LATENCY_BUCKETS
+        )
+        self.histogram(
+            "gematria_db_pool_checkout_seconds",
+            "Time to check a connection out of the pool (waiting or connecting).",
+            (),
+            LATENCY_BUCKETS,
+        )
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...]) -> None:
+        self._meta[name] = ("histogram", help, labels, tuple(buckets))
+        self._series[name] = {}
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Register a callback that returns current (name, type, help, labels, value) samples."""
+        self._collectors.append(collector)
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        if not self.enabled:
+            return
+        buckets = self._meta[name][3]
+        assert buckets is not None, f"{name} is not a histogram"
+        with self._lock:
+            series = self._series[name].get(labels)
+            if series is None:
+                series = self._series[name][labels] = [0.0] * (len(buckets) + 3)
+            # Non-cumulative bucket counts; the last "bucket" is +Inf.
+            series[bisect_left(buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    # -- Flask / SQLAlchemy hooks ---------------------------------------------
+
+    def init_app(self, app) -> None:
+        """Install the hooks; call before db.init_app() so the pool class is picked up."""
+        self.enabled = bool(app.config.get("METRICS_ENABLED", True))
+        self.directory = app.config.get("METRICS_DIR", "")
+        self.flush_seconds = float(app.config.get("METRICS_FLUSH_SECONDS", 1.0))
+        if not self.enabled:
+            return
+        self._app = app
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+        if str(app.config.get("SQLALCHEMY_DATABASE_URI", "")).startswith("postgresql"):
+            options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+            options.setdefault("poolclass", InstrumentedQueuePool)
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+            InstrumentedQueuePool.observer = self
+
+        # Class-level listeners cover every engine, including ones created later.
+        if not self._engine_hooks:
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+            self._engine_hooks = True
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self) -> None:
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_query_seconds = 0.0
+
+    def _after_request(self, response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            route = _route()
+            self.observe(
+                "gematria_http_request_duration_seconds",
+                (route, request.method, str(response.status_code)),
+                time.perf_counter() - started,
+            )
+            self.observe("gematria_db_queries_per_request", (route,), g.pop("metrics_queries", 0))
+            self.observe("gematria_db_time_per_request_seconds", (route,), g.pop("metrics_query_seconds", 0.0))
+        self._ensure_flusher()
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        starts = conn.info.get("metrics_started")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        self.observe("gematria_db_query_duration_seconds", (_route(), _statement_kind(statement)), elapsed)
+        if has_app_context() and "metrics_queries" in g:
+            g.metrics_queries += 1
+            g.metrics_query_seconds += elapsed
+
+    def _samples(self) -> dict:
+        """This worker's metrics as a JSON-able dict (what gets flushed to METRICS_DIR)."""
+        out: dict[str, dict] = {}
+        with self._lock:
+            for name, (kind, help, label_names, buckets) in self._meta.items():
+                out[name] = {
+                    "type": kind,
+                    "help": help,
+                    "buckets": list(buckets) if buckets is not None else None,
+                    "series": [
+                        [list(zip(label_names, labels)), list(values)]
+                        for labels, values in self._series[name].items()
+                    ],
+                }
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:  # a broken collector must not break /metrics
+                log.warning("metrics collector failed: %s", e)
+                continue
+            for name, kind, help, labels, value in samples:
+                entry = out.setdefault(name, {"type": kind, "help": help, "buckets": None, "series": []})
+                entry["series"].append([sorted(labels.items()), [float(value)]])
+        return {"pid": os.getpid(), "metrics": out}
+
+    def flush(self) -> None:
+        """Write this worker's totals to METRICS_DIR (needs an app context for the collectors)."""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with self._flush_lock:
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._samples(), f, separators=(",", ":"))
+                os.replace(tmp, path)
+            except OSError as e:
+                log.warning("could not write %s: %s", path, e)
+
+    def _ensure_flusher(self) -> None:
+        # Started lazily in each worker: threads don't survive gunicorn's fork.
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        # A timer rather than flushing on requests, so an idle worker's last
+        # requests still reach the files.
+        assert self._app is not None
+        while True:
+            time.sleep(self.flush_seconds)
+            with self._app.app_context():
+                self.flush()
+
+    def _all_workers(self) -> list[dict]:
+        if not self.directory:
+            return [self._samples()]
+        self.flush()
+        workers = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    workers.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced or truncated; next scrape gets it
+        return workers
+
+    def render(self) -> str:
+        merged: dict[str, dict] = {}
+        for worker in self._all_workers():
+            pid = worker.get("pid")
+            alive = _pid_alive(pid)
+            for name, entry in worker["metrics"].items():
+                target = merged.setdefault(
+                    name, {"type": entry["type"], "help": entry["help"], "buckets": entry["buckets"], "series": {}}
+                )
+                for labels, values in entry["series"]:
+                    if entry["type"] == "gauge":
+                        if not alive:
+                            continue
+                        labels = [*labels, ["pid", str(pid)]]
+                    key = tuple(tuple(pair) for pair in labels)
+                    current = target["series"].get(key)
+                    if current is None or len(current) != len(values):
+                        target["series"][key] = list(values)
+                    else:
+                        target["series"][key] = [a + b for a, b in zip(current, values)]
+
+        lines: list[str] = []
+        for name in sorted(merged):
+            entry = merged[name]
+            lines.append(f"# HELP {name} {entry['help']}")
+            lines.append(f"# TYPE {name} {entry['type']}")
+            for labels, values in sorted(entry["series"].items()):
+                if entry["type"] != "histogram":
+                    lines.append(f"{name}{_labels(labels)} {_number(values[0])}")
+                    continue
+                cumulative = 0.0
+                for bound, n in zip([*entry["buckets"], float("inf")], values[:-2]):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{_labels([*labels, ('le', le)])} {_number(cumulative)}")
+                lines.append(f"{name}_sum{_labels(labels)} {repr(float(values[-2]))}")
+                lines.append(f"{name}_count{_labels(labels)} {_number(values[-1])}")
+        return "\n".join(lines) + "\n"
+
+    def response(self) -> Response:
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+
+def pool_samples(engine, name: str) -> list[Sample]:
+    """
+    Connection-pool gauges for `engine` (empty unless it uses a QueuePool).
+    `name` ("primary", "replica-1", ...) is the label: /metrics is public, so no URLs.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    labels = {"engine": name}
+    return [
+        ("gematria_db_pool_size", "gauge", "Configured pool size.", labels, pool.size()),
+        ("gematria_db_pool_checked_out", "gauge", "Connections currently checked out.", labels, pool.checkedout()),
+        ("gematria_db_pool_checked_in", "gauge", "Idle connections in the pool.", labels, pool.checkedin()),
+        # QueuePool.overflow() is negative until the pool itself is full.
+        ("gematria_db_pool_overflow", "gauge", "Connections open beyond the pool size.", labels, max(0, pool.overflow())),
+    ]
+
+
+def _pid_alive(pid) -> bool:
+    if not isinstance(pid, int):
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
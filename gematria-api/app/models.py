@@ -1,14 +1,24 @@
 from __future__ import annotations
 
-from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
 
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import Mapped, mapped_column, validates
+
+from .changes import CHANGE_LOG_SQL
 from .extensions import db
+from .gematria import lookup_key, method_columns
 
 
 class GematriaEntry(db.Model):
     """
     Maps to the existing PostgreSQL table:
-      public.gematria_entries(id PK, phrase TEXT UNIQUE, value INT INDEXED)
+      public.gematria_entries(id PK, phrase TEXT UNIQUE, value INT INDEXED, phrase_key TEXT INDEXED,
+                            value_gadol/value_katan/value_siduri/value_atbash INT INDEXED)
+
+    `phrase_key` is `lookup_key(phrase)` and the value_<method> columns are computed
+    from the phrase, all kept in sync whenever `phrase` is set; lookups go through
+    phrase_key so niqqud/punctuation variants still hit.
     """
 
     __tablename__ = "gematria_entries"
@@ -17,5 +27,120 @@ class GematriaEntry(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     phrase: Mapped[str] = mapped_column(db.Text, unique=True, nullable=False)
     value: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    # Nullable until migrations/003_phrase_key.sql + scripts/backfill_phrase_key.py have run.
+    phrase_key: Mapped[str | None] = mapped_column(db.Text, nullable=True)
+    # Other gematria methods (app.gematria.GEMATRIA_METHODS), derived from phrase.
+    # Nullable until migrations/005_method_values.sql + scripts/backfill_method_values.py have run.
+    value_gadol: Mapped[int | None] = mapped_column(db.Integer, nullable=True)
+    value_katan: Mapped[int | None] = mapped_column(db.Integer, nullable=True)
+    value_siduri: Mapped[int | None] = mapped_column(db.Integer, nullable=True)
+    value_atbash: Mapped[int | None] = mapped_column(db.Integer, nullable=True)
+
+    @validates("phrase")
+    def _sync_phrase_key(self, _key: str, phrase: str) -> str:
+        self.phrase_key = lookup_key(phrase)
+        for column, value in method_columns(phrase).items():
+            setattr(self, column, value)
+        return phrase
+
+
+# Covering index for /matches: one index-only range scan per page, in byte order
+# (COLLATE "C") so keyset cursors don't depend on the server's locale.
+# See migrations/002_value_phrase_index.sql.
+db.Index(
+    "gematria_entries_value_phrase_idx",
+    GematriaEntry.value,
+    GematriaEntry.phrase.collate("C"),
+    postgresql_include=["id"],
+)
+
+db.Index("gematria_entries_phrase_key_idx", GematriaEntry.phrase_key)
+
+# Same covering layout per method, so /matches?method=... is the same index-only scan.
+# See migrations/005_method_values.sql.
+for _column in ("value_gadol", "value_katan", "value_siduri", "value_atbash"):
+    db.Index(
+        f"gematria_entries_{_column}_phrase_idx",
+        getattr(GematriaEntry, _column),
+        GematriaEntry.phrase.collate("C"),
+        postgresql_include=["id"],
+    )
+del _column
+
+# GET /search: byte-order prefix ranges, plus trigram LIKE / nearest-neighbour scans.
+# See migrations/004_search_indexes.sql.
+db.Index("gematria_entries_phrase_key_c_idx", GematriaEntry.phrase_key.collate("C"))
+db.Index(
+    "gematria_entries_phrase_key_trgm_idx",
+    GematriaEntry.phrase_key,
+    postgresql_using="gist",
+    postgresql_ops={"phrase_key": "gist_trgm_ops"},
+)
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+class DataVersion(db.Model):
+    """
+    Single-row write counter:
+      public.gematria_data_version(id PK, version BIGINT)
+
+    Every write to public.gematria_entries bumps `version` in the same transaction,
+    so per-worker caches can tell when another process changed the table.
+    """
+
+    __tablename__ = "gematria_data_version"
+    __table_args__ = {"schema": "public"}
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(db.BigInteger, nullable=False, default=0)
+
+
+class GematriaChange(db.Model):
+    """
+    Change log, appended to by triggers on public.gematria_entries:
+      public.gematria_changes(seq BIGSERIAL PK, op TEXT, entry_id INT, phrase TEXT, value INT,
+                              changed_at TIMESTAMPTZ)
+
+    See app/changes.py and migrations/006_change_log.sql.
+    """
+
+    __tablename__ = "gematria_changes"
+    __table_args__ = (
+        db.CheckConstraint("op IN ('insert', 'update', 'delete')", name="gematria_changes_op_check"),
+        {"schema": "public"},
+    )
+
+    seq: Mapped[int] = mapped_column(db.BigInteger, primary_key=True)
+    op: Mapped[str] = mapped_column(db.Text, nullable=False)
+    entry_id: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    phrase: Mapped[str] = mapped_column(db.Text, nullable=False)
+    value: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(
+        db.DateTime(timezone=True), nullable=False, server_default=db.func.now()
+    )
+
+
+class ChangeLogPruned(db.Model):
+    """
+    Single-row watermark, maintained by triggers on public.gematria_changes:
+      public.gematria_changes_pruned(id PK, seq BIGINT)
+
+    `seq` is the newest change deleted or truncated from the log.
+    """
+
+    __tablename__ = "gematria_changes_pruned"
+    __table_args__ = (
+        db.CheckConstraint("id = 1", name="gematria_changes_pruned_id_check"),
+        {"schema": "public"},
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    seq: Mapped[int] = mapped_column(db.BigInteger, nullable=False)
 
 
+# After all tables exist: the triggers reference all three tables.
+event.listen(db.metadata, "after_create", DDL(CHANGE_LOG_SQL).execute_if(dialect="postgresql"))
@@ -0,0 +1,51 @@
+"""Opaque keyset cursors for paginated /matches responses."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+
+from flask import abort
+
+NEXT_CURSOR_HEADER_DOC = {
+    "X-Next-Cursor": {
+        "description": "Pass as `cursor` to fetch the next page; absent on the last page.",
+        "schema": {"type": "string"},
+    }
+}
+
+
+def encode_cursor(value: int, phrase: str, method: str = "standard") -> str:
+    data = {"v": value, "a": phrase}
+    if method != "standard":
+        data["m"] = method
+    raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+class CursorError(ValueError):
+    pass
+
+
+def parse_cursor(cursor: str, value: int, method: str = "standard") -> str:
+    """Return the `after` phrase stored in an opaque /matches cursor (CursorError if invalid)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw.decode("utf-8"))
+        after = data["a"]
+        cursor_value = data["v"]
+        cursor_method = data.get("m", "standard")
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError):
+        raise CursorError("Invalid cursor") from None
+    if cursor_value != value or cursor_method != method or not isinstance(after, str):
+        raise CursorError("Cursor does not belong to this value")
+    return after
+
+
+def decode_cursor(cursor: str, value: int, method: str = "standard") -> str:
+    """Like `parse_cursor`, but aborts the request with 400 if the cursor is invalid."""
+    try:
+        return parse_cursor(cursor, value, method)
+    except CursorError as e:
+        abort(400, description=str(e))
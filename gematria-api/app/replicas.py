@@ -0,0 +1,350 @@
+"""Read-replica routing (DATABASE_REPLICA_URLS).
+
+Read-only requests go round-robin to the replicas; everything else, and every
+request made outside a request context (startup loads, write-behind, the health
+probe), uses DATABASE_URL. GET and HEAD requests are read-only, as are view
+methods marked with `@read_only` (POST /matches/multi and friends).
+
+A per-worker background thread probes every replica each REPLICA_CHECK_SECONDS
+and reads its public.gematria_data_version. A replica is ejected when the probe
+(or a request) fails to reach it, or when it has been behind the primary's
+version for longer than REPLICA_MAX_LAG_SECONDS; the next successful probe puts
+it back.
+
+Read-your-writes: a replica only serves a request once it has reached the last
+version this worker wrote, and the version the client sent in
+X-Min-Data-Version (writes return theirs in X-Data-Version). Until then the
+request reads from the primary.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import threading
+import time
+from functools import partial
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from .metrics import LATENCY_BUCKETS, Sample, pool_samples
+
+log = logging.getLogger(__name__)
+
+DATA_VERSION_HEADER = "X-Data-Version"
+MIN_DATA_VERSION_HEADER = "X-Min-Data-Version"
+
+_VERSION_SQL = text("SELECT version FROM public.gematria_data_version WHERE id = 1")
+_UNSET = object()
+
+
+def read_only(func):
+    """Mark a non-GET view method as safe to answer from a replica."""
+    func.replica_safe = True
+    return func
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that binds read-only requests to the replica `router` picks."""
+
+    def __init__(self, db, router=None, **kwargs) -> None:
+        super().__init__(db, **kwargs)
+        self._router = router
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._router is not None:
+            engine = self._router.engine_for_request()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class _Replica:
+    def __init__(self, engine, name: str) -> None:
+        self.engine = engine
+        # `name` labels metrics, which anyone can read; the URL is only logged and shown to admins.
+        self.name = name
+        self.url = engine.url.render_as_string(hide_password=True)
+        self.healthy = False
+        self.reason = "not probed yet"
+        self.version: int | None = None
+        self.behind_since: float | None = None
+        self.probe_seconds: float | None = None
+        self.checked_at = 0.0
+        self.ejections = 0
+
+
+class ReplicaRouter:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.check_seconds = 1.0
+        self.max_lag_seconds = 30.0
+
+        self._lock = threading.Lock()
+        self._replicas: list[_Replica] = []
+        self._next = itertools.count()
+        self._written_version = 0
+        self._primary_version: int | None = None
+        # target name ("primary" or "replica-N") -> requests routed there
+        self._reads: dict[str, int] = {}
+        self._thread_pid: int | None = None
+        self._app = None
+        self._db = None
+
+    def init_app(self, app, db, metrics=None) -> None:
+        """Create one engine per replica (with the primary's engine options); call after db.init_app()."""
+        urls = list(app.config.get("DATABASE_REPLICA_URLS") or [])
+        self.check_seconds = float(app.config.get("REPLICA_CHECK_SECONDS", 1.0))
+        self.max_lag_seconds = float(app.config.get("REPLICA_MAX_LAG_SECONDS", 30.0))
+        self.enabled = bool(urls)
+        if not self.enabled:
+            return
+        self._app = app
+        self._db = db
+        options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+        self._replicas = [_Replica(create_engine(url, **options), f"replica-{i}") for i, url in enumerate(urls, 1)]
+        for replica in self._replicas:
+            event.listen(replica.engine, "handle_error", partial(self._on_error, replica))
+
+        if metrics is not None and metrics.enabled:
+            metrics.histogram(
+                "gematria_db_target_query_duration_seconds",
+                "Latency of each SQL statement, by database (primary or replica-N).",
+                ("target",),
+                LATENCY_BUCKETS,
+            )
+            with app.app_context():
+                self._time_queries(db.engine, "primary", metrics)
+            for replica in self._replicas:
+                self._time_queries(replica.engine, replica.name, metrics)
+        app.after_request(self._after_request)
+
+    # -- routing ----------------------------------------------------------------
+
+    def engine_for_request(self):
+        """The replica engine for the current request, or None for the primary."""
+        if not self.enabled or not has_request_context():
+            return None
+        # Chosen once per request, so all of its statements see the same database.
+        replica = g.get("db_replica", _UNSET)
+        if replica is _UNSET:
+            replica = g.db_replica = self._choose()
+        return replica.engine if replica is not None else None
+
+    def request_target(self) -> str:
+        """Where the current request reads from: "primary" or "replica-N"."""
+        replica = g.get("db_replica") if self.engine_for_request() is not None else None
+        return replica.name if replica is not None else "primary"
+
+    def request_version(self) -> int | None:
+        """
+        The data version the current request's replica had at its last probe (it has
+        at least that now), or None when the request reads from the primary.
+        """
+        replica = g.get("db_replica") if self.engine_for_request() is not None else None
+        return replica.version if replica is not None else None
+
+    def note_write(self, version: int | None) -> None:
+        """Call after this worker commits a write; its later reads wait for replicas to catch up."""
+        if not self.enabled or version is None:
+            return
+        with self._lock:
+            self._written_version = max(self._written_version, version)
+        if has_request_context():
+            g.data_version_written = version
+
+    def _choose(self) -> _Replica | None:
+        if not self._read_only_request():
+            return None
+        self._ensure_thread()
+        floor = max(self._written_version, self._client_version())
+        with self._lock:
+            candidates = [r for r in self._replicas if r.healthy and r.version is not None and r.version >= floor]
+            replica = candidates[next(self._next) % len(candidates)] if candidates else None
+            name = replica.name if replica is not None else "primary"
+            self._reads[name] = self._reads.get(name, 0) + 1
+        return replica
+
+    @staticmethod
+    def _read_only_request() -> bool:
+        if request.method in ("GET", "HEAD"):
+            return True
+        if request.endpoint is None:  # no such route; it 404s on the primary
+            return False
+        view = current_app.view_functions.get(request.endpoint)
+        method = getattr(getattr(view, "view_class", None), request.method.lower(), None)
+        return bool(getattr(method, "replica_safe", False))
+
+    @staticmethod
+    def _client_version() -> int:
+        try:
+            return int(request.headers.get(MIN_DATA_VERSION_HEADER, 0))
+        except ValueError:
+            return 0
+
+    def _after_request(self, response):
+        version = g.pop("data_version_written", None)
+        if version is not None:
+            response.headers[DATA_VERSION_HEADER] = str(version)
+        return response
+
+    # -- health -----------------------------------------------------------------
+
+    def check(self) -> None:
+        """Probe the primary's version, then every replica (needs an app context)."""
+        assert self._db is not None
+        try:
+            with self._db.engine.connect() as connection:
+                primary_version = int(connection.execute(_VERSION_SQL).scalar() or 0)
+        except DBAPIError as e:
+            log.debug("replica check: primary version unavailable: %s", e)
+            primary_version = None
+        with self._lock:
+            self._primary_version = primary_version
+
+        for replica in self._replicas:
+            started = time.perf_counter()
+            try:
+                with replica.engine.connect() as connection:
+                    version = int(connection.execute(_VERSION_SQL).scalar() or 0)
+            except DBAPIError as e:
+                self._eject(replica, e.__class__.__name__)
+                continue
+            now = time.monotonic()
+            with self._lock:
+                replica.version = version
+                replica.probe_seconds = time.perf_counter() - started
+                replica.checked_at = now
+                if primary_version is not None and version < primary_version:
+                    replica.behind_since = replica.behind_since or now
+                else:
+                    replica.behind_since = None
+                lagging = replica.behind_since is not None and now - replica.behind_since > self.max_lag_seconds
+            if lagging:
+                self._eject(replica, "lagging")
+            elif not replica.healthy:
+                log.info("replica %s (%s) is back (version %d)", replica.name, replica.url, version)
+                with self._lock:
+                    replica.healthy = True
+                    replica.reason = ""
+
+    def _eject(self, replica: _Replica, reason: str) -> None:
+        with self._lock:
+            was_healthy = replica.healthy
+            replica.healthy = False
+            replica.reason = reason
+            if was_healthy:
+                replica.ejections += 1
+        if was_healthy:
+            log.warning("replica %s (%s) ejected: %s", replica.name, replica.url, reason)
+
+    def _on_error(self, replica: _Replica, context) -> None:
+        # A failed pre-ping only means a stale pooled connection; the pool reconnects.
+        if context.is_pre_ping:
+            return
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self._eject(replica, type(context.original_exception).__name__)
+
+    def _ensure_thread(self) -> None:
+        # Started lazily in each worker: threads don't survive gunicorn's fork.
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            threading.Thread(target=self._run, name="replica-probe", daemon=True).start()
+
+    def _run(self) -> None:
+        assert self._app is not None
+        while True:
+            with self._app.app_context():
+                try:
+                    self.check()
+                except Exception:  # keep probing; replicas stay as last seen
+                    log.exception("replica check failed")
+            time.sleep(self.check_seconds)
+
+    # -- reporting --------------------------------------------------------------
+
+    def _time_queries(self, engine, target: str, metrics) -> None:
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("replica_started", []).append(time.perf_counter())
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get("replica_started")
+            if starts:
+                metrics.observe(
+                    "gematria_db_target_query_duration_seconds", (target,), time.perf_counter() - starts.pop()
+                )
+
+        event.listen(engine, "before_cursor_execute", before)
+        event.listen(engine, "after_cursor_execute", after)
+
+    def status(self) -> dict:
+        """Per-replica health, version and probe latency for this worker (GET /admin/replicas)."""
+        now = time.monotonic()
+        with self._lock:
+            primary_version = self._primary_version
+            replicas = [
+                {
+                    "target": r.name,
+                    "url": r.url,
+                    "healthy": r.healthy,
+                    "reason": r.reason or None,
+                    "data_version": r.version,
+                    "lag_versions": (
+                        max(0, primary_version - r.version)
+                        if primary_version is not None and r.version is not None
+                        else None
+                    ),
+                    "probe_ms": round(r.probe_seconds * 1000, 3) if r.probe_seconds is not None else None,
+                    "checked_seconds_ago": round(now - r.checked_at, 3) if r.checked_at else None,
+                    "ejections": r.ejections,
+                    "reads": self._reads.get(r.name, 0),
+                }
+                for r in self._replicas
+            ]
+            return {
+                "pid": os.getpid(),
+                "primary": {"data_version": primary_version, "reads": self._reads.get("primary", 0)},
+                "written_version": self._written_version,
+                "replicas": replicas,
+            }
+
+    def samples(self) -> list[Sample]:
+        """Replica health, lag and routed reads as /metrics samples."""
+        if not self.enabled:
+            return []
+        with self._lock:
+            primary_version = self._primary_version
+            reads = dict(self._reads)
+            replicas = [(r.name, r.healthy, r.version, r.probe_seconds, r.ejections, r.engine) for r in self._replicas]
+        samples: list[Sample] = [
+            ("gematria_db_reads_total", "counter", "Read-only requests by the database that served them.", {"target": t}, n)
+            for t, n in sorted(reads.items())
+        ]
+        for name, healthy, version, probe_seconds, ejections, engine in replicas:
+            labels = {"target": name}
+            samples.append(("gematria_replica_up", "gauge", "1 if the replica is taking reads.", labels, int(healthy)))
+            samples.append(("gematria_replica_ejections_total", "counter", "Times the replica was ejected.", labels, ejections))
+            if probe_seconds is not None:
+                samples.append(
+                    ("gematria_replica_probe_seconds", "gauge", "Latency of the last health probe.", labels, probe_seconds)
+                )
+            if version is not None and primary_version is not None:
+                samples.append(
+                    (
+                        "gematria_replica_lag_versions",
+                        "gauge",
+                        "Writes the replica is behind the primary (public.gematria_data_version).",
+                        labels,
+                        max(0, primary_version - version),
+                    )
+                )
+            samples.extend(pool_samples(engine, name))
+        return samples
@@ -1,79 +1,719 @@
 from __future__ import annotations
 
-from flask import abort
+import io
+import json
+from typing import Iterable, Iterator
+
+import psycopg2
+from flask import Response, abort, request, stream_with_context
 from flask.views import MethodView
+from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
 
-from .extensions import db
+from .analyze import iter_passage_tokens, iter_text_chunks
+from .changes import ALL_ENTRIES_SQL, CHANGES_SINCE_SQL, LATEST_CHANGE_SQL, PRUNED_UP_TO_SQL, iter_changes
+from .data_version import bump_data_version
+from .extensions import coalescer, composer, db, match_index, replicas, response_cache, search_index, write_behind
+from .engine import PreparedStatement
+from .gematria import (
+    GEMATRIA_METHODS,
+    compute_gematria,
+    compute_gematria_many,
+    is_hebrew_text,
+    lookup_key,
+    method_column,
+    method_columns,
+)
+from .ingest import IngestError, copy_escape, copy_upsert, iter_csv_rows, iter_ndjson_rows
 from .models import GematriaEntry
+from .pagination import NEXT_CURSOR_HEADER_DOC, decode_cursor, encode_cursor
+from .replicas import read_only
 from .schemas import (
+    AnalyzeArgsSchema,
     BulkUpsertResponseSchema,
+    ComposeArgsSchema,
+    ComposeResponseSchema,
+    EntryChangesArgsSchema,
     EntryCreateSchema,
     EntrySchema,
     EntryUpdateSchema,
     EntryUpsertByPhraseSchema,
+    GematriaComputeBatchSchema,
+    GematriaComputeResultSchema,
+    GematriaLookupBatchResponseSchema,
+    GematriaLookupBatchSchema,
     GematriaLookupResponseSchema,
     GematriaQueryArgsSchema,
+    MAX_MATCH_RANGE,
+    MatchGroupSchema,
+    MatchesMultiSchema,
     MatchesQueryArgsSchema,
+    MatchesRangeArgsSchema,
+    PhraseQueryArgsSchema,
+    SearchArgsSchema,
+    SearchResultSchema,
+    StreamIngestResponseSchema,
+)
+from .search import (
+    FUZZY_CANDIDATES_SQL,
+    PREFIX_SQL,
+    SUBSTRING_SQL,
+    fuzzy_candidate_count,
+    like_escape,
+    prefix_upper_bound,
+    rank_fuzzy,
 )
+from .serialization import dumps, iter_json_array, json_response
+from .sources import word_phrase
 
 from flask_smorest import Blueprint
+from flask_smorest import abort as api_abort
 
 
 blp = Blueprint("gematria", __name__, url_prefix="/", description="Gematria endpoints")
 
 
+def note_write(
+    version: int | None,
+    upserted: Iterable[tuple[int, str, int]] = (),
+    deleted: Iterable[int] = (),
+) -> None:
+    """
+    After committing a write: update this worker's match index, response cache,
+    single-flight generation and replica read-your-writes floor. Also called for
+    each write-behind batch.
+    """
+    match_index.apply(version, upserted=upserted, deleted=deleted)
+    response_cache.note_write(version)
+    coalescer.note_write()
+    replicas.note_write(version)
+
+
+# The entry for a user-supplied phrase, found via phrase_key so niqqud, cantillation
+# and punctuation variants still match. An exact phrase match wins; otherwise the
+# oldest entry with the same key. The exact-phrase branch also covers rows whose
+# phrase_key hasn't been backfilled yet.
+_BY_KEY_WHERE = """
+    FROM public.gematria_entries
+    WHERE phrase_key = :key OR phrase = :phrase
+    ORDER BY phrase = :phrase DESC, id
+    LIMIT 1
+"""
+# The hot fixed queries run as server-side prepared statements (app/engine.py).
+_GEMATRIA_LOOKUP = {
+    method: PreparedStatement(
+        f"gematria_lookup_{method}", f"SELECT phrase, {method_column(method)} {_BY_KEY_WHERE}", ("text", "text")
+    )
+    for method in GEMATRIA_METHODS
+}
+_ENTRY_BY_KEY = PreparedStatement("gematria_entry_by_key", f"SELECT id, phrase, value {_BY_KEY_WHERE}", ("text", "text"))
+# One /matches page: an index-only range scan on gematria_entries_value_phrase_idx (or
+# the method's index), after the `after` phrase if given.
+_MATCHES_PAGE = {
+    (method, paged): PreparedStatement(
+        f"gematria_matches_{method}{'_after' if paged else ''}",
+        f"""
+        SELECT id, phrase FROM public.gematria_entries
+        WHERE {method_column(method)} = :value {'AND phrase COLLATE "C" > :after' if paged else ""}
+        ORDER BY phrase COLLATE "C"
+        LIMIT :limit
+        """,
+        ("integer", "text", "integer") if paged else ("integer", "integer"),
+    )
+    for method in GEMATRIA_METHODS
+    for paged in (False, True)
+}
+
+
 @blp.route("/gematria")
 class GematriaLookup(MethodView):
     @blp.arguments(GematriaQueryArgsSchema, location="query")
     @blp.response(200, GematriaLookupResponseSchema)
     def get(self, args):
         phrase = args["phrase"].strip()
+        method = args["method"]
         try:
-            entry = db.session.execute(
-                db.select(GematriaEntry).where(GematriaEntry.phrase == phrase)
-            ).scalar_one_or_none()
+            cached = response_cache.lookup(db.session, "gematria", method, phrase)
+            if cached.hit:
+                body = cached.value
+            else:
+
+                def load():
+                    row = _GEMATRIA_LOOKUP[method].execute(db.session, key=lookup_key(phrase), phrase=phrase).first()
+                    found = None
+                    if row is not None:
+                        stored, value = row
+                        if value is None:
+                            # Row predates migrations/005_method_values.sql and hasn't been backfilled.
+                            value = compute_gematria(stored, method)
+                        found = {"phrase": stored, "value": value, "method": method, "found": True}
+                    # Misses are cached too (None), so repeated unknown phrases skip the DB as well.
+                    cached.store(found)
+                    return found
+
+                # Concurrent identical lookups in this worker share one query.
+                body = coalescer.do(("gematria", method, phrase), load)
         except OperationalError:
             abort(503, description="Database connection failed. Check DATABASE_URL.")
         except ProgrammingError:
             abort(503, description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).")
 
-        if entry is None:
+        if body is None:
+            body = _compute_on_miss(phrase, method)
+        if body is None:
             abort(404, description="Phrase not found")
+        return json_response(body)
+
+
+def _compute_on_miss(phrase: str, method: str) -> dict | None:
+    """
+    With WRITE_BEHIND_ENABLED: the computed value for an unknown phrase (found=false),
+    queuing its lookup_key form (no niqqud or punctuation, single spaces) to be stored.
+    None (404) otherwise, or if the phrase isn't Hebrew text.
+    """
+    if not write_behind.enabled or not is_hebrew_text(phrase):
+        return None
+    key = lookup_key(phrase)
+    value = compute_gematria(key)
+    write_behind.enqueue(key, value)
+    if method != "standard":
+        value = compute_gematria(key, method)
+    return {"phrase": key, "value": value, "method": method, "found": False}
+
+
+# Above this many phrases, stage them in a temp table and join instead of `= ANY(array)`
+# (on the primary only: a hot standby can't create tables, temporary or not).
+_LOOKUP_TEMP_TABLE_THRESHOLD = 5000
+# `phrase = ...` also matches rows whose phrase_key hasn't been backfilled yet.
+_LOOKUP_ANY_SQL = text(
+    """
+    SELECT phrase, value, phrase_key FROM public.gematria_entries
+    WHERE phrase_key = ANY(CAST(:keys AS text[])) OR phrase = ANY(CAST(:phrases AS text[]))
+    ORDER BY id
+    """
+)
+_LOOKUP_JOIN_SQL = """
+SELECT e.id, e.phrase, e.value, e.phrase_key
+FROM gematria_lookup_batch b JOIN public.gematria_entries e ON e.phrase_key = b.phrase_key
+UNION
+SELECT e.id, e.phrase, e.value, e.phrase_key
+FROM gematria_lookup_batch b JOIN public.gematria_entries e ON e.phrase = b.phrase
+ORDER BY 1
+"""
+
+
+def _lookup_values(phrases: list[str]) -> dict[str, tuple[str, int]]:
+    """
+    Return {query phrase: (stored phrase, value)} for the given (unique) phrases
+    that exist, in one query. An exact phrase match wins over a phrase_key match;
+    among key matches the oldest entry wins.
+    """
+    keys = [lookup_key(p) for p in phrases]
+    if len(phrases) <= _LOOKUP_TEMP_TABLE_THRESHOLD or replicas.engine_for_request() is not None:
+        rows = db.session.execute(_LOOKUP_ANY_SQL, {"keys": keys, "phrases": phrases}).all()
+    else:
+        cursor = db.session.connection().connection.cursor()
+        cursor.execute(
+            "CREATE TEMP TABLE gematria_lookup_batch (phrase text NOT NULL, phrase_key text NOT NULL) "
+            "ON COMMIT DROP"
+        )
+        buf = io.StringIO("".join(f"{copy_escape(p)}\t{copy_escape(k)}\n" for p, k in zip(phrases, keys)))
+        cursor.copy_expert("COPY gematria_lookup_batch (phrase, phrase_key) FROM STDIN", buf)
+        cursor.execute(_LOOKUP_JOIN_SQL)
+        rows = [row[1:] for row in cursor.fetchall()]
+        cursor.execute("DROP TABLE gematria_lookup_batch")
+
+    by_phrase: dict[str, tuple[str, int]] = {}
+    by_key: dict[str, tuple[str, int]] = {}
+    for phrase, value, key in rows:
+        by_phrase[phrase] = (phrase, value)
+        if key is not None:
+            by_key.setdefault(key, (phrase, value))
+
+    found: dict[str, tuple[str, int]] = {}
+    for phrase, key in zip(phrases, keys):
+        hit = by_phrase.get(phrase) or by_key.get(key)
+        if hit is not None:
+            found[phrase] = hit
+    return found
+
+
+@blp.route("/gematria/lookup/batch")
+class GematriaLookupBatch(MethodView):
+    @read_only
+    @blp.arguments(GematriaLookupBatchSchema)
+    @blp.response(200, GematriaLookupBatchResponseSchema)
+    def post(self, payload):
+        """
+        Look up many phrases in one round trip.
+
+        Phrases match like GET /gematria (niqqud/punctuation-insensitive); each found
+        item carries the requested `query` and the stored `phrase`. Found entries and
+        missing phrases are returned separately (each phrase once, in request order).
+        With `compute_missing`, missing phrases carry their computed value; otherwise
+        their `value` is null.
+        """
+        phrases = list(dict.fromkeys(p.strip() for p in payload["phrases"]))
+        try:
+            values = _lookup_values(phrases)
+        except (OperationalError, psycopg2.OperationalError):
+            abort(503, description="Database connection failed. Check DATABASE_URL.")
+        except (ProgrammingError, psycopg2.ProgrammingError):
+            abort(503, description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).")
+
+        found = []
+        missing = []
+        for phrase in phrases:
+            hit = values.get(phrase)
+            if hit is not None:
+                found.append({"query": phrase, "phrase": hit[0], "value": hit[1], "found": True})
+            else:
+                missing.append(phrase)
+
+        if payload["compute_missing"]:
+            missing_out = [{"phrase": p, "value": v} for p, v in zip(missing, compute_gematria_many(missing))]
+        else:
+            missing_out = [{"phrase": p, "value": None} for p in missing]
+        return json_response({"found": found, "missing": missing_out})
+
+
+@blp.route("/gematria/compute/batch")
+class GematriaComputeBatch(MethodView):
+    @blp.arguments(GematriaComputeBatchSchema)
+    @blp.response(200, GematriaComputeResultSchema(many=True))
+    def post(self, payload):
+        """
+        Compute gematria for up to 100k phrases (no DB access, nothing stored).
 
-        return {"phrase": entry.phrase, "value": entry.value, "found": True}
+        The JSON array is streamed back in chunks.
+        """
+        phrases = payload["phrases"]
+        items = (
+            {"phrase": phrase, "value": value}
+            for phrase, value in zip(phrases, compute_gematria_many(phrases))
+        )
+        return Response(iter_json_array(items), mimetype="application/json")
 
 
 @blp.route("/matches")
 class Matches(MethodView):
     @blp.arguments(MatchesQueryArgsSchema, location="query")
-    @blp.response(200, EntrySchema(many=True))
+    @blp.response(
+        200,
+        EntrySchema(many=True),
+        headers=NEXT_CURSOR_HEADER_DOC,
+    )
     def get(self, args):
+        """
+        Entries with the given value, ordered by phrase (byte order), `top` per page.
+
+        Keyset-paginated: every page is one range scan on (value, phrase), so deep
+        pages cost the same as the first. `method` selects which precomputed
+        gematria column `value` is matched against.
+        """
         value = args["value"]
         top = args["top"]
+        method = args["method"]
+        after = decode_cursor(args["cursor"], value, method) if args["cursor"] else args["after"]
 
         try:
-            # Uses the DB index on public.gematria_entries.value.
-            entries = (
-                db.session.execute(
-                    db.select(GematriaEntry)
-                    .where(GematriaEntry.value == value)
-                    .order_by(GematriaEntry.phrase.asc())
-                    .limit(top)
-                )
-                .scalars()
-                .all()
-            )
+            # One extra row tells us whether there is a next page.
+            rows = None
+            if method == "standard":
+                rows = match_index.lookup(value, top + 1, after=after)
+            if rows is None:
+                # The match index already answers from memory; only DB pages go through the cache.
+                cached = response_cache.lookup(db.session, "matches", method, value, top, after)
+                if cached.hit:
+                    rows = [tuple(r) for r in cached.value]
+                else:
+
+                    def load():
+                        if after is None:
+                            result = _MATCHES_PAGE[method, False].execute(db.session, value=value, limit=top + 1)
+                        else:
+                            result = _MATCHES_PAGE[method, True].execute(
+                                db.session, value=value, after=after, limit=top + 1
+                            )
+                        page = [tuple(r) for r in result]
+                        cached.store(page)
+                        return page
+
+                    rows = coalescer.do(("matches", method, value, top, after), load)
         except OperationalError:
             abort(503, description="Database connection failed. Check DATABASE_URL.")
         except ProgrammingError:
             abort(503, description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).")
 
-        return [
-            {"id": e.id, "phrase": e.phrase, "value": e.value, "source": None}
-            for e in entries
+        headers = {}
+        if len(rows) > top:
+            rows = rows[:top]
+            headers["X-Next-Cursor"] = encode_cursor(value, rows[-1][1], method)
+
+        entries = [
+            {"id": entry_id, "phrase": phrase, "value": value, "source": None}
+            for entry_id, phrase in rows
         ]
+        return json_response(entries), 200, headers
+
+
+# One index probe per value (LIMIT per value) on gematria_entries_value_phrase_idx.
+_MATCHES_RANGE_SQL = text(
+    """
+    SELECT v.value, e.id, e.phrase
+    FROM generate_series(CAST(:min AS integer), CAST(:max AS integer)) AS v(value)
+    CROSS JOIN LATERAL (
+        SELECT id, phrase FROM public.gematria_entries
+        WHERE value = v.value
+        ORDER BY phrase COLLATE "C"
+        LIMIT :per_value
+    ) e
+    ORDER BY v.value, e.phrase COLLATE "C"
+    """
+)
+_MATCHES_MULTI_SQL = text(
+    """
+    SELECT v.value, e.id, e.phrase
+    FROM unnest(CAST(:values AS integer[])) AS v(value)
+    CROSS JOIN LATERAL (
+        SELECT id, phrase FROM public.gematria_entries
+        WHERE value = v.value
+        ORDER BY phrase COLLATE "C"
+        LIMIT :per_value
+    ) e
+    ORDER BY v.value, e.phrase COLLATE "C"
+    """
+)
+
+
+def _group_rows(rows: Iterable) -> Iterator[dict]:
+    """Turn (value, id, phrase) rows ordered by value into one group per value."""
+    current = None
+    entries: list[dict] = []
+    for value, entry_id, phrase in rows:
+        if value != current:
+            if entries:
+                yield {"value": current, "entries": entries}
+            current = value
+            entries = []
+        entries.append({"id": entry_id, "phrase": phrase, "value": value, "source": None})
+    if entries:
+        yield {"value": current, "entries": entries}
+
+
+def _cached_groups(cached: list[tuple[int, list[tuple[int, str]]]]) -> Iterator[dict]:
+    """Same groups as `_group_rows`, from `match_index.lookup_many` output."""
+    for value, rows in cached:
+        yield {
+            "value": value,
+            "entries": [{"id": i, "phrase": p, "value": value, "source": None} for i, p in rows],
+        }
+
+
+def _match_groups_response(values: list[int], sql, params: dict) -> Response:
+    """
+    Stream /matches groups for ascending unique `values`, from the in-memory
+    index if enabled, else with one query using a server-side cursor.
+    """
+    conn = None
+    try:
+        cached = match_index.lookup_many(values, params["per_value"])
+        if cached is not None:
+            groups = _cached_groups(cached)
+        else:
+            # A connection of its own rather than the session: the session is closed at
+            # request teardown, which can run before the body is iterated (Flask >= 3.1).
+            conn = (replicas.engine_for_request() or db.engine).connect()
+            result = conn.execution_options(stream_results=True, yield_per=1000).execute(sql, params)
+            groups = _closing(_group_rows(result), conn)
+    except OperationalError:
+        if conn is not None:
+            conn.close()
+        abort(503, description="Database connection failed. Check DATABASE_URL.")
+    except ProgrammingError:
+        if conn is not None:
+            conn.close()
+        abort(503, description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).")
+
+    return Response(stream_with_context(iter_json_array(groups, chunk_size=100)), mimetype="application/json")
+
+
+def _closing(items: Iterator, conn) -> Iterator:
+    """Yield from `items`, then close `conn` (also if the client goes away mid-stream)."""
+    try:
+        yield from items
+    finally:
+        conn.close()
+
+
+@blp.route("/matches/range")
+class MatchesRange(MethodView):
+    @blp.arguments(MatchesRangeArgsSchema, location="query")
+    @blp.response(200, MatchGroupSchema(many=True))
+    def get(self, args):
+        """
+        Matches for every value in [min, max], grouped by value (values with no entries are omitted).
+
+        Up to `per_value` entries per value, ordered like /matches; streamed.
+        """
+        lo, hi = args["min"], args["max"]
+        if hi < lo:
+            abort(400, description="max must be >= min")
+        if hi - lo >= MAX_MATCH_RANGE:
+            abort(400, description=f"Range too wide (at most {MAX_MATCH_RANGE} values)")
+
+        params = {"min": lo, "max": hi, "per_value": args["per_value"]}
+        return _match_groups_response(list(range(lo, hi + 1)), _MATCHES_RANGE_SQL, params)
+
+
+@blp.route("/matches/multi")
+class MatchesMulti(MethodView):
+    @read_only
+    @blp.arguments(MatchesMultiSchema)
+    @blp.response(200, MatchGroupSchema(many=True))
+    def post(self, payload):
+        """
+        Matches for a list of values, grouped by value in ascending order
+        (values with no entries are omitted).
+
+        Up to `per_value` entries per value, ordered like /matches; streamed.
+        """
+        values = sorted(set(payload["values"]))
+        params = {"values": values, "per_value": payload["per_value"]}
+        return _match_groups_response(values, _MATCHES_MULTI_SQL, params)
+
+
+# Words per resolve/match round trip, and how many distinct words/values an
+# /analyze request remembers (for dedup) before starting over.
+_ANALYZE_BATCH_WORDS = 2000
+_ANALYZE_SEEN_MAX = 100_000
+
+
+def _ndjson(obj: dict) -> str:
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+
+def _analyze_lines(tokens: Iterator[tuple[int, str]], per_value: int) -> Iterator[str]:
+    """
+    NDJSON lines for /analyze: one "word" line per token, a "verse" line after
+    each verse and a final "summary". Tokens are handled in batches of
+    _ANALYZE_BATCH_WORDS, with one lookup query and one matches query per
+    batch for the words/values not seen before.
+    """
+    known: dict[str, bool] = {}
+    values: dict[str, int] = {}
+    matched_values: set[int] = set()
+    totals = {"verses": 0, "words": 0, "value": 0}
+    verse_state = {"verse": None, "words": 0, "value": 0}
+
+    def end_verse() -> Iterator[str]:
+        if verse_state["verse"] is not None:
+            totals["verses"] += 1
+            yield _ndjson({"type": "verse", **verse_state})
+
+    def flush(batch: list[tuple[int, str, str]]) -> Iterator[str]:
+        new_phrases = list(dict.fromkeys(p for _v, _t, p in batch if p not in values))
+        if len(values) + len(new_phrases) > _ANALYZE_SEEN_MAX:
+            known.clear()
+            values.clear()
+            matched_values.clear()
+            new_phrases = list(dict.fromkeys(p for _v, _t, p in batch))
+        if new_phrases:
+            values.update(zip(new_phrases, compute_gematria_many(new_phrases)))
+            found = _lookup_values(new_phrases)
+            known.update((p, p in found) for p in new_phrases)
+
+        # Matches for values this request hasn't listed yet ([] if there are none).
+        new_values = sorted({values[p] for _v, _t, p in batch} - matched_values) if per_value else []
+        groups: dict[int, list[dict]] = {v: [] for v in new_values}
+        if new_values:
+            cached = match_index.lookup_many(new_values, per_value)
+            if cached is None:
+                rows = db.session.execute(_MATCHES_MULTI_SQL, {"values": new_values, "per_value": per_value})
+                found_groups = _group_rows(rows)
+            else:
+                found_groups = _cached_groups(cached)
+            for group in found_groups:
+                groups[group["value"]] = [{"id": e["id"], "phrase": e["phrase"]} for e in group["entries"]]
+            matched_values.update(new_values)
+
+        for verse, token, phrase in batch:
+            if verse != verse_state["verse"]:
+                yield from end_verse()
+                verse_state.update(verse=verse, words=0, value=0)
+            value = values[phrase]
+            line = {
+                "type": "word",
+                "verse": verse,
+                "index": verse_state["words"],
+                "token": token,
+                "phrase": phrase,
+                "value": value,
+                "known": known[phrase],
+            }
+            if value in groups:
+                # Listed once per value per request; later words with this value omit it.
+                line["matches"] = groups.pop(value)
+            verse_state["words"] += 1
+            verse_state["value"] += value
+            totals["words"] += 1
+            totals["value"] += value
+            yield _ndjson(line)
+
+    batch: list[tuple[int, str, str]] = []
+    try:
+        for verse, token in tokens:
+            phrase = word_phrase(token)
+            if not phrase:
+                continue
+            batch.append((verse, token, phrase))
+            if len(batch) >= _ANALYZE_BATCH_WORDS:
+                yield from flush(batch)
+                batch = []
+        yield from flush(batch)
+        yield from end_verse()
+    except (OperationalError, ProgrammingError) as e:
+        # Headers are already sent; report in-band and stop.
+        db.session.rollback()
+        yield _ndjson({"type": "error", "message": f"Database error: {e.__class__.__name__}"})
+        return
+    yield _ndjson({"type": "summary", **totals, "unique_words": len(values)})
+
+
+@blp.route("/analyze")
+class Analyze(MethodView):
+    @read_only
+    @blp.arguments(AnalyzeArgsSchema, location="query")
+    @blp.doc(
+        requestBody={
+            "required": True,
+            "content": {
+                "text/plain": {
+                    "schema": {"type": "string"},
+                    "example": "בְּרֵאשִׁית בָּרָא אֱלֹהִים אֵת הַשָּׁמַיִם וְאֵת הָאָרֶץ׃",
+                },
+                "application/json": {
+                    "schema": {"type": "object", "properties": {"text": {"type": "string"}}},
+                },
+            },
+        },
+        responses={200: {"description": "NDJSON stream of word, verse and summary objects"}},
+    )
+    def post(self, args):
+        """
+        Tokenize a Hebrew passage and stream per-word values, known entries and same-value matches.
+
+        A verse ends at a line break or sof pasuq. The plain-text body is read
+        incrementally, so book-length inputs don't need to fit in memory.
+        """
+        if request.mimetype == "application/json":
+            payload = request.get_json(silent=True)
+            if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+                abort(400, description='Expected {"text": "..."}')
+            chunks: Iterable[str] = [payload["text"]]
+        elif request.mimetype in ("text/plain", ""):
+            chunks = iter_text_chunks(request.stream)
+        else:
+            abort(415, description="Send the passage as text/plain (or JSON {\"text\": ...}).")
+
+        lines = _analyze_lines(iter_passage_tokens(chunks), args["per_value"])
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+
+@blp.route("/compose")
+class Compose(MethodView):
+    @blp.arguments(ComposeArgsSchema, location="query")
+    @blp.response(200, ComposeResponseSchema)
+    def get(self, args):
+        """
+        Combinations of `min_words`..`max_words` distinct entries whose values add up to `value`.
+
+        Ranked by fewer words, then by how many phrase combinations each value combination
+        covers. The search stops at the server's time budget (`truncated` is then true).
+        """
+        target = args["value"]
+        if args["max_words"] < args["min_words"]:
+            abort(400, description="max_words must be >= min_words")
+        per_value = args["per_value"]
+
+        try:
+            result = composer.compose(target, args["min_words"], args["max_words"], args["limit"])
+            values = sorted({v for combo in result.combinations for v in combo.values})
+            examples: dict[int, list[dict]] = {}
+            if values and per_value:
+                cached = match_index.lookup_many(values, per_value)
+                if cached is None:
+                    rows = db.session.execute(_MATCHES_MULTI_SQL, {"values": values, "per_value": per_value})
+                    groups = _group_rows(rows)
+                else:
+                    groups = _cached_groups(cached)
+                examples = {group["value"]: group["entries"] for group in groups}
+        except OperationalError:
+            abort(503, description="Database connection failed. Check DATABASE_URL.")
+        except ProgrammingError:
+            abort(503, description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).")
+
+        return {
+            "value": target,
+            "combinations": [
+                {
+                    "values": list(combo.values),
+                    "phrase_combinations": combo.phrase_combinations,
+                    "examples": [
+                        {"value": v, "entries": examples.get(v, [])} for v in sorted(set(combo.values))
+                    ],
+                }
+                for combo in result.combinations
+            ],
+            "truncated": result.truncated,
+            "seconds": round(result.seconds, 4),
+        }
+
+
+@blp.route("/search")
+class Search(MethodView):
+    @blp.arguments(SearchArgsSchema, location="query")
+    @blp.response(200, SearchResultSchema(many=True))
+    def get(self, args):
+        """
+        Find phrases by prefix, substring or edit distance (`mode`), ignoring niqqud and punctuation.
+
+        Prefix/substring results are ordered by phrase; fuzzy results by distance, then phrase.
+        """
+        if not args["q"].strip():
+            abort(400, description="q must not be blank")
+        key = lookup_key(args["q"])
+        mode = args["mode"]
+        limit = args["limit"]
+
+        try:
+            hits = search_index.search(mode, key, limit, args["max_distance"])
+            if hits is None:
+                if mode == "prefix":
+                    params = {"lo": key, "hi": prefix_upper_bound(key), "limit": limit}
+                    hits = [(*row, None) for row in db.session.execute(PREFIX_SQL, params)]
+                elif mode == "substring":
+                    params = {"pattern": f"%{like_escape(key)}%", "limit": limit}
+                    hits = [(*row, None) for row in db.session.execute(SUBSTRING_SQL, params)]
+                else:
+                    params = {"q": key, "candidates": fuzzy_candidate_count(limit)}
+                    candidates = db.session.execute(FUZZY_CANDIDATES_SQL, params).tuples()
+                    hits = rank_fuzzy(key, candidates, args["max_distance"], limit)
+        except OperationalError:
+            abort(503, description="Database connection failed. Check DATABASE_URL.")
+        except ProgrammingError:
+            abort(
+                503,
+                description="Search indexes missing. Apply migrations/003_phrase_key.sql and migrations/004_search_indexes.sql.",
+            )
+
+        return json_response(
+            [
+                {"id": entry_id, "phrase": phrase, "value": value, "distance": distance}
+                for entry_id, phrase, value, distance in hits
+            ]
+        )
 
 
 @blp.route("/entries")
@@ -88,6 +728,7 @@ class Entries(MethodView):
 
         db.session.add(entry)
         try:
+            version = bump_data_version(db.session)
             db.session.commit()
         except OperationalError:
             db.session.rollback()
@@ -99,9 +740,67 @@ class Entries(MethodView):
             db.session.rollback()
             abort(409, description="Phrase already exists")
 
+        note_write(version, upserted=[(entry.id, entry.phrase, entry.value)])
         return {"id": entry.id, "phrase": entry.phrase, "value": entry.value, "source": None}
 
 
+def _change_lines(changes: Iterator[dict], cursor: int) -> Iterator[bytes]:
+    """NDJSON lines for `changes`, then the cursor to resume from."""
+    for change in changes:
+        cursor = change.get("seq", cursor)
+        yield dumps(change) + b"\n"
+    yield dumps({"type": "cursor", "cursor": cursor}) + b"\n"
+
+
+@blp.route("/entries/changes")
+class EntryChanges(MethodView):
+    @blp.arguments(EntryChangesArgsSchema, location="query")
+    @blp.doc(
+        responses={
+            200: {"description": "NDJSON stream of insert, update and delete lines, then a cursor line"},
+            410: {"description": "`since` is older than the retained change log; sync again without it"},
+        }
+    )
+    def get(self, args):
+        """
+        Stream inserts, updates and deletes after `since`, in commit order, for client-side mirrors.
+
+        Without `since`, every current entry is streamed as an insert (a full sync).
+        The last line is {"type": "cursor", "cursor": N}: pass N as `since` next time.
+        """
+        since = args["since"]
+        conn = None
+        try:
+            # A connection of its own rather than the session, as for /matches/range.
+            conn = (replicas.engine_for_request() or db.engine).connect()
+            if since is None:
+                # Entries and cursor from one snapshot: nothing missed or replayed twice.
+                conn.execution_options(isolation_level="REPEATABLE READ")
+                cursor = conn.execute(LATEST_CHANGE_SQL).scalar_one()
+                rows = conn.execution_options(stream_results=True, yield_per=1000).execute(ALL_ENTRIES_SQL)
+                changes = ({"type": "insert", "id": i, "phrase": p, "value": v} for i, p, v in rows)
+            else:
+                if since < conn.execute(PRUNED_UP_TO_SQL).scalar_one():
+                    conn.close()
+                    abort(410, description="Changes after this cursor were pruned; sync again without `since`.")
+                cursor = since
+                rows = conn.execution_options(stream_results=True, yield_per=1000).execute(
+                    CHANGES_SINCE_SQL, {"since": since}
+                )
+                changes = iter_changes(rows)
+        except OperationalError:
+            if conn is not None:
+                conn.close()
+            abort(503, description="Database connection failed. Check DATABASE_URL.")
+        except ProgrammingError:
+            if conn is not None:
+                conn.close()
+            abort(503, description="Change log missing. Apply migrations/006_change_log.sql.")
+
+        lines = _closing(_change_lines(changes, cursor), conn)
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+
 @blp.route("/entries/<int:entry_id>")
 class EntryById(MethodView):
     @blp.arguments(EntryUpdateSchema)
@@ -122,6 +821,7 @@ class EntryById(MethodView):
             entry.value = payload["value"]
 
         try:
+            version = bump_data_version(db.session)
             db.session.commit()
         except OperationalError:
             db.session.rollback()
@@ -133,6 +833,7 @@ class EntryById(MethodView):
             db.session.rollback()
             abort(409, description="Phrase already exists")
 
+        note_write(version, upserted=[(entry.id, entry.phrase, entry.value)])
         return {"id": entry.id, "phrase": entry.phrase, "value": entry.value, "source": None}
 
     @blp.response(200, EntrySchema)
@@ -153,6 +854,7 @@ class EntryById(MethodView):
         deleted = {"id": entry.id, "phrase": entry.phrase, "value": entry.value, "source": None}
         db.session.delete(entry)
         try:
+            version = bump_data_version(db.session)
             db.session.commit()
         except OperationalError:
             db.session.rollback()
@@ -161,6 +863,7 @@ class EntryById(MethodView):
             db.session.rollback()
             abort(503, description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).")
 
+        note_write(version, deleted=[deleted["id"]])
         return deleted
 
 
@@ -170,17 +873,32 @@ class EntryByPhrase(MethodView):
     Convenience endpoint for bulk loaders: upsert by unique phrase (no ID needed).
     """
 
-    @blp.arguments(GematriaQueryArgsSchema, location="query")
+    @blp.arguments(PhraseQueryArgsSchema, location="query")
     @blp.response(200, EntrySchema)
     def get(self, args):
         """
         Fetch an entry by phrase (returns id, phrase, value).
+
+        Matches like GET /gematria, so the stored phrase may differ from the query
+        in niqqud/punctuation.
         """
         phrase = args["phrase"].strip()
         try:
-            entry = db.session.execute(
-                db.select(GematriaEntry).where(GematriaEntry.phrase == phrase)
-            ).scalar_one_or_none()
+            cached = response_cache.lookup(db.session, "entry", phrase)
+            if cached.hit:
+                body = cached.value
+            else:
+
+                def load():
+                    row = _ENTRY_BY_KEY.execute(db.session, key=lookup_key(phrase), phrase=phrase).first()
+                    found = None
+                    if row is not None:
+                        entry_id, stored, value = row
+                        found = {"id": entry_id, "phrase": stored, "value": value, "source": None}
+                    cached.store(found)
+                    return found
+
+                body = coalescer.do(("entry", phrase), load)
         except OperationalError:
             abort(503, description="Database connection failed. Check DATABASE_URL.")
         except ProgrammingError:
@@ -189,10 +907,10 @@ class EntryByPhrase(MethodView):
                 description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).",
             )
 
-        if entry is None:
+        if body is None:
             abort(404, description="Entry not found")
 
-        return {"id": entry.id, "phrase": entry.phrase, "value": entry.value, "source": None}
+        return body
 
     @blp.arguments(EntryUpsertByPhraseSchema)
     @blp.response(200, EntrySchema)
@@ -216,6 +934,7 @@ class EntryByPhrase(MethodView):
             entry.value = value
 
         try:
+            version = bump_data_version(db.session)
             db.session.commit()
         except OperationalError:
             db.session.rollback()
@@ -227,9 +946,10 @@ class EntryByPhrase(MethodView):
             db.session.rollback()
             abort(409, description="Phrase already exists")
 
+        note_write(version, upserted=[(entry.id, entry.phrase, entry.value)])
         return {"id": entry.id, "phrase": entry.phrase, "value": entry.value, "source": None}
 
-    @blp.arguments(GematriaQueryArgsSchema, location="query")
+    @blp.arguments(PhraseQueryArgsSchema, location="query")
     @blp.response(200, EntrySchema)
     def delete(self, args):
         """
@@ -254,6 +974,7 @@ class EntryByPhrase(MethodView):
         deleted = {"id": entry.id, "phrase": entry.phrase, "value": entry.value, "source": None}
         db.session.delete(entry)
         try:
+            version = bump_data_version(db.session)
             db.session.commit()
         except OperationalError:
             db.session.rollback()
@@ -265,6 +986,7 @@ class EntryByPhrase(MethodView):
                 description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).",
             )
 
+        note_write(version, deleted=[deleted["id"]])
         return deleted
 
 
@@ -294,11 +1016,16 @@ class BulkUpsertByPhrase(MethodView):
                 continue
             by_phrase[phrase] = int(p["value"])
 
-        rows = [{"phrase": phrase, "value": value} for phrase, value in by_phrase.items()]
+        rows = [
+            {"phrase": phrase, "value": value, "phrase_key": lookup_key(phrase), **method_columns(phrase)}
+            for phrase, value in by_phrase.items()
+        ]
 
         # Batch to keep statements reasonably sized.
         BATCH_SIZE = 1000
         upserted_total = 0
+        version = None
+        changed: list[tuple[int, str, int]] = []
 
         try:
             for i in range(0, len(rows), BATCH_SIZE):
@@ -309,12 +1036,25 @@ class BulkUpsertByPhrase(MethodView):
                 insert_stmt = pg_insert(GematriaEntry).values(chunk)
                 upsert_stmt = insert_stmt.on_conflict_do_update(
                     index_elements=[GematriaEntry.phrase],
-                    set_={"value": insert_stmt.excluded.value},
+                    # phrase_key and the method columns are derived from phrase;
+                    # refreshing them also backfills old rows.
+                    set_={column: insert_stmt.excluded[column] for column in chunk[0] if column != "phrase"},
                 )
+                if match_index.enabled:
+                    upsert_stmt = upsert_stmt.returning(
+                        GematriaEntry.id, GematriaEntry.phrase, GematriaEntry.value
+                    )
                 result = db.session.execute(upsert_stmt)
-                # Rowcount is inserts + updates for ON CONFLICT.
-                upserted_total += int(result.rowcount or 0)
+                if match_index.enabled:
+                    chunk_rows = [tuple(r) for r in result]
+                    changed.extend(chunk_rows)
+                    upserted_total += len(chunk_rows)
+                else:
+                    # Rowcount is inserts + updates for ON CONFLICT.
+                    upserted_total += int(result.rowcount or 0)
 
+            if rows:
+                version = bump_data_version(db.session)
             db.session.commit()
         except OperationalError:
             db.session.rollback()
@@ -323,6 +1063,68 @@ class BulkUpsertByPhrase(MethodView):
             db.session.rollback()
             abort(503, description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).")
 
+        note_write(version, upserted=changed)
         return {"requested": requested, "unique": len(rows), "upserted": upserted_total}
 
 
+_NDJSON_MIMETYPES = {"application/x-ndjson", "application/jsonl", "application/json-seq"}
+
+
+@blp.route("/entries/by-phrase/stream")
+class StreamUpsertByPhrase(MethodView):
+    """
+    Streaming bulk upsert by phrase for large loads.
+
+    The request body is read incrementally and staged with Postgres COPY, then merged
+    into public.gematria_entries with one set-based upsert; memory use doesn't grow
+    with payload size. Duplicate phrases: the last one wins.
+    """
+
+    @blp.doc(
+        requestBody={
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"type": "string"},
+                    "example": '{"phrase": "שלום", "value": 376}\n{"phrase": "בדיקה", "value": 112}\n',
+                },
+                "text/csv": {
+                    "schema": {"type": "string"},
+                    "example": "phrase,value\nשלום,376\nבדיקה,112\n",
+                },
+            },
+        }
+    )
+    @blp.response(200, StreamIngestResponseSchema)
+    def put(self):
+        if request.mimetype in _NDJSON_MIMETYPES:
+            rows = iter_ndjson_rows(request.stream)
+        elif request.mimetype == "text/csv":
+            rows = iter_csv_rows(request.stream)
+        else:
+            abort(415, description="Send the body as application/x-ndjson or text/csv.")
+
+        try:
+            cursor = db.session.connection().connection.cursor()
+            stats = copy_upsert(cursor, rows)
+            version = bump_data_version(db.session) if stats["requested"] else None
+            db.session.commit()
+        except IngestError as e:
+            db.session.rollback()
+            # flask_smorest's abort puts `message` in the JSON body: the client needs the line number.
+            api_abort(400, message=str(e))
+        except psycopg2.DataError as e:
+            db.session.rollback()
+            abort(400, description=f"Invalid data: {e.pgerror or e}")
+        except (OperationalError, psycopg2.OperationalError):
+            db.session.rollback()
+            abort(503, description="Database connection failed. Check DATABASE_URL.")
+        except (ProgrammingError, psycopg2.ProgrammingError):
+            db.session.rollback()
+            abort(503, description="Database schema missing. Ensure public.gematria_entries exists (restore/migrate).")
+
+        if version is not None:
+            # Too many rows to apply one by one; reload on the next /matches.
+            match_index.invalidate()
+        note_write(version)
+        return stats
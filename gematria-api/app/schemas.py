@@ -2,20 +2,80 @@ from __future__ import annotations
 
 from marshmallow import Schema, fields, validate
 
+from .compose import MAX_COMPOSE_VALUE, MAX_COMPOSE_WORDS
+from .gematria import GEMATRIA_METHODS
 
-class GematriaQueryArgsSchema(Schema):
+MAX_COMPUTE_BATCH = 100_000
+MAX_LOOKUP_BATCH = 50_000
+MAX_MATCH_VALUES = 10_000
+MAX_MATCH_RANGE = 100_000
+MAX_FUZZY_DISTANCE = 3
+SEARCH_MODES = ("prefix", "substring", "fuzzy")
+
+
+class PhraseQueryArgsSchema(Schema):
     phrase = fields.String(required=True, allow_none=False)
 
 
+class GematriaQueryArgsSchema(PhraseQueryArgsSchema):
+    method = fields.String(load_default="standard", validate=validate.OneOf(GEMATRIA_METHODS))
+
+
 class GematriaLookupResponseSchema(Schema):
     phrase = fields.String(required=True)
     value = fields.Integer(required=True)
+    # Gematria method of `value` (GET /gematria only).
+    method = fields.String()
+    # False: computed on a miss and queued to be stored (WRITE_BEHIND_ENABLED).
     found = fields.Boolean(required=True)
 
 
+class GematriaLookupBatchSchema(Schema):
+    phrases = fields.List(
+        fields.String(),
+        required=True,
+        validate=validate.Length(min=1, max=MAX_LOOKUP_BATCH),
+    )
+    # Include the computed value for phrases that aren't in the DB.
+    compute_missing = fields.Boolean(load_default=False)
+
+
+class GematriaLookupBatchItemSchema(GematriaLookupResponseSchema):
+    # The phrase as sent; `phrase` is the stored form it matched.
+    query = fields.String(required=True)
+
+
+class MissingPhraseSchema(Schema):
+    phrase = fields.String(required=True)
+    value = fields.Integer(allow_none=True)
+
+
+class GematriaLookupBatchResponseSchema(Schema):
+    found = fields.List(fields.Nested(GematriaLookupBatchItemSchema), required=True)
+    missing = fields.List(fields.Nested(MissingPhraseSchema), required=True)
+
+
+class GematriaComputeBatchSchema(Schema):
+    phrases = fields.List(
+        fields.String(),
+        required=True,
+        validate=validate.Length(min=1, max=MAX_COMPUTE_BATCH),
+    )
+
+
+class GematriaComputeResultSchema(Schema):
+    phrase = fields.String(required=True)
+    value = fields.Integer(required=True)
+
+
 class MatchesQueryArgsSchema(Schema):
     value = fields.Integer(required=True)
+    method = fields.String(load_default="standard", validate=validate.OneOf(GEMATRIA_METHODS))
     top = fields.Integer(load_default=10, validate=validate.Range(min=1, max=1000))
+    # Keyset pagination: `cursor` is the X-Next-Cursor header of the previous page;
+    # `after` is the raw form (return phrases sorting after this one). `cursor` wins.
+    after = fields.String(load_default=None, allow_none=True)
+    cursor = fields.String(load_default=None, allow_none=True)
 
 
 class EntrySchema(Schema):
@@ -25,6 +85,74 @@ class EntrySchema(Schema):
     source = fields.String(allow_none=True)
 
 
+class MatchesRangeArgsSchema(Schema):
+    min = fields.Integer(required=True)
+    max = fields.Integer(required=True)
+    per_value = fields.Integer(load_default=10, validate=validate.Range(min=1, max=1000))
+
+
+class MatchesMultiSchema(Schema):
+    values = fields.List(
+        fields.Integer(),
+        required=True,
+        validate=validate.Length(min=1, max=MAX_MATCH_VALUES),
+    )
+    per_value = fields.Integer(load_default=10, validate=validate.Range(min=1, max=1000))
+
+
+class MatchGroupSchema(Schema):
+    value = fields.Integer(required=True)
+    entries = fields.List(fields.Nested(EntrySchema), required=True)
+
+
+class SearchArgsSchema(Schema):
+    q = fields.String(required=True, validate=validate.Length(min=1, max=200))
+    mode = fields.String(load_default="prefix", validate=validate.OneOf(SEARCH_MODES))
+    # Fuzzy mode only: maximum edit distance between normalized phrases.
+    max_distance = fields.Integer(load_default=1, validate=validate.Range(min=0, max=MAX_FUZZY_DISTANCE))
+    limit = fields.Integer(load_default=50, validate=validate.Range(min=1, max=500))
+
+
+class SearchResultSchema(Schema):
+    id = fields.Integer(required=True)
+    phrase = fields.String(required=True)
+    value = fields.Integer(required=True)
+    distance = fields.Integer(allow_none=True)
+
+
+class AnalyzeArgsSchema(Schema):
+    # Same-value entries listed (once per value) for each word; 0 turns matches off.
+    per_value = fields.Integer(load_default=5, validate=validate.Range(min=0, max=50))
+
+
+class ComposeArgsSchema(Schema):
+    value = fields.Integer(required=True, validate=validate.Range(min=1, max=MAX_COMPOSE_VALUE))
+    min_words = fields.Integer(load_default=2, validate=validate.Range(min=1, max=MAX_COMPOSE_WORDS))
+    max_words = fields.Integer(load_default=3, validate=validate.Range(min=1, max=MAX_COMPOSE_WORDS))
+    limit = fields.Integer(load_default=20, validate=validate.Range(min=1, max=200))
+    # Example phrases returned for each value in the results.
+    per_value = fields.Integer(load_default=3, validate=validate.Range(min=0, max=50))
+
+
+class ComposeCombinationSchema(Schema):
+    values = fields.List(fields.Integer(), required=True)
+    phrase_combinations = fields.Integer(required=True)
+    # Up to `per_value` example entries for each distinct value in `values`.
+    examples = fields.List(fields.Nested(MatchGroupSchema), required=True)
+
+
+class ComposeResponseSchema(Schema):
+    value = fields.Integer(required=True)
+    combinations = fields.List(fields.Nested(ComposeCombinationSchema), required=True)
+    truncated = fields.Boolean(required=True)
+    seconds = fields.Float(required=True)
+
+
+class EntryChangesArgsSchema(Schema):
+    # The `cursor` from the last line of the previous response; omit for a full sync.
+    since = fields.Integer(load_default=None, allow_none=True, validate=validate.Range(min=0))
+
+
 class EntryCreateSchema(Schema):
     phrase = fields.String(required=True)
     value = fields.Integer(required=True)
@@ -43,6 +171,11 @@ class BulkUpsertResponseSchema(Schema):
     upserted = fields.Integer(required=True)
 
 
+class StreamIngestResponseSchema(BulkUpsertResponseSchema):
+    seconds = fields.Float(required=True)
+    rows_per_sec = fields.Float(required=True)
+
+
 class EntryUpdateSchema(Schema):
     phrase = fields.String(load_default=None, allow_none=True)
     value = fields.Integer(load_default=None, allow_none=True)
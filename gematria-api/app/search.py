@@ -0,0 +1,312 @@
+"""Phrase search for GET /search: prefix, substring and edit-distance (fuzzy) modes.
+
+All modes match against the normalized lookup key (app.gematria.lookup_key), so
+niqqud and punctuation in either the query or the stored phrase don't matter.
+
+Two backends answer the same queries:
+
+- SQL over `phrase_key` (migrations/004_search_indexes.sql): a C-collation btree
+  for prefix ranges and a pg_trgm GiST index for LIKE '%q%' and nearest-neighbour
+  fuzzy candidates.
+- SearchIndex, an optional per-worker in-memory index built at startup: keys
+  sorted for prefix bisection, plus trigram posting lists for substring and fuzzy
+  lookups. Like MatchIndex it reloads when public.gematria_data_version changes.
+
+Results are ordered by key (code point order), then id; fuzzy results by edit
+distance first.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .data_version import read_data_version
+from .gematria import lookup_key
+
+log = logging.getLogger(__name__)
+
+# (id, phrase, value, distance); distance is None except in fuzzy mode.
+Hit = tuple[int, str, int, "int | None"]
+
+PREFIX_SQL = text(
+    """
+    SELECT id, phrase, value FROM public.gematria_entries
+    WHERE phrase_key COLLATE "C" >= :lo
+      AND (CAST(:hi AS text) IS NULL OR phrase_key COLLATE "C" < :hi)
+    ORDER BY phrase_key COLLATE "C", id
+    LIMIT :limit
+    """
+)
+SUBSTRING_SQL = text(
+    """
+    SELECT id, phrase, value FROM public.gematria_entries
+    WHERE phrase_key LIKE :pattern
+    ORDER BY phrase_key COLLATE "C", id
+    LIMIT :limit
+    """
+)
+# Nearest keys by trigram distance (GiST KNN); exact edit distance is checked in Python.
+FUZZY_CANDIDATES_SQL = text(
+    """
+    SELECT id, phrase, value, phrase_key FROM public.gematria_entries
+    WHERE phrase_key IS NOT NULL
+    ORDER BY phrase_key <-> :q
+    LIMIT :candidates
+    """
+)
+
+_LOAD_SQL = text("SELECT id, phrase, value FROM public.gematria_entries")
+
+
+def prefix_upper_bound(prefix: str) -> str | None:
+    """Smallest string greater than every string starting with `prefix` (None if unbounded)."""
+    while prefix and prefix[-1] == "\U0010ffff":
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    last = ord(prefix[-1]) + 1
+    if 0xD800 <= last <= 0xDFFF:
+        last = 0xE000  # Postgres text can't hold surrogates
+    return prefix[:-1] + chr(last)
+
+
+def like_escape(s: str) -> str:
+    """Escape LIKE wildcards using the default escape character (backslash)."""
+    return s.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def fuzzy_candidate_count(limit: int) -> int:
+    return max(200, limit * 10)
+
+
+class _Pattern:
+    """
+    Precomputed query for bit-parallel edit distance (Myers/Hyyrö), about an order
+    of magnitude faster than the textbook DP when scoring many keys.
+    """
+
+    __slots__ = ("length", "peq", "full", "last")
+
+    def __init__(self, pattern: str) -> None:
+        self.length = len(pattern)
+        self.peq: dict[str, int] = {}
+        for i, c in enumerate(pattern):
+            self.peq[c] = self.peq.get(c, 0) | (1 << i)
+        self.full = (1 << self.length) - 1
+        self.last = 1 << (self.length - 1) if self.length else 0
+
+    def distance(self, text: str, max_distance: int) -> int | None:
+        """Edit distance from the pattern to `text`, or None if it exceeds `max_distance`."""
+        if abs(len(text) - self.length) > max_distance:
+            return None
+        if not self.length:
+            return len(text)
+        peq, full, last = self.peq, self.full, self.last
+        pv, mv, score = full, 0, self.length
+        for c in text:
+            eq = peq.get(c, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | (~(xh | pv) & full)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = ((ph << 1) | 1) & full
+            mh = (mh << 1) & full
+            pv = mh | (~(xv | ph) & full)
+            mv = ph & xv
+        return score if score <= max_distance else None
+
+
+def rank_fuzzy(
+    key: str, rows: Iterable[tuple[int, str, int, str]], max_distance: int, limit: int
+) -> list[Hit]:
+    """Keep (id, phrase, value, phrase_key) rows within `max_distance` of `key`, best first."""
+    pattern = _Pattern(key)
+    scored = []
+    for entry_id, phrase, value, row_key in rows:
+        distance = pattern.distance(row_key, max_distance)
+        if distance is not None:
+            scored.append((distance, row_key, entry_id, phrase, value))
+    scored.sort()
+    return [(entry_id, phrase, value, distance) for distance, _k, entry_id, phrase, value in scored[:limit]]
+
+
+def _padded_trigrams(key: str) -> set[str]:
+    padded = f"\0\0{key}\0\0"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _trigrams(s: str) -> set[str]:
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+class SearchIndex:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.check_seconds = 2.0
+
+        self._lock = threading.Lock()
+        # Parallel lists in (key, id) order; positions index into them.
+        self._keys: list[str] = []
+        self._ids = array("q")
+        self._values = array("q")
+        self._phrases: list[str] = []
+        self._postings: dict[str, array] = {}
+        self._by_length: dict[int, array] = {}
+        self._version: int | None = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._db = None
+
+    def init_app(self, app, db) -> None:
+        self.enabled = bool(app.config.get("SEARCH_INDEX_ENABLED", False))
+        self.check_seconds = float(app.config.get("SEARCH_INDEX_CHECK_SECONDS", 2.0))
+        self._db = db
+        if not self.enabled:
+            return
+        with app.app_context():
+            try:
+                with db.engine.connect() as conn:
+                    self.load(conn)
+            except (OperationalError, ProgrammingError) as e:
+                log.warning("search index not loaded at startup: %s", e)
+
+    def load(self, conn) -> None:
+        """(Re)build the index from public.gematria_entries, read through `conn`."""
+        version = read_data_version(conn)
+        if version is None:
+            log.warning("public.gematria_data_version missing; search index disabled")
+            self.enabled = False
+            return
+        self.build(conn.execute(_LOAD_SQL), version)
+
+    def build(self, rows: Iterable[tuple[int, str, int]], version: int | None = None) -> None:
+        """Build from (id, phrase, value) rows; `load` calls this with the table's rows."""
+        entries = sorted((lookup_key(phrase), entry_id, phrase, value) for entry_id, phrase, value in rows)
+
+        postings: dict[str, array] = {}
+        by_length: dict[int, array] = {}
+        for pos, (key, _id, _phrase, _value) in enumerate(entries):
+            # Single characters too: the fuzzy filter for keys too short for trigrams.
+            for gram in _padded_trigrams(key) | set(key):
+                postings.setdefault(gram, array("I")).append(pos)
+            by_length.setdefault(len(key), array("I")).append(pos)
+
+        with self._lock:
+            self._keys = [e[0] for e in entries]
+            self._ids = array("q", (e[1] for e in entries))
+            self._phrases = [e[2] for e in entries]
+            self._values = array("q", (e[3] for e in entries))
+            self._postings = postings
+            self._by_length = by_length
+            self._version = version
+            self._loaded = True
+            self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_seconds:
+            return
+        # The primary, not db.session: in a read-only request that may be a lagging replica.
+        assert self._db is not None
+        with self._db.engine.connect() as conn:
+            if self._loaded:
+                version = read_data_version(conn)
+                self._checked_at = now
+                if version == self._version:
+                    return
+            self.load(conn)
+
+    def search(self, mode: str, key: str, limit: int, max_distance: int = 1) -> list[Hit] | None:
+        """Answer a /search query, or None if disabled and the caller should query the DB."""
+        if not self.enabled:
+            return None
+        self._ensure_fresh()
+        if not self.enabled:
+            return None
+        return self.query(mode, key, limit, max_distance)
+
+    def query(self, mode: str, key: str, limit: int, max_distance: int = 1) -> list[Hit]:
+        """Search what is currently loaded, without checking the data version."""
+        with self._lock:
+            if mode == "prefix":
+                return self._prefix(key, limit)
+            if mode == "substring":
+                return self._substring(key, limit)
+            return self._fuzzy(key, limit, max_distance)
+
+    def _hit(self, pos: int, distance: int | None = None) -> Hit:
+        return (self._ids[pos], self._phrases[pos], self._values[pos], distance)
+
+    def _prefix(self, key: str, limit: int) -> list[Hit]:
+        out = []
+        pos = bisect_left(self._keys, key)
+        while pos < len(self._keys) and len(out) < limit and self._keys[pos].startswith(key):
+            out.append(self._hit(pos))
+            pos += 1
+        return out
+
+    def _substring(self, key: str, limit: int) -> list[Hit]:
+        grams = _trigrams(key)
+        if grams:
+            lists = sorted((self._postings.get(g, array("I")) for g in grams), key=len)
+            candidates = set(lists[0])
+            for postings in lists[1:]:
+                candidates.intersection_update(postings)
+                if not candidates:
+                    return []
+            positions: Iterable[int] = sorted(candidates)
+        else:
+            # Too short for trigrams: scan the keys (a C-level `in` per key).
+            positions = range(len(self._keys))
+
+        out = []
+        for pos in positions:
+            if key in self._keys[pos]:
+                out.append(self._hit(pos))
+                if len(out) >= limit:
+                    break
+        return out
+
+    def _fuzzy(self, key: str, limit: int, max_distance: int) -> list[Hit]:
+        grams = _padded_trigrams(key)
+        # Each edit destroys at most 3 of the query's distinct trigrams (or 1 of its
+        # distinct characters), so a key within `max_distance` shares at least this
+        # many; the filter never drops a real match.
+        threshold = len(grams) - 3 * max_distance
+        if threshold <= 0:
+            grams = set(key)
+            threshold = len(grams) - max_distance
+        if threshold > 0:
+            counts = Counter(chain.from_iterable(self._postings.get(g, ()) for g in grams))
+            candidates = [pos for pos, n in counts.items() if n >= threshold]
+        else:
+            candidates = list(
+                chain.from_iterable(
+                    self._by_length.get(n, ())
+                    for n in range(len(key) - max_distance, len(key) + max_distance + 1)
+                )
+            )
+
+        pattern = _Pattern(key)
+        keys = self._keys
+        scored = []
+        for pos in candidates:
+            distance = pattern.distance(keys[pos], max_distance)
+            if distance is not None:
+                scored.append((distance, pos))
+        scored.sort()
+        return [self._hit(pos, distance) for distance, pos in scored[:limit]]
@@ -0,0 +1,63 @@
+"""
+Fast JSON encoding for the hot read endpoints.
+
+Handlers that already hold plain rows (ints, strings and None, shaped exactly
+like their response schema) return `json_response(...)` instead of dicts:
+flask-smorest passes a Response through as is, which skips the per-row
+marshmallow dump and Flask's JSON provider. `@blp.response(...)` still
+documents the schema in the OpenAPI spec, so the two must be kept in sync.
+
+orjson is used when installed; otherwise the stdlib encoder, with the same
+compact, non-ASCII-escaping output.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable, Iterator
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the (slower) stdlib encoder
+    orjson = None
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode `obj` as compact UTF-8 JSON (no ASCII escaping)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _encoder.encode(obj).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_response(obj: Any, status: int = 200, headers: dict | None = None) -> Response:
+    """A ready-made application/json response (flask-smorest returns it without dumping)."""
+    return Response(dumps(obj), status=status, headers=headers, mimetype="application/json")
+
+
+def iter_json_array(items: Iterable[Any], chunk_size: int = 1000) -> Iterator[bytes]:
+    """
+    Encode `items` as one JSON array, yielding it in chunks so large responses
+    are never held in memory as a single string.
+    """
+    yield b"["
+    first = True
+    chunk: list[bytes] = []
+    for item in items:
+        chunk.append(dumps(item))
+        if len(chunk) >= chunk_size:
+            yield (b"" if first else b",") + b",".join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield (b"" if first else b",") + b",".join(chunk)
+    yield b"]"
@@ -0,0 +1,311 @@
+"""Read-only, memory-mapped snapshot of public.gematria_entries.
+
+Lets /gematria and /matches be served without Postgres. The file is mmap'ed
+read-only, so every gunicorn worker on a host shares the same page-cache pages
+and opening it costs almost nothing regardless of size.
+
+File layout (little-endian, every section 8-byte aligned):
+
+  header     MAGIC, format version, entry count, value count, data version, created_at
+  sections   (offset, nbytes) for each section below, in this order:
+
+  phrase_blob     UTF-8 phrases, concatenated in byte order
+  phrase_offsets  u32[n+1]  start of phrase i in phrase_blob (phrase order)
+  ids             i32[n]    entry id, phrase order
+  values          i32[n]    entry value, phrase order
+  key_blob        UTF-8 lookup keys, concatenated in (key, id) order
+  key_offsets     u32[n+1]  start of key i in key_blob
+  key_entries     u32[n]    phrase-order index of the entry for key i
+  match_values    i32[m]    distinct values, ascending
+  match_starts    u32[m+1]  start of each value's run in match_entries
+  match_entries   u32[n]    phrase-order entry indexes sorted by (value, phrase)
+
+Byte order of UTF-8 equals code point order, so "phrase order" is the same as
+`ORDER BY phrase COLLATE "C"` in the DB.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+
+from .gematria import lookup_key
+
+MAGIC = b"GEMSNAP\x00"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIIqd")
+_SECTIONS = (
+    "phrase_blob",
+    "phrase_offsets",
+    "ids",
+    "values",
+    "key_blob",
+    "key_offsets",
+    "key_entries",
+    "match_values",
+    "match_starts",
+    "match_entries",
+)
+_SECTION = struct.Struct("<QQ")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _offsets(blobs: list[bytes]) -> array:
+    out = array("I", [0])
+    pos = 0
+    for b in blobs:
+        pos += len(b)
+        out.append(pos)
+    return out
+
+
+def write_snapshot(rows: Iterable[tuple[int, str, int]], path: str, data_version: int | None = None) -> int:
+    """
+    Write (id, phrase, value) rows to a snapshot file at `path`; returns the entry count.
+
+    Writes to `path` directly; use `install_snapshot` to swap a finished file into
+    place atomically.
+    """
+    if sys.byteorder != "little":
+        raise SnapshotError("snapshots are little-endian; export on a little-endian host")
+
+    entries = sorted((phrase.encode("utf-8"), entry_id, value) for entry_id, phrase, value in rows)
+    n = len(entries)
+    phrases = [e[0] for e in entries]
+    ids = array("i", (e[1] for e in entries))
+    values = array("i", (e[2] for e in entries))
+
+    keyed = sorted(
+        (lookup_key(p.decode("utf-8")).encode("utf-8"), ids[i], i) for i, p in enumerate(phrases)
+    )
+    keys = [k for k, _, _ in keyed]
+    key_entries = array("I", (i for _, _, i in keyed))
+
+    by_value = sorted(range(n), key=lambda i: (values[i], phrases[i]))
+    match_entries = array("I", by_value)
+    match_values = array("i")
+    match_starts = array("I")
+    for pos, i in enumerate(by_value):
+        if not match_values or match_values[-1] != values[i]:
+            match_values.append(values[i])
+            match_starts.append(pos)
+    match_starts.append(n)
+
+    sections = {
+        "phrase_blob": b"".join(phrases),
+        "phrase_offsets": _offsets(phrases).tobytes(),
+        "ids": ids.tobytes(),
+        "values": values.tobytes(),
+        "key_blob": b"".join(keys),
+        "key_offsets": _offsets(keys).tobytes(),
+        "key_entries": key_entries.tobytes(),
+        "match_values": match_values.tobytes(),
+        "match_starts": match_starts.tobytes(),
+        "match_entries": match_entries.tobytes(),
+    }
+    if len(sections["phrase_blob"]) >= 2**32 or len(sections["key_blob"]) >= 2**32:
+        raise SnapshotError("phrase data too large for u32 offsets")
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, n, len(match_values), data_version or -1, time.time())
+    pos = _HEADER.size + _SECTION.size * len(_SECTIONS)
+    table = []
+    for name in _SECTIONS:
+        pos += -pos % 8
+        table.append((pos, len(sections[name])))
+        pos += len(sections[name])
+
+    with open(path, "wb") as f:
+        f.write(header)
+        for offset, nbytes in table:
+            f.write(_SECTION.pack(offset, nbytes))
+        for name, (offset, _nbytes) in zip(_SECTIONS, table):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(sections[name])
+        f.flush()
+        os.fsync(f.fileno())
+    return n
+
+
+def install_snapshot(new_path: str, live_path: str) -> None:
+    """
+    Atomically replace `live_path` with `new_path` (same filesystem). Workers pick
+    up the new file on their next check; requests already using the old mapping
+    keep reading it until they finish.
+    """
+    Snapshot(new_path).close()  # refuse to install a corrupt file
+    os.replace(new_path, live_path)
+
+
+class _Strings:
+    """Sequence view of a blob + offsets, so `bisect` can search it without decoding."""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: memoryview, offsets: memoryview) -> None:
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self.blob[self.offsets[i] : self.offsets[i + 1]])
+
+
+class Snapshot:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.file_id = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+            if st.st_size == 0:
+                raise SnapshotError(f"{path}: empty file")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mm)
+        try:
+            magic, fmt, n, m, data_version, created_at = _HEADER.unpack_from(view, 0)
+        except struct.error:
+            raise SnapshotError(f"{path}: truncated header") from None
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise SnapshotError(f"{path}: not a gematria snapshot (format {FORMAT_VERSION})")
+        if sys.byteorder != "little":
+            raise SnapshotError("snapshots are little-endian; this host is not")
+
+        self.count = n
+        self.data_version = None if data_version < 0 else data_version
+        self.created_at = created_at
+
+        parts: dict[str, memoryview] = {}
+        for i, name in enumerate(_SECTIONS):
+            offset, nbytes = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            if offset + nbytes > len(view):
+                raise SnapshotError(f"{path}: section {name} out of bounds")
+            parts[name] = view[offset : offset + nbytes]
+
+        self._phrases = _Strings(parts["phrase_blob"], parts["phrase_offsets"].cast("I"))
+        self._ids = parts["ids"].cast("i")
+        self._values = parts["values"].cast("i")
+        self._keys = _Strings(parts["key_blob"], parts["key_offsets"].cast("I"))
+        self._key_entries = parts["key_entries"].cast("I")
+        self._match_values = parts["match_values"].cast("i")
+        self._match_starts = parts["match_starts"].cast("I")
+        self._match_entries = parts["match_entries"].cast("I")
+        if len(self._phrases) != n or len(self._match_values) != m:
+            raise SnapshotError(f"{path}: section sizes don't match header")
+
+    def close(self) -> None:
+        """Unmap now. Only for tools; the server just drops old snapshots (see SnapshotStore)."""
+        for name in list(vars(self)):
+            if isinstance(getattr(self, name), (memoryview, _Strings)):
+                delattr(self, name)
+        self._mm.close()
+
+    def _entry(self, i: int) -> tuple[int, str, int]:
+        return self._ids[i], self._phrases[i].decode("utf-8"), self._values[i]
+
+    def lookup(self, phrase: str) -> tuple[int, str, int] | None:
+        """
+        Find (id, phrase, value) like the DB lookup: exact phrase first, else the
+        oldest entry with the same lookup key.
+        """
+        target = phrase.encode("utf-8")
+        i = bisect_left(self._phrases, target)
+        if i < len(self._phrases) and self._phrases[i] == target:
+            return self._entry(i)
+
+        key = lookup_key(phrase).encode("utf-8")
+        j = bisect_left(self._keys, key)
+        if j < len(self._keys) and self._keys[j] == key:
+            return self._entry(self._key_entries[j])
+        return None
+
+    def matches(self, value: int, limit: int, after: str | None = None) -> list[tuple[int, str]]:
+        """Up to `limit` (id, phrase) for `value` with phrase > `after`, in phrase order."""
+        v = bisect_left(self._match_values, value)
+        if v >= len(self._match_values) or self._match_values[v] != value:
+            return []
+        start, end = self._match_starts[v], self._match_starts[v + 1]
+        if after is not None:
+            run = _Run(self._phrases, self._match_entries, start, end)
+            start += bisect_right(run, after.encode("utf-8"))
+        out = []
+        for pos in range(start, min(end, start + limit)):
+            i = self._match_entries[pos]
+            out.append((self._ids[i], self._phrases[i].decode("utf-8")))
+        return out
+
+
+class _Run:
+    """Phrases of one value's run in match_entries, as a bisectable sequence."""
+
+    __slots__ = ("phrases", "entries", "start", "end")
+
+    def __init__(self, phrases: _Strings, entries: memoryview, start: int, end: int) -> None:
+        self.phrases = phrases
+        self.entries = entries
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.phrases[self.entries[self.start + i]]
+
+
+class SnapshotStore:
+    """
+    Holds the current Snapshot for this worker and reopens it when the file at
+    SNAPSHOT_PATH is replaced (checked at most every SNAPSHOT_CHECK_SECONDS).
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path = ""
+        self.check_seconds = 1.0
+        self._snapshot: Snapshot | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.enabled = bool(app.config.get("SNAPSHOT_MODE", False))
+        self.path = app.config.get("SNAPSHOT_PATH", "")
+        self.check_seconds = float(app.config.get("SNAPSHOT_CHECK_SECONDS", 1.0))
+        if self.enabled:
+            if not self.path:
+                raise SnapshotError("SNAPSHOT_MODE is on but SNAPSHOT_PATH is not set")
+            self._snapshot = Snapshot(self.path)
+            self._checked_at = time.monotonic()
+
+    def get(self) -> Snapshot:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_seconds:
+            with self._lock:
+                if now - self._checked_at >= self.check_seconds:
+                    self._checked_at = now
+                    self._maybe_reload()
+        assert self._snapshot is not None
+        return self._snapshot
+
+    def _maybe_reload(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return  # mid-swap or removed; keep serving what we have
+        current = self._snapshot
+        if current is not None and current.file_id == (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size):
+            return
+        # Not closed explicitly: requests still holding the old Snapshot keep reading
+        # it, and the mapping is released with the last reference.
+        self._snapshot = Snapshot(self.path)
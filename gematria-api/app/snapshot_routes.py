@@ -0,0 +1,60 @@
+"""Read-only endpoints served from the memory-mapped snapshot (SNAPSHOT_MODE)."""
+
+from __future__ import annotations
+
+from flask import abort
+from flask.views import MethodView
+
+from .extensions import snapshot_store
+from .gematria import compute_gematria
+from .pagination import NEXT_CURSOR_HEADER_DOC, decode_cursor, encode_cursor
+from .schemas import EntrySchema, GematriaLookupResponseSchema, GematriaQueryArgsSchema, MatchesQueryArgsSchema
+from .serialization import json_response
+
+from flask_smorest import Blueprint
+
+
+snapshot_blp = Blueprint(
+    "gematria_snapshot", __name__, url_prefix="/", description="Gematria endpoints (read-only snapshot)"
+)
+
+
+@snapshot_blp.route("/gematria")
+class SnapshotGematriaLookup(MethodView):
+    @snapshot_blp.arguments(GematriaQueryArgsSchema, location="query")
+    @snapshot_blp.response(200, GematriaLookupResponseSchema)
+    def get(self, args):
+        entry = snapshot_store.get().lookup(args["phrase"].strip())
+        if entry is None:
+            abort(404, description="Phrase not found")
+        _entry_id, phrase, value = entry
+        method = args["method"]
+        if method != "standard":
+            # The other methods are pure functions of the phrase (what the DB columns hold too).
+            value = compute_gematria(phrase, method)
+        return json_response({"phrase": phrase, "value": value, "method": method, "found": True})
+
+
+@snapshot_blp.route("/matches")
+class SnapshotMatches(MethodView):
+    @snapshot_blp.arguments(MatchesQueryArgsSchema, location="query")
+    @snapshot_blp.response(200, EntrySchema(many=True), headers=NEXT_CURSOR_HEADER_DOC)
+    def get(self, args):
+        """Same contract as the DB-backed /matches: phrase (byte) order, keyset cursors."""
+        value = args["value"]
+        top = args["top"]
+        if args["method"] != "standard":
+            abort(400, description="Snapshots only index the standard method")
+        after = decode_cursor(args["cursor"], value) if args["cursor"] else args["after"]
+
+        rows = snapshot_store.get().matches(value, top + 1, after=after)
+        headers = {}
+        if len(rows) > top:
+            rows = rows[:top]
+            headers["X-Next-Cursor"] = encode_cursor(value, rows[-1][1])
+
+        entries = [
+            {"id": entry_id, "phrase": phrase, "value": value, "source": None}
+            for entry_id, phrase in rows
+        ]
+        return json_response(entries), 200, headers
@@ -0,0 +1,63 @@
+"""Readers for the local corpora we import (Strong's dictionary, plain Hebrew text).
+
+Shared by the import scripts and the offline loader; no Flask/SQLAlchemy imports.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Iterator
+
+from .gematria import normalize_phrase
+
+HEBREW_WORD_RE = re.compile(r"[\u0590-\u05FF]+")
+
+
+def extract_json_from_js(js_text: str) -> str:
+    """
+    The file looks like:
+      var strongsHebrewDictionary = {...};
+    We strip the JS wrapper to get JSON.
+    """
+    # Find the first '{' and the last '}'.
+    start = js_text.find("{")
+    end = js_text.rfind("}")
+    if start == -1 or end == -1 or end <= start:
+        raise ValueError("Could not locate JSON object in JS file")
+    return js_text[start : end + 1]
+
+
+def collapse_spaces(s: str) -> str:
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def iter_strongs_lemmas(path: str | Path) -> Iterator[tuple[str, str]]:
+    """Yield (strong_id, raw lemma) from strongs-hebrew-dictionary.js, in file order."""
+    js_text = Path(path).read_text(encoding="utf-8", errors="strict")
+    data = json.loads(extract_json_from_js(js_text))
+    for strong_id, entry in data.items():
+        yield strong_id, str(entry.get("lemma") or "").strip()
+
+
+def iter_text_words(path: str | Path) -> Iterator[str]:
+    """Yield raw Hebrew tokens from a UTF-8 text file, reading it line by line."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            for m in HEBREW_WORD_RE.finditer(line):
+                yield m.group(0)
+
+
+def lemma_phrase(lemma: str) -> str:
+    """Stored phrase for a dictionary lemma: niqqud removed, internal spaces collapsed."""
+    return collapse_spaces(normalize_phrase(lemma))
+
+
+def word_phrase(raw: str) -> str:
+    """
+    Stored phrase for a single text token: normalized, as one word.
+
+    Keeps final-letter forms; normalize_phrase only removes marks/punctuation.
+    """
+    return normalize_phrase(raw).strip().replace(" ", "")
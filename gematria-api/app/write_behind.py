@@ -0,0 +1,230 @@
+"""Write-behind queue for phrases that GET /gematria computed on a miss (WRITE_BEHIND_ENABLED).
+
+A miss is answered right away with the computed value; the phrase goes onto a
+bounded per-worker queue. A background thread inserts the queue in batches:
+when WRITE_BEHIND_BATCH_SIZE phrases are waiting, or WRITE_BEHIND_FLUSH_SECONDS
+after the last flush, whichever comes first. What's left is flushed when the
+worker exits normally.
+
+Inserts never overwrite: a phrase stored meanwhile (say by PUT /entries/by-phrase)
+keeps its value. A full queue drops new phrases (counted); a failed batch is put
+back to be retried on the next flush.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from itertools import islice
+from typing import Callable, Iterable
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .data_version import bump_data_version
+from .gematria import GEMATRIA_METHODS, lookup_key, method_column, method_columns
+
+log = logging.getLogger(__name__)
+
+_DERIVED_COLUMNS = [method_column(m) for m in GEMATRIA_METHODS if m != "standard"]
+# One statement per batch: the columns travel as parallel arrays.
+_INSERT_SQL = text(
+    f"""
+    INSERT INTO public.gematria_entries (phrase, value, phrase_key, {", ".join(_DERIVED_COLUMNS)})
+    SELECT * FROM unnest(
+        CAST(:phrase AS text[]), CAST(:value AS integer[]), CAST(:phrase_key AS text[]),
+        {", ".join(f"CAST(:{c} AS integer[])" for c in _DERIVED_COLUMNS)}
+    )
+    ON CONFLICT (phrase) DO NOTHING
+    RETURNING id, phrase, value
+    """
+)
+
+FLUSH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class WriteBehindQueue:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.max_size = 10_000
+        self.batch_size = 500
+        self.flush_seconds = 1.0
+
+        self._cond = threading.Condition()
+        # phrase -> standard value, in arrival order; a phrase is queued once.
+        self._pending: dict[str, int] = {}
+        self._counts = {"queued": 0, "dropped": 0, "written": 0, "existing": 0, "failed": 0}
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._thread_pid: int | None = None
+        self._stopping = False
+        self._app = None
+        self._db = None
+        self._on_write: Callable[[int | None, list[tuple[int, str, int]]], None] | None = None
+        self._metrics = None
+
+    def init_app(self, app, db, on_write=None, metrics=None) -> None:
+        """
+        `on_write(version, inserted)` runs after each committed batch (to update
+        per-worker indexes and caches); `metrics` gets a flush latency histogram.
+        """
+        self.enabled = bool(app.config.get("WRITE_BEHIND_ENABLED", False))
+        self.max_size = int(app.config.get("WRITE_BEHIND_MAX_QUEUE", 10_000))
+        self.batch_size = int(app.config.get("WRITE_BEHIND_BATCH_SIZE", 500))
+        self.flush_seconds = float(app.config.get("WRITE_BEHIND_FLUSH_SECONDS", 1.0))
+        if not self.enabled:
+            return
+        self._app = app
+        self._db = db
+        self._on_write = on_write
+        if metrics is not None:
+            metrics.histogram(
+                "gematria_write_behind_flush_seconds",
+                "Time to insert one write-behind batch.",
+                ("outcome",),
+                FLUSH_BUCKETS,
+            )
+            self._metrics = metrics
+        atexit.register(self.close)
+
+    def enqueue(self, phrase: str, value: int) -> bool:
+        """Queue `phrase` for insertion; False if the queue is off or full."""
+        if not self.enabled:
+            return False
+        self._ensure_thread()
+        with self._cond:
+            if phrase in self._pending:
+                return True
+            if len(self._pending) >= self.max_size:
+                self._counts["dropped"] += 1
+                return False
+            self._pending[phrase] = value
+            self._counts["queued"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Insert everything queued now, batch by batch; returns the rows inserted."""
+        inserted = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = dict(islice(self._pending.items(), self.batch_size))
+                    for phrase in batch:
+                        del self._pending[phrase]
+                if not batch:
+                    return inserted
+                written = self._write(batch)
+                if written is None:
+                    return inserted  # put back; retried on the next flush
+                inserted += written
+
+    def close(self) -> None:
+        """Stop the flusher thread and write what is still queued (runs at exit)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        thread = self._thread
+        if thread is not None and self._thread_pid == os.getpid():
+            thread.join(timeout=self.flush_seconds + 30)
+        if self.enabled and self._app is not None:
+            self.flush()
+
+    def _ensure_thread(self) -> None:
+        # Started lazily in each worker: threads don't survive gunicorn's fork.
+        if self._thread_pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_seconds
+                while not self._stopping and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:  # keep the thread alive; the batch was put back or is lost
+                log.exception("write-behind flush failed")
+
+    def _write(self, batch: dict[str, int]) -> int | None:
+        """Insert one batch; returns the rows inserted, or None if the DB failed."""
+        started = time.perf_counter()
+        params: dict[str, list] = {"phrase": [], "value": [], "phrase_key": [], **{c: [] for c in _DERIVED_COLUMNS}}
+        for phrase, value in batch.items():
+            params["phrase"].append(phrase)
+            params["value"].append(value)
+            params["phrase_key"].append(lookup_key(phrase))
+            for column, derived in method_columns(phrase).items():
+                params[column].append(derived)
+
+        assert self._app is not None and self._db is not None
+        with self._app.app_context():
+            session = self._db.session
+            try:
+                inserted = [tuple(r) for r in session.execute(_INSERT_SQL, params)]
+                version = bump_data_version(session) if inserted else None
+                session.commit()
+            except (OperationalError, ProgrammingError) as e:
+                session.rollback()
+                log.warning("write-behind batch of %d failed: %s", len(batch), e)
+                self._requeue(batch)
+                self._observe("error", started)
+                return None
+
+        with self._cond:
+            self._counts["written"] += len(inserted)
+            self._counts["existing"] += len(batch) - len(inserted)
+        if self._on_write is not None:
+            self._on_write(version, inserted)
+        self._observe("ok", started)
+        return len(inserted)
+
+    def _requeue(self, batch: dict[str, int]) -> None:
+        with self._cond:
+            self._counts["failed"] += len(batch)
+            room = max(0, self.max_size - len(self._pending))
+            candidates = [(p, v) for p, v in batch.items() if p not in self._pending]
+            kept = dict(candidates[:room])
+            self._counts["dropped"] += len(candidates) - len(kept)
+            # Back at the front: they are older than anything queued since.
+            self._pending = {**kept, **self._pending}
+
+    def _observe(self, outcome: str, started: float) -> None:
+        if self._metrics is not None:
+            self._metrics.observe("gematria_write_behind_flush_seconds", (outcome,), time.perf_counter() - started)
+
+    def samples(self) -> Iterable[tuple[str, str, str, dict, float]]:
+        """Queue depth and event counters as /metrics samples."""
+        if not self.enabled:
+            return []
+        with self._cond:
+            counts = dict(self._counts)
+            depth = len(self._pending)
+        help = "Phrases computed on a /gematria miss, by outcome (written, existing: already stored)."
+        return [
+            ("gematria_write_behind_queue_depth", "gauge", "Phrases waiting to be inserted.", {}, depth),
+            *(
+                ("gematria_write_behind_events_total", "counter", help, {"event": name}, n)
+                for name, n in counts.items()
+            ),
+        ]
@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
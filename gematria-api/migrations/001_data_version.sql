@@ -0,0 +1,10 @@
+-- Write counter used by per-worker caches (e.g. the /matches index) to detect
+-- changes made by other workers. Safe to run more than once.
+CREATE TABLE IF NOT EXISTS public.gematria_data_version (
+    id integer PRIMARY KEY,
+    version bigint NOT NULL DEFAULT 0
+);
+
+INSERT INTO public.gematria_data_version (id, version)
+VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,9 @@
+-- Covering index for GET /matches keyset pagination:
+--   WHERE value = $1 AND phrase COLLATE "C" > $2 ORDER BY phrase COLLATE "C" LIMIT n
+-- is answered by an index-only range scan, with no sort step.
+-- CONCURRENTLY avoids blocking writes; run it outside a transaction (plain psql -f does).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gematria_entries_value_phrase_idx
+    ON public.gematria_entries (value, phrase COLLATE "C") INCLUDE (id);
+
+-- Keep the visibility map current so scans can stay index-only.
+VACUUM (ANALYZE) public.gematria_entries;
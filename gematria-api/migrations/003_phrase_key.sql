@@ -0,0 +1,11 @@
+-- Normalized lookup key (app.gematria.lookup_key(phrase)) so lookups with niqqud,
+-- cantillation or punctuation still find the stored phrase.
+--
+-- After this file, fill existing rows in batches:
+--   python scripts/backfill_phrase_key.py
+-- New and updated rows get phrase_key from the API and loaders.
+ALTER TABLE public.gematria_entries ADD COLUMN IF NOT EXISTS phrase_key text;
+
+-- CONCURRENTLY avoids blocking writes; run it outside a transaction (plain psql -f does).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gematria_entries_phrase_key_idx
+    ON public.gematria_entries (phrase_key);
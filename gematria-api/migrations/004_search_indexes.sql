@@ -0,0 +1,17 @@
+-- Indexes for GET /search over the normalized phrase_key (needs 003_phrase_key.sql).
+--
+-- prefix:    phrase_key COLLATE "C" >= $lo AND < $hi, ordered by the same key -> btree range scan
+-- substring: phrase_key LIKE '%q%'                   -> trigram GiST (queries of 3+ characters)
+-- fuzzy:     ORDER BY phrase_key <-> $q LIMIT n       -> trigram GiST nearest-neighbour scan
+--
+-- pg_trgm ships with Postgres (contrib); creating it needs CREATE privilege on the database.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- CONCURRENTLY avoids blocking writes; run it outside a transaction (plain psql -f does).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gematria_entries_phrase_key_c_idx
+    ON public.gematria_entries (phrase_key COLLATE "C");
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gematria_entries_phrase_key_trgm_idx
+    ON public.gematria_entries USING gist (phrase_key gist_trgm_ops);
+
+ANALYZE public.gematria_entries;
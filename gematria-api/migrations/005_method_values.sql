@@ -0,0 +1,22 @@
+-- Precomputed values for the other gematria methods (app.gematria.GEMATRIA_METHODS),
+-- so /gematria and /matches with ?method=... read a column instead of computing per row.
+--
+-- After this file, fill existing rows in batches:
+--   python scripts/backfill_method_values.py
+-- New and updated rows get these columns from the API and loaders.
+ALTER TABLE public.gematria_entries
+    ADD COLUMN IF NOT EXISTS value_gadol integer,
+    ADD COLUMN IF NOT EXISTS value_katan integer,
+    ADD COLUMN IF NOT EXISTS value_siduri integer,
+    ADD COLUMN IF NOT EXISTS value_atbash integer;
+
+-- Same covering layout as 002_value_phrase_index.sql, one per method.
+-- CONCURRENTLY avoids blocking writes; run it outside a transaction (plain psql -f does).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gematria_entries_value_gadol_phrase_idx
+    ON public.gematria_entries (value_gadol, phrase COLLATE "C") INCLUDE (id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gematria_entries_value_katan_phrase_idx
+    ON public.gematria_entries (value_katan, phrase COLLATE "C") INCLUDE (id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gematria_entries_value_siduri_phrase_idx
+    ON public.gematria_entries (value_siduri, phrase COLLATE "C") INCLUDE (id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gematria_entries_value_atbash_phrase_idx
+    ON public.gematria_entries (value_atbash, phrase COLLATE "C") INCLUDE (id);
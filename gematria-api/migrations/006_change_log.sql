@@ -0,0 +1,103 @@
+-- Change log for GET /entries/changes (see app/changes.py): triggers on
+-- public.gematria_entries record every insert, update (of phrase or value) and
+-- delete, in commit order. Safe to run more than once. app/changes.py also runs
+-- this file after create_all (AUTO_CREATE_TABLES), so keep it free of psql
+-- meta-commands and of % signs.
+--
+-- Writers to gematria_entries are serialized by a transaction-level advisory lock
+-- from their first change until commit; keep long-running loads off busy hours.
+CREATE TABLE IF NOT EXISTS public.gematria_changes (
+    seq bigserial PRIMARY KEY,
+    op text NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+    entry_id integer NOT NULL,
+    phrase text NOT NULL,
+    value integer NOT NULL,
+    changed_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Newest seq deleted or truncated from the log (kept by a trigger below): a
+-- client cursor older than this gets 410, even when nothing is left in the log.
+CREATE TABLE IF NOT EXISTS public.gematria_changes_pruned (
+    id integer PRIMARY KEY CHECK (id = 1),
+    seq bigint NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION public.gematria_changes_lock() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Held until commit: one writer at a time, so seq order is commit order.
+    PERFORM pg_advisory_xact_lock(hashtext('public.gematria_changes'));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.gematria_changes_log() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.gematria_changes (op, entry_id, phrase, value)
+        SELECT 'insert', id, phrase, value FROM new_rows ORDER BY id;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO public.gematria_changes (op, entry_id, phrase, value)
+        SELECT 'update', n.id, n.phrase, n.value
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n.phrase IS DISTINCT FROM o.phrase OR n.value IS DISTINCT FROM o.value
+        ORDER BY n.id;
+    ELSE
+        INSERT INTO public.gematria_changes (op, entry_id, phrase, value)
+        SELECT 'delete', id, phrase, value FROM old_rows ORDER BY id;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.gematria_changes_mark_pruned() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Remember the newest change taken out of the log: a cursor before it has missed changes.
+    IF TG_OP = 'TRUNCATE' THEN
+        INSERT INTO public.gematria_changes_pruned (id, seq)
+        SELECT 1, max(seq) FROM public.gematria_changes HAVING max(seq) IS NOT NULL
+        ON CONFLICT (id) DO UPDATE SET seq = greatest(public.gematria_changes_pruned.seq, excluded.seq);
+    ELSE
+        INSERT INTO public.gematria_changes_pruned (id, seq)
+        SELECT 1, max(seq) FROM old_rows HAVING max(seq) IS NOT NULL
+        ON CONFLICT (id) DO UPDATE SET seq = greatest(public.gematria_changes_pruned.seq, excluded.seq);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS gematria_changes_lock ON public.gematria_entries;
+CREATE TRIGGER gematria_changes_lock
+    BEFORE INSERT OR UPDATE OR DELETE ON public.gematria_entries
+    FOR EACH STATEMENT EXECUTE FUNCTION public.gematria_changes_lock();
+
+DROP TRIGGER IF EXISTS gematria_changes_insert ON public.gematria_entries;
+CREATE TRIGGER gematria_changes_insert
+    AFTER INSERT ON public.gematria_entries
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.gematria_changes_log();
+
+DROP TRIGGER IF EXISTS gematria_changes_update ON public.gematria_entries;
+CREATE TRIGGER gematria_changes_update
+    AFTER UPDATE ON public.gematria_entries
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.gematria_changes_log();
+
+DROP TRIGGER IF EXISTS gematria_changes_delete ON public.gematria_entries;
+CREATE TRIGGER gematria_changes_delete
+    AFTER DELETE ON public.gematria_entries
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.gematria_changes_log();
+
+DROP TRIGGER IF EXISTS gematria_changes_prune_delete ON public.gematria_changes;
+CREATE TRIGGER gematria_changes_prune_delete
+    AFTER DELETE ON public.gematria_changes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.gematria_changes_mark_pruned();
+
+DROP TRIGGER IF EXISTS gematria_changes_prune_truncate ON public.gematria_changes;
+CREATE TRIGGER gematria_changes_prune_truncate
+    BEFORE TRUNCATE ON public.gematria_changes
+    FOR EACH STATEMENT EXECUTE FUNCTION public.gematria_changes_mark_pruned();
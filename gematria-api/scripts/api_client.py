@@ -0,0 +1,183 @@
+"""Batching HTTP client for loading entries through the Gematria API.
+
+Shared by the import scripts. Rows are grouped into `PUT /entries/by-phrase/bulk`
+batches and sent from a small thread pool; each thread keeps one persistent
+(keep-alive) connection. 502/503/504/429 responses and dropped connections are
+retried with exponential backoff, and at most `max_in_flight` batches are queued
+at once so a large import never builds up in memory.
+
+Standard library only, so the scripts run without extra installs.
+"""
+
+from __future__ import annotations
+
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+from urllib.parse import urlsplit
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, body: str) -> None:
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+@dataclass
+class BulkStats:
+    sent: int = 0
+    upserted: int = 0
+    failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    errors: list[str] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+
+class ApiClient:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        batch_size: int = 500,
+        concurrency: int = 4,
+        max_in_flight: int | None = None,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 60,
+        sleep: float = 0.0,
+    ) -> None:
+        parts = urlsplit(base_url.rstrip("/"))
+        self._scheme = parts.scheme or "http"
+        self._netloc = parts.netloc
+        self._prefix = parts.path
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_in_flight = max_in_flight or self.concurrency * 2
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sleep = sleep
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+            conn = cls(self._netloc, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def request_json(self, method: str, path: str, payload=None, stats: BulkStats | None = None):
+        """
+        Send one JSON request on this thread's persistent connection.
+
+        Retries retryable statuses and connection errors with exponential backoff;
+        raises ApiError for other non-2xx responses or when retries run out.
+        """
+        body = None
+        headers = {"Accept": "application/json"}
+        if payload is not None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        attempt = 0
+        while True:
+            try:
+                conn = self._connection()
+                conn.request(method, self._prefix + path, body=body, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read().decode("utf-8", errors="replace")
+                status = resp.status
+            except (http.client.HTTPException, OSError) as e:
+                self._drop_connection()
+                status, raw = 0, str(e)
+
+            if 200 <= status < 300:
+                return json.loads(raw) if raw else {}
+            if (status == 0 or status in RETRY_STATUSES) and attempt < self.max_retries:
+                attempt += 1
+                if stats is not None:
+                    with self._lock:
+                        stats.retries += 1
+                # Exponential backoff with jitter so workers don't retry in lockstep.
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+                continue
+            raise ApiError(status, raw)
+
+    def _send_batch(self, batch: list[dict], stats: BulkStats) -> None:
+        try:
+            result = self.request_json("PUT", "/entries/by-phrase/bulk", batch, stats=stats)
+        except ApiError as e:
+            with self._lock:
+                stats.failed += len(batch)
+                stats.errors.append(str(e))
+        else:
+            with self._lock:
+                stats.upserted += int(result.get("upserted", 0))
+        if self.sleep:
+            time.sleep(self.sleep)
+
+    def bulk_upsert(
+        self,
+        rows: Iterable[dict],
+        on_batch: Callable[[BulkStats], None] | None = None,
+    ) -> BulkStats:
+        """
+        Upsert `rows` ({"phrase", "value", "source"?}) in concurrent bulk batches.
+
+        `on_batch` is called from the calling thread after each finished batch.
+        """
+        stats = BulkStats()
+        in_flight: set[Future] = set()
+
+        def drain(block_until: int) -> None:
+            nonlocal in_flight
+            while len(in_flight) > block_until:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    fut.result()
+                    with self._lock:
+                        stats.batches += 1
+                    if on_batch is not None:
+                        on_batch(stats)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            batch: list[dict] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    drain(self.max_in_flight - 1)
+                    stats.sent += len(batch)
+                    in_flight.add(pool.submit(self._send_batch, batch, stats))
+                    batch = []
+            if batch:
+                drain(self.max_in_flight - 1)
+                stats.sent += len(batch)
+                in_flight.add(pool.submit(self._send_batch, batch, stats))
+            drain(0)
+        return stats
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Allow running this file directly (so `import app...` works on Windows).
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.backfill import backfill_parser, run_backfill
+from app.gematria import GEMATRIA_METHODS, compute_all_many, method_column
+
+# Derived columns only; `value` (standard) is whatever the writer stored.
+_DERIVED = [i for i, m in enumerate(GEMATRIA_METHODS) if m != "standard"]
+_COLUMNS = [method_column(GEMATRIA_METHODS[i]) for i in _DERIVED]
+
+_SELECT_SQL = f"""
+SELECT id, phrase FROM public.gematria_entries
+WHERE id > %s AND ({" OR ".join(f"{c} IS NULL" for c in _COLUMNS)} OR %s)
+ORDER BY id
+LIMIT %s
+"""
+
+_UPDATE_SQL = f"""
+UPDATE public.gematria_entries AS e
+SET {", ".join(f"{c} = v.{c}" for c in _COLUMNS)}
+FROM (VALUES %s) AS v(id, {", ".join(_COLUMNS)})
+WHERE e.id = v.id
+  AND ({", ".join(f"e.{c}" for c in _COLUMNS)}) IS DISTINCT FROM ({", ".join(f"v.{c}" for c in _COLUMNS)})
+"""
+
+
+def _rows_for(rows):
+    values = compute_all_many(phrase for _id, phrase in rows)
+    return [(entry_id, *(v[i] for i in _DERIVED)) for (entry_id, _phrase), v in zip(rows, values)]
+
+
+def main() -> int:
+    args = backfill_parser(
+        "Fill the value_<method> columns of public.gematria_entries (see migrations/005_method_values.sql).",
+        "Recompute every row, not just rows with NULLs",
+    ).parse_args()
+    return run_backfill(args, _SELECT_SQL, _UPDATE_SQL, _rows_for)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
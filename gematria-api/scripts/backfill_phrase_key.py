@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Allow running this file directly (so `import app...` works on Windows).
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.backfill import backfill_parser, run_backfill
+from app.gematria import lookup_key
+
+_SELECT_SQL = """
+SELECT id, phrase FROM public.gematria_entries
+WHERE id > %s AND (phrase_key IS NULL OR %s)
+ORDER BY id
+LIMIT %s
+"""
+
+_UPDATE_SQL = """
+UPDATE public.gematria_entries AS e
+SET phrase_key = v.phrase_key
+FROM (VALUES %s) AS v(id, phrase_key)
+WHERE e.id = v.id AND e.phrase_key IS DISTINCT FROM v.phrase_key
+"""
+
+
+def main() -> int:
+    args = backfill_parser(
+        "Fill public.gematria_entries.phrase_key for existing rows (see migrations/003_phrase_key.sql).",
+        "Recompute every row, not just NULL keys",
+    ).parse_args()
+    return run_backfill(
+        args,
+        _SELECT_SQL,
+        _UPDATE_SQL,
+        lambda rows: [(entry_id, lookup_key(phrase)) for entry_id, phrase in rows],
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,551 @@
+"""Reproducible benchmarks: gematria microbenchmarks, an HTTP load test, and a result diff.
+
+Every run writes one JSON file (default bench-results/<kind>-<UTC timestamp>.json)
+with the git commit, machine info, arguments and results, so runs can be compared:
+
+  python scripts/bench.py compute --strongs external/strongs/hebrew/strongs-hebrew-dictionary.js
+  python scripts/bench.py compute --dump ../gematria_entries.dump
+  python scripts/bench.py http --concurrency 16 --duration 20
+  python scripts/bench.py http --server gunicorn,uvicorn --scenarios gematria,matches --concurrency 128
+  python scripts/bench.py compare bench-results/http-OLD.json bench-results/http-NEW.json
+
+`compute` times the pure functions in app.gematria over a corpus: raw Strong's
+lemmas (with niqqud), phrases from a pg_dump file (via pg_restore), a text file,
+or the phrases in the database.
+
+`http` starts the app (gunicorn, or Flask's threaded server with --server flask)
+against DATABASE_URL, or targets --base-url. It then drives GET /gematria, GET
+/matches and PUT /entries/by-phrase/bulk at a fixed concurrency and reports
+throughput and latency percentiles. The bulk scenario re-upserts existing
+(phrase, value) pairs, so the table's contents don't change (the data version
+does). `--restore DUMP` first loads a pg_dump of public.gematria_entries and
+applies migrations/. `--server uvicorn` runs the async read path (asgi:app),
+which only has the gematria, matches and health scenarios; several servers,
+comma-separated, run one after another and are printed side by side.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+from urllib.parse import quote, urlsplit
+
+# Allow running this file directly (so `import app...` works on Windows).
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.config import Config
+from app.gematria import compute_all_many, compute_gematria, compute_gematria_many, lookup_key, normalize_phrase
+from app.sources import iter_strongs_lemmas, iter_text_words, lemma_phrase
+
+DEFAULT_STRONGS = Path(PROJECT_ROOT).parent / "external" / "strongs" / "hebrew" / "strongs-hebrew-dictionary.js"
+
+# Per result metric: +1 if higher is better, -1 if lower is better (used by `compare`).
+METRICS = {
+    "ns_per_item": -1,
+    "items_per_sec": 1,
+    "rps": 1,
+    "p50_ms": -1,
+    "p95_ms": -1,
+    "p99_ms": -1,
+}
+
+_SAMPLE_SQL = "SELECT phrase, value FROM public.gematria_entries ORDER BY id LIMIT %s"
+
+
+# -- shared -------------------------------------------------------------------
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """p50/p95/p99/max in milliseconds for latencies given in seconds."""
+    samples = sorted(samples)
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+    def pick(p: float) -> float:
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 3)
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(samples[-1] * 1000, 3)}
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def write_results(kind: str, args: argparse.Namespace, results: dict, extra: dict | None = None) -> Path:
+    """Write a result file and return its path."""
+    started = datetime.now(timezone.utc)
+    path = Path(args.output) if args.output else Path("bench-results") / f"{kind}-{started:%Y%m%d-%H%M%S}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k not in ("func", "database_url", "output")}
+    doc = {
+        "kind": kind,
+        "created_at": started.isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        **(extra or {}),
+        "results": results,
+    }
+    path.write_text(json.dumps(doc, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return path
+
+
+def _pg_tool(args, name: str) -> str:
+    path = shutil.which(name, path=args.pg_bin) if args.pg_bin else shutil.which(name)
+    if path is None:
+        raise SystemExit(f"{name} not found; put it on PATH or pass --pg-bin")
+    return path
+
+
+def _copy_unescape(field: str) -> str:
+    if "\\" not in field:
+        return field
+    out = []
+    i = 0
+    while i < len(field):
+        ch = field[i]
+        if ch == "\\" and i + 1 < len(field):
+            nxt = field[i + 1]
+            out.append({"t": "\t", "n": "\n", "r": "\r", "\\": "\\"}.get(nxt, nxt))
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def _dump_phrases(args, dump: str) -> list[str]:
+    """Phrases of public.gematria_entries in a pg_dump custom-format file, without restoring it."""
+    proc = subprocess.run(
+        [_pg_tool(args, "pg_restore"), "--data-only", "--table=gematria_entries", "--file=-", dump],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"pg_restore failed: {proc.stderr.strip()}")
+    phrases: list[str] = []
+    column = None
+    for line in proc.stdout.splitlines():
+        if column is None:
+            if line.startswith("COPY ") and "gematria_entries" in line:
+                columns = [c.strip() for c in line[line.index("(") + 1 : line.index(")")].split(",")]
+                column = columns.index("phrase")
+            continue
+        if line == "\\.":
+            break
+        phrases.append(_copy_unescape(line.split("\t")[column]))
+    return phrases
+
+
+def _db_rows(database_url: str, limit: int) -> list[tuple[str, int]]:
+    import psycopg2
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(_SAMPLE_SQL, (limit,))
+            return [(phrase, int(value)) for phrase, value in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+# -- compute ------------------------------------------------------------------
+
+
+def _compute_functions() -> dict[str, Callable[[list[str]], object]]:
+    return {
+        "normalize_phrase": lambda items: [normalize_phrase(p) for p in items],
+        "lookup_key": lambda items: [lookup_key(p) for p in items],
+        "lemma_phrase": lambda items: [lemma_phrase(p) for p in items],
+        "compute_gematria": lambda items: [compute_gematria(p) for p in items],
+        "compute_gematria_many": lambda items: list(compute_gematria_many(items)),
+        "compute_all_many": lambda items: list(compute_all_many(items)),
+    }
+
+
+def _compute_corpus(args) -> tuple[list[str], list[str]]:
+    items: list[str] = []
+    sources: list[str] = []
+    strongs = args.strongs
+    if not (strongs or args.dump or args.text or args.db) and DEFAULT_STRONGS.exists():
+        strongs = str(DEFAULT_STRONGS)
+    if strongs:
+        lemmas = [lemma for _id, lemma in iter_strongs_lemmas(strongs) if lemma]
+        items += lemmas
+        sources.append(f"strongs:{Path(strongs).name} ({len(lemmas)} lemmas)")
+    if args.dump:
+        phrases = _dump_phrases(args, args.dump)
+        items += phrases
+        sources.append(f"dump:{Path(args.dump).name} ({len(phrases)} phrases)")
+    if args.text:
+        words = list(iter_text_words(args.text))
+        items += words
+        sources.append(f"text:{Path(args.text).name} ({len(words)} words)")
+    if args.db or not sources:
+        phrases = [phrase for phrase, _value in _db_rows(args.database_url, args.limit)]
+        items += phrases
+        sources.append(f"db ({len(phrases)} phrases)")
+    if not items:
+        raise SystemExit("Corpus is empty.")
+    return items, sources
+
+
+def _compute(args) -> int:
+    items, sources = _compute_corpus(args)
+    functions = _compute_functions()
+    names = args.functions.split(",") if args.functions else list(functions)
+    unknown = [n for n in names if n not in functions]
+    if unknown:
+        raise SystemExit(f"Unknown function(s): {', '.join(unknown)}; choose from {', '.join(functions)}")
+
+    avg_chars = sum(map(len, items)) / len(items)
+    print(f"corpus: {', '.join(sources)}; {len(items)} items, {avg_chars:.1f} chars on average")
+    results = {}
+    for name in names:
+        fn = functions[name]
+        fn(items[:1000])  # warm up
+        timings = []
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(args.repeat):
+                started = time.perf_counter_ns()
+                fn(items)
+                timings.append((time.perf_counter_ns() - started) / len(items))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        median = statistics.median(timings)
+        results[name] = {
+            "ns_per_item": round(median, 1),
+            "ns_per_item_min": round(min(timings), 1),
+            "items_per_sec": round(1e9 / median),
+        }
+        print(f"{name:<22} {median:9.1f} ns/item (min {min(timings):9.1f})  {1e9 / median:12,.0f} items/s")
+
+    path = write_results("compute", args, results, {"corpus": {"sources": sources, "items": len(items)}})
+    print(f"wrote {path}")
+    return 0
+
+
+# -- http ---------------------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _restore(args) -> None:
+    """Load a pg_dump of public.gematria_entries into --database-url and apply migrations/."""
+    print(f"restoring {args.restore} ...")
+    subprocess.run(
+        [_pg_tool(args, "pg_restore"), "--clean", "--if-exists", "--no-owner", "-d", args.database_url, args.restore],
+        check=True,
+    )
+    psql = _pg_tool(args, "psql")
+    for migration in sorted(Path(PROJECT_ROOT, "migrations").glob("*.sql")):
+        subprocess.run([psql, "-q", "-d", args.database_url, "-f", str(migration)], check=True)
+    for script in ("backfill_phrase_key.py", "backfill_method_values.py"):
+        subprocess.run(
+            [sys.executable, str(Path(PROJECT_ROOT, "scripts", script)), "--database-url", args.database_url],
+            check=True,
+        )
+
+
+def _start_server(args, server: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {**os.environ, "DATABASE_URL": args.database_url}
+    if server == "gunicorn":
+        cmd = [
+            sys.executable, "-m", "gunicorn",
+            "--workers", str(args.workers), "--threads", str(args.threads),
+            "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "wsgi:app",
+        ]
+    elif server == "uvicorn":
+        # The async read path (app/asgi.py): /gematria, /matches and /health only.
+        cmd = [
+            sys.executable, "-m", "uvicorn",
+            "--workers", str(args.workers), "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--no-access-log", "asgi:app",
+        ]
+    else:
+        code = (
+            "from app.factory import create_app; "
+            f"create_app().run(host='127.0.0.1', port={port}, threaded=True, debug=False)"
+        )
+        cmd = [sys.executable, "-c", code]
+        env["FLASK_DEBUG"] = "false"
+    proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with code {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc, base_url
+            conn.close()
+        except OSError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("server did not become healthy within 30s")
+
+
+def _scenarios(rows: list[tuple[str, int]], args) -> dict[str, Callable[[random.Random], tuple]]:
+    values = sorted({value for _phrase, value in rows})
+
+    def gematria(rng):
+        return "GET", f"/gematria?phrase={quote(rng.choice(rows)[0])}", None
+
+    def matches(rng):
+        return "GET", f"/matches?value={rng.choice(values)}&top={args.top}", None
+
+    def bulk(rng):
+        # Existing pairs with their stored values: the table ends up unchanged.
+        batch = rng.sample(rows, min(args.bulk_size, len(rows)))
+        body = json.dumps([{"phrase": p, "value": v} for p, v in batch], ensure_ascii=False).encode("utf-8")
+        return "PUT", "/entries/by-phrase/bulk", body
+
+    def health(rng):
+        return "GET", "/health", None
+
+    return {"gematria": gematria, "matches": matches, "bulk": bulk, "health": health}
+
+
+# Scenarios each server can answer (None: all of them).
+SERVER_SCENARIOS = {"gunicorn": None, "flask": None, "uvicorn": {"gematria", "matches", "health"}}
+
+
+def _drive(base_url: str, make_request, concurrency: int, seconds: float, seed: int) -> dict:
+    parts = urlsplit(base_url)
+    host = parts.hostname or "localhost"
+    deadline = time.perf_counter() + seconds
+    latencies: list[list[float]] = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    statuses: dict[int, int] = {}
+    lock = threading.Lock()
+
+    def worker(i: int) -> None:
+        rng = random.Random(seed * 1000 + i)
+        conn = http.client.HTTPConnection(host, parts.port or 80, timeout=60)
+        mine = latencies[i]
+        while time.perf_counter() < deadline:
+            method, path, body = make_request(rng)
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, parts.port or 80, timeout=60)
+                status = 0
+            mine.append(time.perf_counter() - started)
+            if status != 200:
+                errors[i] += 1
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+        conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [s for per_thread in latencies for s in per_thread]
+    return {
+        "requests": len(samples),
+        "errors": sum(errors),
+        "error_statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "seconds": round(elapsed, 3),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        **percentiles(samples),
+    }
+
+
+def _http(args) -> int:
+    if args.restore:
+        _restore(args)
+    rows = _db_rows(args.database_url, args.limit)
+    if not rows:
+        raise SystemExit("public.gematria_entries is empty; restore the dump or load the Strong's dictionary first.")
+
+    scenarios = _scenarios(rows, args)
+    names = args.scenarios.split(",")
+    unknown = [n for n in names if n not in scenarios]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}; choose from {', '.join(scenarios)}")
+    servers = [""] if args.base_url else args.server.split(",")
+    unknown = [s for s in servers if s and s not in SERVER_SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown server(s): {', '.join(unknown)}; choose from {', '.join(SERVER_SCENARIOS)}")
+
+    results = {}
+    for server in servers:
+        supported = SERVER_SCENARIOS.get(server)
+        run = [n for n in names if supported is None or n in supported]
+        proc = None
+        base_url = args.base_url
+        if not base_url:
+            proc, base_url = _start_server(args, server)
+        try:
+            print(
+                f"{server or base_url}: {len(rows)} sample rows, concurrency {args.concurrency}, "
+                f"{args.duration}s per scenario"
+            )
+            for name in run:
+                if args.warmup:
+                    _drive(base_url, scenarios[name], args.concurrency, args.warmup, args.seed)
+                result = _drive(base_url, scenarios[name], args.concurrency, args.duration, args.seed)
+                # Keyed by scenario alone for a single server, so runs stay comparable.
+                results[f"{server}/{name}" if len(servers) > 1 else name] = result
+                print(
+                    f"{name:<9} {result['rps']:9.1f} req/s  p50={result['p50_ms']:8.2f}ms "
+                    f"p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms  errors={result['errors']}"
+                )
+        finally:
+            if proc is not None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+    if len(servers) > 1:
+        _print_side_by_side(servers, names, results)
+    target = {"base_url": args.base_url} if args.base_url else {"server": args.server}
+    path = write_results("http", args, results, {"target": target})
+    print(f"wrote {path}")
+    return 0
+
+
+def _print_side_by_side(servers: list[str], names: list[str], results: dict) -> None:
+    print()
+    print(f"{'scenario':<10}" + "".join(f"{s + ' req/s':>18}{s + ' p99':>16}" for s in servers))
+    for name in names:
+        cells = []
+        for server in servers:
+            result = results.get(f"{server}/{name}")
+            cells.append(f"{result['rps']:>18.1f}{result['p99_ms']:>14.2f}ms" if result else f"{'-':>18}{'-':>16}")
+        print(f"{name:<10}" + "".join(cells))
+
+
+# -- compare ------------------------------------------------------------------
+
+
+def _compare(args) -> int:
+    old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    if old.get("kind") != new.get("kind"):
+        raise SystemExit(f"Can't compare a {old.get('kind')!r} run with a {new.get('kind')!r} run")
+    print(f"old: {old.get('git_commit') or '?'} {old.get('created_at')}")
+    print(f"new: {new.get('git_commit') or '?'} {new.get('created_at')}")
+
+    regressions = 0
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        for metric, direction in METRICS.items():
+            a = old["results"][name].get(metric)
+            b = new["results"][name].get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            worse = change * direction < -args.threshold
+            regressions += worse
+            flag = "REGRESSION" if worse else ("better" if change * direction > args.threshold else "")
+            print(f"{name:<22} {metric:<14} {a:>14,.2f} -> {b:>14,.2f}  {change:+7.1%}  {flag}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Gematria API benchmarks (results are written as JSON).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def common(p):
+        p.add_argument(
+            "--database-url",
+            default=Config.SQLALCHEMY_DATABASE_URI,
+            help="Postgres URL (defaults to DATABASE_URL, same as the API)",
+        )
+        p.add_argument("--output", "-o", default="", help="Result file (default bench-results/<kind>-<time>.json)")
+        p.add_argument("--pg-bin", default="", help="Directory with pg_restore/psql, if not on PATH")
+        p.add_argument("--limit", type=int, default=100_000, help="Max rows read from the database")
+
+    compute = sub.add_parser("compute", help="Microbenchmark the functions in app.gematria")
+    common(compute)
+    compute.add_argument("--strongs", default="", help=f"Strong's dictionary .js (default {DEFAULT_STRONGS} if present)")
+    compute.add_argument("--dump", default="", help="pg_dump custom-format file of public.gematria_entries")
+    compute.add_argument("--text", default="", help="UTF-8 Hebrew text file")
+    compute.add_argument("--db", action="store_true", help="Phrases from the database (default without other corpora)")
+    compute.add_argument("--functions", default="", help="Comma-separated subset (default: all)")
+    compute.add_argument("--repeat", type=int, default=7, help="Timed passes over the corpus; the median is reported")
+    compute.set_defaults(func=_compute)
+
+    load = sub.add_parser("http", help="Load-test /gematria, /matches and bulk upserts")
+    common(load)
+    load.add_argument("--base-url", default="", help="Target a running server instead of starting one")
+    load.add_argument(
+        "--server",
+        default="gunicorn",
+        help="gunicorn (wsgi:app), uvicorn (asgi:app) or flask; comma-separated to run them side by side",
+    )
+    load.add_argument("--workers", type=int, default=4, help="gunicorn/uvicorn workers")
+    load.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker")
+    load.add_argument("--restore", default="", help="pg_dump file to restore (and migrate) before the run")
+    load.add_argument("--scenarios", default="gematria,matches,bulk")
+    load.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    load.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    load.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each scenario")
+    load.add_argument("--top", type=int, default=50, help="top= for /matches")
+    load.add_argument("--bulk-size", type=int, default=100, help="Rows per bulk upsert request")
+    load.add_argument("--seed", type=int, default=1)
+    load.set_defaults(func=_http)
+
+    diff = sub.add_parser("compare", help="Compare two result files of the same kind")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    diff.set_defaults(func=_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+"""Latency benchmark for GET /search backends (SQL indexes vs. the in-process SearchIndex).
+
+Samples query strings from the table itself (prefixes, inner substrings and
+one-letter misspellings of stored keys), runs each mode against both backends
+and prints p50/p95/p99 next to the targets in TARGETS_MS.
+
+Load the Strong's dictionary first (scripts/import_strongs_hebrew.py or
+scripts/gematria_load.py) and apply migrations 003/004.
+
+  python scripts/bench_search.py --queries 500
+  python scripts/bench_search.py --backend memory --max-distance 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Allow running this file directly (so `import app...` works on Windows).
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import create_engine, text
+
+from app.config import Config
+from app.gematria import lookup_key
+from app.search import (
+    FUZZY_CANDIDATES_SQL,
+    PREFIX_SQL,
+    SUBSTRING_SQL,
+    SearchIndex,
+    fuzzy_candidate_count,
+    like_escape,
+    prefix_upper_bound,
+    rank_fuzzy,
+)
+
+# p99 targets (ms) per (backend, mode), for a Strong's-sized table (~10k rows) with limit=50.
+TARGETS_MS = {
+    ("memory", "prefix"): 1.0,
+    ("memory", "substring"): 2.0,
+    ("memory", "fuzzy"): 20.0,
+    ("sql", "prefix"): 5.0,
+    ("sql", "substring"): 20.0,
+    ("sql", "fuzzy"): 50.0,
+}
+
+_ROWS_SQL = text("SELECT id, phrase, value FROM public.gematria_entries")
+
+
+def _queries(keys: list[str], n: int, rng: random.Random) -> dict[str, list[str]]:
+    alphabet = sorted({c for k in keys for c in k if not c.isspace()})
+    out: dict[str, list[str]] = {"prefix": [], "substring": [], "fuzzy": []}
+    for key in rng.sample(keys, min(n, len(keys))):
+        out["prefix"].append(key[: rng.randint(1, min(3, len(key)))])
+        start = rng.randrange(len(key))
+        out["substring"].append(key[start : start + rng.randint(2, 4)])
+        pos = rng.randrange(len(key))
+        out["fuzzy"].append(key[:pos] + rng.choice(alphabet) + key[pos + 1 :])
+    return out
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float, float]:
+    samples = sorted(samples)
+
+    def pick(p: float) -> float:
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+
+    return pick(0.50), pick(0.95), pick(0.99)
+
+
+def _run_sql(conn, mode: str, key: str, limit: int, max_distance: int) -> int:
+    if mode == "prefix":
+        rows = conn.execute(PREFIX_SQL, {"lo": key, "hi": prefix_upper_bound(key), "limit": limit}).all()
+    elif mode == "substring":
+        rows = conn.execute(SUBSTRING_SQL, {"pattern": f"%{like_escape(key)}%", "limit": limit}).all()
+    else:
+        candidates = conn.execute(FUZZY_CANDIDATES_SQL, {"q": key, "candidates": fuzzy_candidate_count(limit)})
+        rows = rank_fuzzy(key, candidates, max_distance, limit)
+    return len(rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark /search backends against the current table.")
+    parser.add_argument(
+        "--database-url",
+        default=Config.SQLALCHEMY_DATABASE_URI,
+        help="Postgres URL (defaults to DATABASE_URL, same as the API)",
+    )
+    parser.add_argument("--backend", choices=("both", "sql", "memory"), default="both")
+    parser.add_argument("--queries", type=int, default=300, help="Queries per mode")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--max-distance", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as conn:
+        rows = [tuple(r) for r in conn.execute(_ROWS_SQL)]
+    if not rows:
+        raise SystemExit("public.gematria_entries is empty; load the Strong's dictionary first.")
+
+    keys = sorted({lookup_key(phrase) for _id, phrase, _value in rows})
+    queries = _queries(keys, args.queries, random.Random(args.seed))
+    print(f"{len(rows)} rows, {len(keys)} distinct keys, {args.queries} queries per mode, limit={args.limit}")
+
+    backends = ("sql", "memory") if args.backend == "both" else (args.backend,)
+    failed = False
+    for backend in backends:
+        index = None
+        if backend == "memory":
+            index = SearchIndex()
+            started = time.perf_counter()
+            index.build(rows)
+            print(f"memory index built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        with engine.connect() as conn:
+            for mode, qs in queries.items():
+                timings = []
+                hits = 0
+                for q in qs:
+                    started = time.perf_counter()
+                    if index is not None:
+                        hits += len(index.query(mode, q, args.limit, args.max_distance))
+                    else:
+                        hits += _run_sql(conn, mode, q, args.limit, args.max_distance)
+                    timings.append(time.perf_counter() - started)
+
+                p50, p95, p99 = _percentiles(timings)
+                target = TARGETS_MS[(backend, mode)]
+                ok = p99 <= target
+                failed |= not ok
+                print(
+                    f"{backend:<6} {mode:<9} p50={p50:7.3f}ms p95={p95:7.3f}ms p99={p99:7.3f}ms "
+                    f"target p99<={target}ms {'ok' if ok else 'MISSED'} (avg hits {hits / len(qs):.1f})"
+                )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,19 @@
+"""Check normalize_phrase against the original per-character implementation.
+
+The checks (every code point, every pair in U+0590..U+05FF, random mixed strings)
+are tests/test_gematria.py; this runs just those.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+if __name__ == "__main__":
+    raise SystemExit(
+        pytest.main(["-q", str(PROJECT_ROOT / "tests" / "test_gematria.py"), "-k", "normalize", *sys.argv[1:]])
+    )
@@ -0,0 +1,283 @@
+"""gematria-load: offline bulk loader that writes straight to Postgres.
+
+Reads local files, computes gematria in a process pool and loads batches with
+COPY + a set-based merge (app.ingest), bypassing the HTTP API entirely.
+
+Examples:
+  python scripts/gematria_load.py external/strongs/hebrew/strongs-hebrew-dictionary.js
+  python scripts/gematria_load.py --format text tanakh.txt --workers 8
+  python scripts/gematria_load.py entries.ndjson --dry-run
+  python scripts/gematria_load.py big.txt --checkpoint big.ckpt.json --resume
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Allow running this file directly (so `import app...` works on Windows).
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.config import Config
+from app.data_version import BUMP_DATA_VERSION_SQL, DATA_VERSION_EXISTS_SQL
+from app.gematria import GEMATRIA_METHODS
+from app.ingest import PreparedRow, copy_upsert_prepared, phrase_columns
+from app.sources import iter_strongs_lemmas, iter_text_words, lemma_phrase, word_phrase
+
+FORMATS = ("strongs", "text", "ndjson")
+
+# A record is (kind, raw phrase, value or None). Workers turn it into (phrase, value,
+# lookup key, every method's value): everything COPY needs but the line number.
+Record = tuple[str, str, int | None]
+Computed = tuple[str, int, str, tuple[int, ...]]
+
+_STANDARD = GEMATRIA_METHODS.index("standard")
+
+
+def _detect_format(path: Path) -> str:
+    name = path.name.lower()
+    if name.endswith(".js"):
+        return "strongs"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "text"
+
+
+def _iter_records(path: Path, fmt: str) -> Iterator[Record]:
+    if fmt == "strongs":
+        for _strong_id, lemma in iter_strongs_lemmas(path):
+            yield ("lemma", lemma, None)
+    elif fmt == "text":
+        for word in iter_text_words(path):
+            yield ("word", word, None)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                    phrase = str(obj["phrase"])
+                    value = obj.get("value")
+                    value = None if value is None else int(value)
+                except (ValueError, TypeError, KeyError) as e:
+                    raise SystemExit(f"{path}:{line_no}: invalid NDJSON record ({e})") from None
+                yield ("phrase", phrase, value)
+
+
+def _compute_chunk(records: list[Record]) -> list[Computed | None]:
+    """
+    Pool worker: derive the stored phrase, its value and the other COPY columns
+    (`phrase_columns`); None for records that normalize to nothing.
+    """
+    phrases: list[str] = []
+    for kind, raw, _value in records:
+        if kind == "lemma":
+            phrases.append(lemma_phrase(raw))
+        elif kind == "word":
+            phrases.append(word_phrase(raw))
+        else:
+            phrases.append(raw.strip())
+
+    out: list[Computed | None] = []
+    for (_kind, _raw, given), phrase, (key, values) in zip(records, phrases, phrase_columns(phrases)):
+        if not phrase:
+            out.append(None)
+        else:
+            out.append((phrase, values[_STANDARD] if given is None else given, key, values))
+    return out
+
+
+def _chunks(records: Iterator[Record], size: int) -> Iterator[list[Record]]:
+    chunk: list[Record] = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _compute_in_pool(pool, chunks: Iterable[list[Record]], window: int) -> Iterator[list]:
+    """
+    Like `pool.imap`, but with at most `window` chunks in flight so a huge input
+    isn't read into memory ahead of the workers.
+    """
+    pending: deque = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(_compute_chunk, (chunk,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _input_fingerprint(inputs: list[tuple[Path, str]]) -> list[dict]:
+    out = []
+    for path, fmt in inputs:
+        st = path.stat()
+        out.append({"path": str(path.resolve()), "format": fmt, "size": st.st_size, "mtime": int(st.st_mtime)})
+    return out
+
+
+def _load_checkpoint(path: Path, fingerprint: list[dict]) -> int:
+    state = json.loads(path.read_text(encoding="utf-8"))
+    if state.get("inputs") != fingerprint:
+        raise SystemExit(f"Checkpoint {path} was written for different input files; refusing to resume.")
+    return int(state.get("records_done", 0))
+
+
+def _save_checkpoint(path: Path, fingerprint: list[dict], records_done: int, upserted: int) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(
+        json.dumps({"inputs": fingerprint, "records_done": records_done, "upserted": upserted}, indent=2),
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="gematria-load",
+        description="Load Hebrew phrases from local files directly into public.gematria_entries (COPY + merge).",
+    )
+    parser.add_argument("inputs", nargs="+", help="Input files (Strong's .js dictionary, plain text, NDJSON)")
+    parser.add_argument(
+        "--format",
+        choices=("auto", *FORMATS),
+        default="auto",
+        help="Input format; 'auto' uses the extension (.js -> strongs, .ndjson/.jsonl -> ndjson, else text)",
+    )
+    parser.add_argument(
+        "--database-url",
+        default=Config.SQLALCHEMY_DATABASE_URI,
+        help="Postgres URL (defaults to DATABASE_URL, same as the API)",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Compute processes (0 = inline)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Records per compute task")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="Rows per COPY/merge transaction")
+    parser.add_argument("--checkpoint", default="", help="Checkpoint file updated after every committed batch")
+    parser.add_argument("--resume", action="store_true", help="Skip records already committed per --checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and compute only; don't touch the database")
+    args = parser.parse_args()
+
+    inputs: list[tuple[Path, str]] = []
+    for raw in args.inputs:
+        path = Path(raw)
+        if not path.exists():
+            raise SystemExit(f"Input file not found: {path}")
+        inputs.append((path, _detect_format(path) if args.format == "auto" else args.format))
+
+    fingerprint = _input_fingerprint(inputs)
+    checkpoint = Path(args.checkpoint) if args.checkpoint else None
+    skip = 0
+    if args.resume:
+        if checkpoint is None or not checkpoint.exists():
+            raise SystemExit("--resume needs an existing --checkpoint file")
+        skip = _load_checkpoint(checkpoint, fingerprint)
+        print(f"Resuming after {skip} records.")
+
+    def records() -> Iterator[Record]:
+        n = 0
+        for path, fmt in inputs:
+            for rec in _iter_records(path, fmt):
+                n += 1
+                if n > skip:
+                    yield rec
+
+    conn = None
+    cursor = None
+    bump_version = False
+    if not args.dry_run:
+        import psycopg2
+
+        conn = psycopg2.connect(args.database_url)
+        cursor = conn.cursor()
+        cursor.execute(DATA_VERSION_EXISTS_SQL)
+        (bump_version,) = cursor.fetchone() or (False,)
+
+    pool = Pool(args.workers) if args.workers > 0 else None
+    chunks = _chunks(records(), args.chunk_size)
+    if pool is not None:
+        computed = _compute_in_pool(pool, chunks, window=args.workers * 2)
+    else:
+        computed = map(_compute_chunk, chunks)
+
+    started = time.perf_counter()
+    records_done = skip
+    read = 0
+    empty = 0
+    upserted = 0
+    samples = 5 if args.dry_run else 0
+    batch: list[PreparedRow] = []
+
+    def flush() -> None:
+        nonlocal upserted
+        if not batch:
+            return
+        if conn is not None and cursor is not None:
+            stats = copy_upsert_prepared(cursor, batch)
+            if bump_version:
+                cursor.execute(BUMP_DATA_VERSION_SQL)
+            conn.commit()
+            upserted += stats["upserted"]
+            if checkpoint is not None:
+                _save_checkpoint(checkpoint, fingerprint, records_done, upserted)
+            load_note = f"batch {stats['requested']} rows in {stats['seconds']}s ({stats['rows_per_sec']} rows/s)"
+        else:
+            load_note = f"dry-run batch {len(batch)} rows"
+        elapsed = time.perf_counter() - started
+        print(
+            f"[{records_done} records] {load_note}; total read={read}, upserted={upserted}, "
+            f"{read / elapsed if elapsed else 0:.0f} records/s",
+            flush=True,
+        )
+        batch.clear()
+
+    try:
+        for results in computed:
+            for result in results:
+                records_done += 1
+                read += 1
+                if result is None:
+                    empty += 1
+                    continue
+                phrase, value, key, values = result
+                if samples:
+                    print(f"  {phrase} = {value}")
+                    samples -= 1
+                batch.append((records_done, phrase, value, key, values))
+            if len(batch) >= args.batch_size:
+                flush()
+        flush()
+    except BaseException:
+        if conn is not None:
+            conn.rollback()
+        raise
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if conn is not None:
+            conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Done{' (dry run)' if args.dry_run else ''}. Read={read}, Empty={empty}, Upserted={upserted}, "
+        f"Elapsed={elapsed:.1f}s, {read / elapsed if elapsed else 0:.0f} records/s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
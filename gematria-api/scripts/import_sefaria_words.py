@@ -2,10 +2,7 @@ from __future__ import annotations
 
 import argparse
 import json
-import re
 import sys
-import time
-import urllib.error
 import urllib.parse
 import urllib.request
 
@@ -16,10 +13,10 @@ PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from app.gematria import compute_gematria, normalize_phrase
+from app.gematria import compute_gematria_many
+from app.sources import HEBREW_WORD_RE, word_phrase
 
-
-HEBREW_WORD_RE = re.compile(r"[\u0590-\u05FF]+")
+from api_client import ApiClient
 
 
 def _http_json(method: str, url: str, payload: dict | None = None, timeout: int = 30) -> dict:
@@ -56,12 +53,14 @@ def main() -> int:
     parser = argparse.ArgumentParser(description="Import Hebrew words from Sefaria into Gematria API.")
     parser.add_argument("--ref", required=True, help="Sefaria ref, e.g. 'Genesis.1' or 'Berakhot.2a'")
     parser.add_argument("--base-url", default="http://127.0.0.1:5000", help="Gematria API base URL")
-    parser.add_argument("--sleep", type=float, default=0.02, help="Sleep between API requests (seconds)")
+    parser.add_argument("--sleep", type=float, default=0.0, help="Sleep between bulk requests, per worker (seconds)")
     parser.add_argument("--max-words", type=int, default=0, help="If >0, stop after this many unique words")
+    parser.add_argument("--batch-size", type=int, default=500, help="Words per PUT /entries/by-phrase/bulk request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Bulk requests sent in parallel")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per batch on 502/503/504/429 or connection errors")
     args = parser.parse_args()
 
     ref = args.ref
-    base_url = args.base_url.rstrip("/")
 
     sefaria_url = f"https://www.sefaria.org/api/texts/{urllib.parse.quote(ref)}?lang=he&context=0"
     sefaria = _http_json("GET", sefaria_url)
@@ -70,14 +69,7 @@ def main() -> int:
     words = []
     seen: set[str] = set()
     for m in HEBREW_WORD_RE.finditer(text):
-        raw = m.group(0)
-        # Keep final-letter forms in the stored phrase; normalize only removes marks/punct.
-        word = normalize_phrase(raw).strip()
-        if not word:
-            continue
-        # normalize_phrase may return spaces if input had mixed chars; ensure single token
-        if " " in word:
-            word = word.replace(" ", "")
+        word = word_phrase(m.group(0))
         if not word or word in seen:
             continue
         seen.add(word)
@@ -87,29 +79,22 @@ def main() -> int:
 
     print(f"Found {len(words)} unique Hebrew words in Sefaria ref '{ref}'.")
 
-    put_url = f"{base_url}/entries/by-phrase"
-    inserted = 0
-    failed = 0
-
-    for i, word in enumerate(words, start=1):
-        value = compute_gematria(word)
-        payload = {"phrase": word, "value": value, "source": f"sefaria:{ref}"}
-        try:
-            _http_json("PUT", put_url, payload=payload)
-            inserted += 1
-        except urllib.error.HTTPError as e:
-            failed += 1
-            body = e.read().decode("utf-8", errors="replace") if hasattr(e, "read") else ""
-            print(f"[{i}/{len(words)}] ERROR {e.code} for '{word}': {body}")
-        except Exception as e:
-            failed += 1
-            print(f"[{i}/{len(words)}] ERROR for '{word}': {e}")
-
-        if args.sleep:
-            time.sleep(args.sleep)
-
-    print(f"Done. Upserted={inserted}, Failed={failed}")
-    return 0 if failed == 0 else 2
+    client = ApiClient(
+        args.base_url,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        max_retries=args.retries,
+        sleep=args.sleep,
+    )
+    stats = client.bulk_upsert(
+        {"phrase": word, "value": value, "source": f"sefaria:{ref}"}
+        for word, value in zip(words, compute_gematria_many(words))
+    )
+
+    for error in stats.errors:
+        print(f"ERROR {error}")
+    print(f"Done. Upserted={stats.upserted}, Failed={stats.failed}, Elapsed={stats.elapsed:.1f}s")
+    return 0 if stats.failed == 0 else 2
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+"""Build and install read-only snapshots for SNAPSHOT_MODE (see app/snapshot.py).
+
+Examples:
+  python scripts/snapshot.py export /var/lib/gematria/entries.snap
+  python scripts/snapshot.py export /tmp/entries.snap.new --no-install
+  python scripts/snapshot.py swap /tmp/entries.snap.new /var/lib/gematria/entries.snap
+  python scripts/snapshot.py info /var/lib/gematria/entries.snap
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Allow running this file directly (so `import app...` works on Windows).
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.config import Config
+from app.data_version import DATA_VERSION_EXISTS_SQL
+from app.snapshot import Snapshot, install_snapshot, write_snapshot
+
+_SELECT_SQL = "SELECT id, phrase, value FROM public.gematria_entries"
+_VERSION_SQL = "SELECT version FROM public.gematria_data_version WHERE id = 1"
+
+
+def _export(args) -> int:
+    import psycopg2
+
+    started = time.perf_counter()
+    conn = psycopg2.connect(args.database_url)
+    try:
+        # REPEATABLE READ so the data version and the rows come from the same snapshot.
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with conn.cursor() as cursor:
+            cursor.execute(DATA_VERSION_EXISTS_SQL)
+            (has_version,) = cursor.fetchone() or (False,)
+            data_version = None
+            if has_version:
+                cursor.execute(_VERSION_SQL)
+                row = cursor.fetchone()
+                data_version = int(row[0]) if row else 0
+        with conn.cursor(name="gematria_snapshot_export") as cursor:
+            cursor.itersize = 50_000
+            cursor.execute(_SELECT_SQL)
+            target = args.output if args.no_install else f"{args.output}.tmp-{os.getpid()}"
+            count = write_snapshot(cursor, target, data_version)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if not args.no_install:
+        install_snapshot(target, args.output)
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(args.output)
+    print(f"Wrote {count} entries (data_version={data_version}) to {args.output}: {size} bytes in {elapsed:.1f}s")
+    return 0
+
+
+def _swap(args) -> int:
+    install_snapshot(args.new, args.live)
+    print(f"Installed {args.new} as {args.live}; workers reopen it within SNAPSHOT_CHECK_SECONDS.")
+    return 0
+
+
+def _info(args) -> int:
+    snapshot = Snapshot(args.path)
+    created = datetime.fromtimestamp(snapshot.created_at, tz=timezone.utc).isoformat()
+    print(f"{args.path}: entries={snapshot.count}, data_version={snapshot.data_version}, created_at={created}")
+    snapshot.close()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export/install memory-mapped snapshots of public.gematria_entries.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Write the table to a snapshot file and install it atomically")
+    export.add_argument("output", help="Snapshot path (e.g. the server's SNAPSHOT_PATH)")
+    export.add_argument(
+        "--database-url",
+        default=Config.SQLALCHEMY_DATABASE_URI,
+        help="Postgres URL (defaults to DATABASE_URL, same as the API)",
+    )
+    export.add_argument("--no-install", action="store_true", help="Write OUTPUT in place instead of via temp file + rename")
+    export.set_defaults(func=_export)
+
+    swap = sub.add_parser("swap", help="Atomically replace LIVE with NEW (same filesystem)")
+    swap.add_argument("new")
+    swap.add_argument("live")
+    swap.set_defaults(func=_swap)
+
+    info = sub.add_parser("info", help="Print a snapshot's header")
+    info.add_argument("path")
+    info.set_defaults(func=_info)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
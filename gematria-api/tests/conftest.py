@@ -0,0 +1,50 @@
+"""Shared fixtures. Tests that need Postgres use `client` and are skipped without one.
+
+    DATABASE_URL=postgresql://... python -m pytest -q
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+
+    from app.extensions import db
+    from app.factory import create_app
+
+    application = create_app()
+    with application.app_context():
+        try:
+            db.session.execute(text("SELECT 1 FROM public.gematria_entries LIMIT 1"))
+        except (OperationalError, ProgrammingError) as e:
+            pytest.skip(f"needs DATABASE_URL pointing at a migrated database ({e.__class__.__name__})")
+        finally:
+            db.session.remove()
+    return application
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def db_conn(app):
+    """A connection inside a transaction that is rolled back afterwards."""
+    from app.extensions import db
+
+    with app.app_context(), db.engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            yield conn
+        finally:
+            transaction.rollback()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from app.cache import CacheError, RedisBackend, _digest
+
+
+class _RespServer(socketserver.ThreadingTCPServer):
+    """A stand-in Redis: a dict, plus every command received."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.data: dict[bytes, bytes] = {}
+        self.commands: list[list[bytes]] = []
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """Answers the handful of commands RedisBackend sends."""
+
+    def handle(self) -> None:
+        server = self.server
+        assert isinstance(server, _RespServer)
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = [self._bulk() for _ in range(int(line[1:]))]
+            server.commands.append(args)
+            self.wfile.write(self._answer(server.data, args))
+
+    def _bulk(self) -> bytes:
+        n = int(self.rfile.readline()[1:])
+        return self.rfile.read(n + 2)[:-2]
+
+    @staticmethod
+    def _answer(data: dict[bytes, bytes], args: list[bytes]) -> bytes:
+        command = args[0].upper()
+        if command == b"AUTH":
+            return b"+OK\r\n" if args[1] == b"secret" else b"-WRONGPASS invalid password\r\n"
+        if command == b"SELECT":
+            return b"+OK\r\n"
+        if command == b"SET":
+            data[args[1]] = args[2]
+            return b"+OK\r\n"
+        if command == b"GET":
+            return _bulk_reply(data.get(args[1]))
+        if command == b"MGET":
+            return b"*%d\r\n" % (len(args) - 1) + b"".join(_bulk_reply(data.get(k)) for k in args[1:])
+        if command == b"INFO":
+            return _bulk_reply(b"# Stats\r\nkeyspace_hits:7\r\nevicted_keys:2\r\n")
+        return b"-ERR unknown command\r\n"
+
+
+def _bulk_reply(value: bytes | None) -> bytes:
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+@pytest.fixture()
+def resp_server():
+    server = _RespServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, auth: str = "", db: int = 0) -> str:
+    host, port = server.server_address
+    return f"redis://{auth}{host}:{port}/{db}"
+
+
+def test_store_then_fetch_round_trips_version_and_payload(resp_server):
+    backend = RedisBackend(_url(resp_server))
+    digest = _digest('["gematria","standard","אב"]')
+    assert backend.fetch(digest) == (None, None)
+
+    backend.store(digest, 12, b'{"value":3}', ttl=30)
+    backend.publish_version(12)
+    assert backend.fetch(digest) == (12, (12, b'{"value":3}'))
+
+    set_entry = next(c for c in resp_server.commands if c[0] == b"SET" and c[1].endswith(digest.hex().encode()))
+    assert set_entry[3:] == [b"PX", b"30000"]
+
+
+def test_publish_version_never_moves_the_shared_version_back(resp_server):
+    backend = RedisBackend(_url(resp_server))
+    backend.publish_version(5)
+    RedisBackend(_url(resp_server)).publish_version(3)
+    assert resp_server.data[b"gematria:cache:version"] == b"5"
+
+
+def test_auth_and_db_are_sent_on_connect(resp_server):
+    backend = RedisBackend(_url(resp_server, auth=":secret@", db=2))
+    backend.fetch(_digest("k"))
+    assert resp_server.commands[:2] == [[b"AUTH", b"secret"], [b"SELECT", b"2"]]
+
+
+def test_error_reply_raises_and_marks_the_server_down(resp_server):
+    backend = RedisBackend(_url(resp_server, auth=":wrong@"))
+    with pytest.raises(CacheError, match="WRONGPASS"):
+        backend.fetch(_digest("k"))
+    with pytest.raises(CacheError, match="marked down"):
+        backend.fetch(_digest("k"))
+
+
+def test_stats_reads_server_counters(resp_server):
+    stats = RedisBackend(_url(resp_server)).stats()
+    assert stats["server_keyspace_hits"] == 7
+    assert stats["evictions"] == 2
+
+
+def test_unreachable_server_is_a_cache_error():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    with pytest.raises(CacheError):
+        RedisBackend(f"redis://127.0.0.1:{port}/0").fetch(_digest("k"))
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import text
+
+from app.changes import LATEST_CHANGE_SQL, PRUNED_UP_TO_SQL
+
+_LOG_CHANGE_SQL = text(
+    "INSERT INTO public.gematria_changes (op, entry_id, phrase, value) VALUES ('insert', 0, 'בדיקה', 1) RETURNING seq"
+)
+
+
+@pytest.fixture()
+def log(db_conn):
+    if db_conn.execute(text("SELECT to_regclass('public.gematria_changes_pruned')")).scalar() is None:
+        pytest.skip("apply migrations/006_change_log.sql")
+    return db_conn
+
+
+@pytest.mark.parametrize("prune", ["DELETE FROM public.gematria_changes", "TRUNCATE public.gematria_changes"])
+def test_fully_pruned_log_still_rejects_old_cursors(log, prune):
+    first = log.execute(_LOG_CHANGE_SQL).scalar_one()
+    last = log.execute(_LOG_CHANGE_SQL).scalar_one()
+    log.execute(text(prune))
+
+    assert log.execute(text("SELECT count(*) FROM public.gematria_changes")).scalar_one() == 0
+    # GET /entries/changes answers 410 when since < PRUNED_UP_TO_SQL.
+    pruned_up_to = log.execute(PRUNED_UP_TO_SQL).scalar_one()
+    assert first < pruned_up_to == last
+    # A full sync now hands out a cursor that is not itself "too old".
+    assert log.execute(LATEST_CHANGE_SQL).scalar_one() == last
+
+
+def test_partial_prune_keeps_newer_cursors_valid(log):
+    first = log.execute(_LOG_CHANGE_SQL).scalar_one()
+    second = log.execute(_LOG_CHANGE_SQL).scalar_one()
+    log.execute(text("DELETE FROM public.gematria_changes WHERE seq <= :seq"), {"seq": first})
+
+    assert log.execute(PRUNED_UP_TO_SQL).scalar_one() == first
+    assert log.execute(LATEST_CHANGE_SQL).scalar_one() == second
+
+
+
+def test_gap_from_rolled_back_write_is_not_pruning(log):
+    # An empty log that was never pruned: a full sync hands out cursor 0.
+    log.execute(text("DELETE FROM public.gematria_changes"))
+    log.execute(text("DELETE FROM public.gematria_changes_pruned"))
+    cursor = log.execute(LATEST_CHANGE_SQL).scalar_one()
+    assert cursor == 0
+
+    rolled_back = log.begin_nested()
+    log.execute(_LOG_CHANGE_SQL)
+    rolled_back.rollback()
+    log.execute(_LOG_CHANGE_SQL)
+
+    # The sequence value the rolled-back insert used is skipped, not pruned.
+    assert log.execute(PRUNED_UP_TO_SQL).scalar_one() == 0
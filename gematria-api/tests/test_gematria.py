@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import random
+import unicodedata
+
+import pytest
+
+from app.gematria import _GEMATRIA_VALUES, _is_hebrew_letter, is_hebrew_text, normalize_phrase
+
+_HEBREW_BLOCK = [chr(c) for c in range(0x0590, 0x0600)]
+
+
+def _reference_normalize(phrase: str) -> str:
+    """
+    The original per-character implementation of `normalize_phrase`, kept here
+    as the oracle for the translate-table version.
+    """
+    s = unicodedata.normalize("NFKC", str(phrase)).strip()
+    s = "".join(ch for ch in s if not unicodedata.category(ch).startswith("M"))
+
+    out: list[str] = []
+    for ch in s:
+        if ch.isspace():
+            out.append(" ")
+            continue
+        if not _is_hebrew_letter(ch):
+            continue
+        if ch in _GEMATRIA_VALUES:
+            out.append(ch)
+    return "".join(out)
+
+
+def _assert_normalizes_like_reference(s: str) -> None:
+    assert normalize_phrase(s) == _reference_normalize(s), " ".join(f"U+{ord(c):04X}" for c in s)
+
+
+def test_normalize_matches_reference_for_every_code_point():
+    # Padded with spaces/letters so strip() and composition with a neighbouring letter
+    # are exercised too.
+    for code in range(0x110000):
+        ch = chr(code)
+        _assert_normalizes_like_reference(ch)
+        _assert_normalizes_like_reference(f" {ch} ")
+        _assert_normalizes_like_reference(f"ש{ch}ל")
+
+
+def test_normalize_matches_reference_for_hebrew_block_pairs():
+    for a in _HEBREW_BLOCK:
+        for b in _HEBREW_BLOCK:
+            _assert_normalizes_like_reference(a + b)
+            _assert_normalizes_like_reference(f"{a} {b}")
+
+
+def test_normalize_matches_reference_for_random_mixed_strings():
+    # Hebrew (incl. niqqud/cantillation), presentation forms, letterlike symbols,
+    # whitespace, ASCII punctuation and arbitrary BMP characters.
+    rnd = random.Random(0)
+    pools = [
+        _HEBREW_BLOCK,
+        [chr(c) for c in range(0xFB1D, 0xFB50)],
+        [chr(c) for c in range(0x2135, 0x2139)],
+        [" ", "\t", "\n", " ", " ", "　"],
+        [chr(c) for c in range(0x21, 0x7F)],
+    ]
+    for _ in range(20_000):
+        parts = []
+        for _ in range(rnd.randrange(0, 16)):
+            if rnd.random() < 0.1:
+                parts.append(chr(rnd.randrange(0x80, 0x10000)))
+            else:
+                parts.append(rnd.choice(rnd.choice(pools)))
+        _assert_normalizes_like_reference("".join(parts))
+
+
+@pytest.mark.parametrize(
+    ("phrase", "expected"),
+    [
+        ("שלום", True),
+        ("בְּרֵאשִׁית  בָּרָא", True),
+        ("ﬠברית־חדשה", True),  # presentation form and maqaf
+        ("abcשלום", False),
+        ("שלום 3", False),
+        ("שלום🙂", False),
+        ("ְ", False),  # a mark without letters
+        ("   ", False),
+    ],
+)
+def test_is_hebrew_text(phrase, expected):
+    assert is_hebrew_text(phrase) is expected
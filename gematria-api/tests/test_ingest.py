@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from app.ingest import IngestError, copy_upsert, iter_csv_rows, iter_ndjson_rows
+
+
+class _CopyCursor:
+    """Just enough of a psycopg2 cursor for copy_upsert, with psycopg2's COPY error handling."""
+
+    def __init__(self) -> None:
+        self.copied = b""
+        self.merged = False
+        self.rowcount = 0
+
+    def execute(self, sql: str) -> None:
+        if "INSERT INTO public.gematria_entries" in sql:
+            self.merged = True
+
+    def fetchone(self):
+        return (0,)
+
+    def copy_expert(self, sql: str, file, size: int = 8192) -> None:
+        # psycopg2 reports an exception raised by read() as QueryCanceled.
+        try:
+            while chunk := file.read(size):
+                self.copied += chunk
+        except Exception as e:
+            raise RuntimeError(f"COPY from stdin failed: error in .read() call: {e!r}") from None
+
+
+def test_copy_upsert_raises_the_parse_error_not_a_copy_failure():
+    cursor = _CopyCursor()
+    body = b'{"phrase": "\xd7\xa9", "value": 300}\n{"phrase": "x"\n'
+    with pytest.raises(IngestError) as excinfo:
+        copy_upsert(cursor, iter_ndjson_rows(io.BytesIO(body)))
+    assert excinfo.value.line_no == 2
+    assert not cursor.merged
+
+
+def test_csv_parse_error_carries_the_line_number():
+    with pytest.raises(IngestError, match="line 3"):
+        list(iter_csv_rows(io.BytesIO("phrase,value\nש,300\nא\n".encode())))
+
+
+@pytest.mark.parametrize(
+    ("content_type", "body", "bad_line"),
+    [
+        ("application/x-ndjson", '{"phrase": "בדיקתינג", "value": 1}\nnot json\n', "line 2"),
+        ("text/csv", "phrase,value\nבדיקתינג,1\nא,abc\n", "line 3"),
+    ],
+)
+def test_stream_upsert_rejects_a_malformed_line_with_400(client, content_type, body, bad_line):
+    response = client.put("/entries/by-phrase/stream", data=body.encode(), content_type=content_type)
+    assert response.status_code == 400
+    assert bad_line in response.get_json()["message"]
+    assert client.get("/entries/by-phrase?phrase=בדיקתינג").status_code == 404